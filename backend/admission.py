@@ -0,0 +1,133 @@
+"""Admission control for expensive work.
+
+Each controller admits up to `max_concurrent` callers and parks up to
+`max_queue` more; anyone beyond that, or still parked after `queue_timeout`,
+gets Overloaded. The API turns it into 429 with a Retry-After estimated from an
+EWMA of how long admitted work has been taking, so a burst of scans turns into
+a few browsers plus polite retries instead of one Chromium per request.
+
+Limits are per process: with N uvicorn workers the host runs up to
+N * max_concurrent scans.
+"""
+import math
+import threading
+import time
+from contextlib import contextmanager
+from config import (
+    ADMISSION_MAX_EVALUATIONS, ADMISSION_MAX_EVALUATION_QUEUE, ADMISSION_MAX_SCANS, ADMISSION_MAX_SCAN_QUEUE,
+    ADMISSION_QUEUE_TIMEOUT,
+)
+
+EWMA_ALPHA = 0.2
+
+
+class Overloaded(Exception):
+    def __init__(self, name, reason, retry_after):
+        super().__init__(f"{name} at capacity ({reason}); retry in {retry_after}s")
+        self.name = name
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    def __init__(self, name, max_concurrent, max_queue, queue_timeout=ADMISSION_QUEUE_TIMEOUT, initial_estimate=10.0):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._duration = initial_estimate
+        self._active = 0
+        self._waiting = 0
+        self._cond = threading.Condition()
+        self._counts = {'admitted': 0, 'queued': 0, 'rejected_queue_full': 0, 'rejected_timeout': 0}
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def retry_after(self):
+        """Seconds until a slot is likely free: the work ahead of a new caller over the slots serving it."""
+        with self._cond:
+            return self._retry_after()
+
+    def _retry_after(self):
+        ahead = self._waiting + max(0, self._active - self.max_concurrent + 1)
+        return max(1, math.ceil(self._duration * ahead / self.max_concurrent))
+
+    def enter(self):
+        """Block until admitted and return a token for leave(); raise Overloaded instead of waiting too long."""
+        arrived = time.monotonic()
+        with self._cond:
+            if self._active >= self.max_concurrent:
+                if self._waiting >= self.max_queue:
+                    self._counts['rejected_queue_full'] += 1
+                    raise Overloaded(self.name, 'queue full', self._retry_after())
+                self._waiting += 1
+                self._counts['queued'] += 1
+                deadline = arrived + self.queue_timeout
+                try:
+                    while self._active >= self.max_concurrent:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self._counts['rejected_timeout'] += 1
+                            raise Overloaded(self.name, 'queue timeout', self._retry_after())
+                        self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+            self._active += 1
+            self._counts['admitted'] += 1
+            admitted = time.monotonic()
+            waited = admitted - arrived
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+        return admitted
+
+    def leave(self, token):
+        with self._cond:
+            self._active -= 1
+            self._duration += EWMA_ALPHA * ((time.monotonic() - token) - self._duration)
+            self._cond.notify()
+
+    @contextmanager
+    def slot(self):
+        token = self.enter()
+        try:
+            yield
+        finally:
+            self.leave(token)
+
+    def wrap(self, fn):
+        """fn, run inside a slot."""
+        def admitted(*args, **kwargs):
+            with self.slot():
+                return fn(*args, **kwargs)
+        return admitted
+
+    def stats(self):
+        with self._cond:
+            admitted = self._counts['admitted']
+            return {
+                'active': self._active,
+                'queue_depth': self._waiting,
+                'max_concurrent': self.max_concurrent,
+                'max_queue': self.max_queue,
+                **self._counts,
+                'rejected': self._counts['rejected_queue_full'] + self._counts['rejected_timeout'],
+                'avg_wait_seconds': round(self._wait_total / admitted, 3) if admitted else 0.0,
+                'max_wait_seconds': round(self._wait_max, 3),
+                'ewma_duration_seconds': round(self._duration, 3),
+                'retry_after': self._retry_after(),
+            }
+
+
+# Browser scans are memory-bound; compliance-only evaluation is cheap CPU work
+SCANS = AdmissionController('browser scans', ADMISSION_MAX_SCANS, ADMISSION_MAX_SCAN_QUEUE, initial_estimate=20.0)
+EVALUATIONS = AdmissionController('compliance evaluations', ADMISSION_MAX_EVALUATIONS, ADMISSION_MAX_EVALUATION_QUEUE,
+                                  initial_estimate=1.0)
+
+
+def stats():
+    return {'scans': SCANS.stats(), 'evaluations': EVALUATIONS.stats()}
+
+
+def overloaded_response(error):
+    """429 body and headers for an Overloaded error."""
+    return {'detail': str(error), 'reason': error.reason}, {'Retry-After': str(error.retry_after)}
@@ -0,0 +1,260 @@
+"""Portfolio-level analytics over many stored scans, held as NumPy columns.
+
+Every cookie becomes one row: flags are bool arrays, lifetimes float64 (NaN for
+session cookies), and names/domains/sites/tracker categories are interned into
+integer codes. Metrics, percentiles and group-bys are then vectorised passes
+over those columns instead of loops over scan dicts.
+
+    python analytics.py scans/ --group-by category --group-by site --top 10
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+from urllib.parse import urlparse
+import numpy as np
+from compliance import check_compliance
+from features import SHORT_LIVED_SECONDS, is_first_party, normalize_same_site, scan_time
+from trackers import classify_domain
+
+SAME_SITE = ['missing', 'Strict', 'Lax', 'None']
+PERCENTILES = [50, 90, 99]
+GROUP_KEYS = ('category', 'domain', 'site', 'same_site', 'name')
+
+
+class Interner:
+    def __init__(self):
+        self.codes = {}
+        self.values = []
+
+    def __call__(self, value):
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def __len__(self):
+        return len(self.values)
+
+
+def site_host(url):
+    host = (urlparse(url or '').hostname or '').lower()
+    return host[4:] if host.startswith('www.') else host
+
+
+def _pct(part, whole):
+    return round(float(part) / float(whole) * 100, 2) if whole else 0.0
+
+
+def _percentiles(values, qs=PERCENTILES):
+    values = values[~np.isnan(values)] if values.dtype.kind == 'f' else values
+    if not len(values):
+        return {}
+    summary = {f"p{q}": round(float(v), 2) for q, v in zip(qs, np.percentile(values, qs))}
+    summary['mean'] = round(float(values.mean()), 2)
+    return summary
+
+
+class ScanTable:
+    """Columnar view of a set of scans; build with ScanTable.from_scans()."""
+
+    @classmethod
+    def from_scans(cls, documents, frameworks=('gdpr', 'ccpa'), evaluate=True):
+        """Load scan documents (scan results or saved compliance responses).
+
+        Framework scores come from a document's stored compliance results when it
+        has them; otherwise they are evaluated with the rule engine if `evaluate`.
+        """
+        table = cls()
+        names, domains, sites = Interner(), Interner(), Interner()
+        same_site_codes = {value: code for code, value in enumerate(SAME_SITE)}
+        scan_idx, name_codes, domain_codes, secure, http_only, same_site, lifetime = [], [], [], [], [], [], []
+        site_codes, scanned_at, third_party_counts, urls = [], [], [], []
+        scores = {fw: [] for fw in frameworks}
+
+        for i, doc in enumerate(documents):
+            scan = doc.get('scan_results', doc)
+            now = scan_time(scan)
+            urls.append(scan.get('url'))
+            site_codes.append(sites(site_host(scan.get('url'))))
+            scanned_at.append(now)
+            third_party_counts.append(len(scan.get('thirdParties', [])))
+
+            for cookie in scan.get('cookies', []):
+                scan_idx.append(i)
+                name_codes.append(names(cookie.get('name', '')))
+                domain_codes.append(domains((cookie.get('domain') or '').lower().lstrip('.')))
+                secure.append(bool(cookie.get('secure')))
+                http_only.append(bool(cookie.get('httpOnly')))
+                same_site.append(same_site_codes.get(normalize_same_site(cookie.get('sameSite')) or 'missing', 0))
+                expires = cookie.get('expires')
+                lifetime.append(expires - now if expires is not None and expires >= 0 else np.nan)
+
+            stored = doc.get('compliance_analysis') or doc.get('compliance_results') or {}
+            missing = [fw for fw in frameworks if fw not in stored]
+            if missing and evaluate:
+                stored = {**stored, **check_compliance(scan, missing)}
+            for fw in frameworks:
+                scores[fw].append(stored[fw]['score'] if fw in stored else np.nan)
+
+        table.scan_count = len(urls)
+        table.urls = urls
+        table.names, table.domains, table.sites = names.values, domains.values, sites.values
+        table.scan_idx = np.array(scan_idx, dtype=np.int64)
+        table.name = np.array(name_codes, dtype=np.int32)
+        table.domain = np.array(domain_codes, dtype=np.int32)
+        table.secure = np.array(secure, dtype=bool)
+        table.http_only = np.array(http_only, dtype=bool)
+        table.same_site = np.array(same_site, dtype=np.int8)
+        table.lifetime = np.array(lifetime, dtype=np.float64)
+        table.scan_site = np.array(site_codes, dtype=np.int32)
+        table.scanned_at = np.array(scanned_at, dtype=np.float64)
+        table.third_party_count = np.array(third_party_counts, dtype=np.int32)
+        table.scores = {fw: np.array(values, dtype=np.float64) for fw, values in scores.items()}
+        table._derive()
+        return table
+
+    def _derive(self):
+        # per-name and per-domain lookups run once per distinct value, then fan out by code
+        session_named = np.array(['session' in n.lower() or 'auth' in n.lower() for n in self.names], dtype=bool)
+        self.session_named = session_named[self.name] if len(self.name) else np.zeros(0, dtype=bool)
+
+        categories = Interner()
+        domain_category = np.array([categories(classify_domain(d)['category']) for d in self.domains], dtype=np.int32)
+        self.categories = categories.values
+        self.category = domain_category[self.domain] if len(self.domain) else np.zeros(0, dtype=np.int32)
+
+        site = self.scan_site[self.scan_idx]
+        width = max(len(self.domains), 1)
+        pairs, inverse = np.unique(site.astype(np.int64) * width + self.domain, return_inverse=True)
+        first_party = np.array([is_first_party(self.domains[p % width], self.sites[p // width]) for p in pairs.tolist()],
+                               dtype=bool)
+        self.first_party = first_party[inverse.reshape(-1)] if len(pairs) else np.zeros(0, dtype=bool)
+        self.site = site
+
+        self.cookies_per_scan = np.bincount(self.scan_idx, minlength=self.scan_count)
+
+    def __len__(self):
+        return len(self.scan_idx)
+
+    def flags(self):
+        session = np.isnan(self.lifetime)
+        return {
+            'missing_samesite': self.same_site == 0,
+            'samesite_none': self.same_site == 3,
+            'insecure': ~self.secure,
+            'not_http_only': ~self.http_only,
+            'session_named_without_http_only': self.session_named & ~self.http_only,
+            'third_party': ~self.first_party,
+            'session': session,
+            'long_lived': ~session & (self.lifetime > SHORT_LIVED_SECONDS),
+        }
+
+    def metrics(self, percentiles=PERCENTILES):
+        flags = self.flags()
+        n = len(self)
+        counts = {name: int(mask.sum()) for name, mask in flags.items()}
+        # a scan "has" a flag when any of its cookies do
+        per_scan = {name: np.bincount(self.scan_idx[mask], minlength=self.scan_count) for name, mask in flags.items()}
+        lifetimes_days = self.lifetime / 86400
+
+        return {
+            'scans': self.scan_count,
+            'cookies': n,
+            'distinct_cookie_names': len(self.names),
+            'distinct_cookie_domains': len(self.domains),
+            'cookie_pct': {name: _pct(count, n) for name, count in counts.items()},
+            'scan_pct': {name: _pct((hits > 0).sum(), self.scan_count) for name, hits in per_scan.items()},
+            'percentiles': {
+                'cookies_per_scan': _percentiles(self.cookies_per_scan.astype(np.float64), percentiles),
+                'third_parties_per_scan': _percentiles(self.third_party_count.astype(np.float64), percentiles),
+                'cookie_lifetime_days': _percentiles(lifetimes_days, percentiles),
+            },
+            'scores': {fw: self.score_summary(values, percentiles) for fw, values in self.scores.items()},
+        }
+
+    @staticmethod
+    def score_summary(values, percentiles=PERCENTILES):
+        evaluated = values[~np.isnan(values)]
+        summary = _percentiles(evaluated, percentiles)
+        summary['scans'] = int(len(evaluated))
+        # same bands as the extension analyzer's compliant / needs_improvement / non_compliant
+        summary['status_pct'] = {
+            'compliant': _pct((evaluated >= 80).sum(), len(evaluated)),
+            'needs_improvement': _pct(((evaluated >= 60) & (evaluated < 80)).sum(), len(evaluated)),
+            'non_compliant': _pct((evaluated < 60).sum(), len(evaluated)),
+        }
+        return summary
+
+    def _group_codes(self, key):
+        if key == 'category':
+            return self.category, self.categories
+        if key == 'domain':
+            return self.domain, self.domains
+        if key == 'site':
+            return self.site, self.sites
+        if key == 'same_site':
+            return self.same_site.astype(np.int32), SAME_SITE
+        if key == 'name':
+            return self.name, self.names
+        raise ValueError(f"unknown group-by key {key!r}; expected one of {', '.join(GROUP_KEYS)}")
+
+    def group_by(self, key, top=None):
+        """Cookie counts, scan reach and flag rates per group, largest groups first."""
+        codes, labels = self._group_codes(key)
+        k = len(labels)
+        cookies = np.bincount(codes, minlength=k)
+        scans = np.bincount(np.unique(codes.astype(np.int64) * max(self.scan_count, 1) + self.scan_idx)
+                            // max(self.scan_count, 1), minlength=k)
+        rates = {name: np.bincount(codes, weights=mask, minlength=k) for name, mask in self.flags().items()}
+
+        order = np.argsort(-cookies, kind='stable')
+        order = order[cookies[order] > 0][:top]
+        return [{
+            key: labels[code],
+            'cookies': int(cookies[code]),
+            'scans': int(scans[code]),
+            **{f"{name}_pct": _pct(counts[code], cookies[code]) for name, counts in rates.items()},
+        } for code in order.tolist()]
+
+    def report(self, group_by=(), top=20, percentiles=PERCENTILES):
+        result = self.metrics(percentiles)
+        if group_by:
+            result['groups'] = {key: self.group_by(key, top) for key in group_by}
+        return result
+
+
+def iter_documents(paths):
+    """Yield scan documents from .json files (one document or a list), .ndjson/.jsonl files and directories."""
+    for path in map(Path, paths):
+        if path.is_dir():
+            yield from iter_documents(sorted(p for p in path.rglob('*') if p.suffix in ('.json', '.ndjson', '.jsonl')))
+        elif path.suffix in ('.ndjson', '.jsonl'):
+            with open(path) as f:
+                for line in f:
+                    if line.strip():
+                        yield json.loads(line)
+        else:
+            with open(path) as f:
+                doc = json.load(f)
+            yield from (doc if isinstance(doc, list) else [doc])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fleet-wide cookie and compliance statistics for stored scans")
+    parser.add_argument('paths', nargs='+', help="scan JSON/NDJSON files or directories")
+    parser.add_argument('--framework', action='append', dest='frameworks', help="framework to score (default gdpr, ccpa)")
+    parser.add_argument('--group-by', action='append', default=[], choices=GROUP_KEYS)
+    parser.add_argument('--top', type=int, default=20, help="groups to show per --group-by")
+    parser.add_argument('--no-evaluate', action='store_true', help="only use scores stored in the documents")
+    args = parser.parse_args()
+
+    table = ScanTable.from_scans(iter_documents(args.paths), tuple(args.frameworks or ('gdpr', 'ccpa')),
+                                 evaluate=not args.no_evaluate)
+    json.dump(table.report(args.group_by, args.top), sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
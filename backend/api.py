@@ -1,11 +1,31 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import Depends, FastAPI, Header, HTTPException, Request, Response
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, confloat, conint, field_validator
+from typing import Any, Dict, List, Optional
 from scanner import scan_website
 from workflow import run_compliance_scan
+from routing import ROUTER
+from analytics import GROUP_KEYS, PERCENTILES, ScanTable
+from config import DEFAULT_FRAMEWORKS, JOBS_ASYNC_DEFAULT
+from jobs import JobQueue, job_accepted, wants_async
+from singleflight import SingleFlight, flight_key
+from urlcanon import canonicalize_url
+import admission
+from admission import EVALUATIONS, SCANS, Overloaded, overloaded_response
+from metrics import CONTENT_TYPE, REGISTRY
+from tracing import TracingMiddleware
+import eventlog
+from eventlog import get_logger
+from compression import CompressionMiddleware
+from fastjson import FastJSONResponse
+from projection import parse_view, project_entry
+from resultcache import ResultCache, cache_headers, freshness, not_modified
 
 app = FastAPI(title="CookieLens", version="2.0.0")
+JOBS = JobQueue()
+INFLIGHT = SingleFlight()
+CACHE = ResultCache()
 
 app.add_middleware(
     CORSMiddleware,
@@ -14,15 +34,39 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"]
 )
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(TracingMiddleware)
+eventlog.configure()
+log = get_logger('api')
+
+
+@app.exception_handler(Overloaded)
+def overloaded(request, error):
+    body, headers = overloaded_response(error)
+    return JSONResponse(body, status_code=429, headers=headers)
 
 
 class ScanRequest(BaseModel):
     url: str
 
+    @field_validator('url')
+    @classmethod
+    def valid_url(cls, url):
+        # flight_key canonicalises for the cache and coalescing; the scan loads the URL as sent
+        canonicalize_url(url)
+        return url
 
-class ComplianceRequest(BaseModel):
-    url: str
+
+class ComplianceRequest(ScanRequest):
+    frameworks: Optional[list] = None
+
+
+class AnalyticsRequest(BaseModel):
+    scans: List[Dict[str, Any]]
     frameworks: Optional[list] = None
+    group_by: list = []
+    top: conint(ge=1) = 20
+    percentiles: List[confloat(ge=0, le=100)] = PERCENTILES
 
 
 @app.get("/")
@@ -30,20 +74,111 @@ def health():
     return {"status": "ok"}
 
 
-@app.post("/scan")
-def scan(req: ScanRequest):
+@app.get("/metrics")
+def metrics():
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
+
+
+@app.get("/stats/routing")
+def routing_stats():
+    return ROUTER.stats()
+
+
+def enqueue(kind, payload):
+    job_id = JOBS.enqueue(kind, payload)
+    return JSONResponse(job_accepted(job_id), status_code=202, headers={'Location': f"/jobs/{job_id}"})
+
+
+def response_view(profile: str = 'full', fields: Optional[str] = None, include: Optional[str] = None):
+    """?profile=compact|summary, ?fields=a,b.c and ?include=cookies (see projection.py)."""
     try:
-        return scan_website(req.url)
-    except Exception as e:
-        raise HTTPException(500, str(e))
+        return parse_view(profile, fields, include)
+    except ValueError as e:
+        raise HTTPException(422, str(e))
 
 
-@app.post("/scan/compliance")
-def scan_compliance(req: ComplianceRequest):
+def cached(request, key, compute, max_stale=None, force_refresh=False, view=None):
+    policy = freshness(request.headers.get('cache-control'), max_stale, force_refresh)
     try:
-        return run_compliance_scan(req.url, req.frameworks)
+        entry, status = CACHE.get_or_compute(key, lambda: INFLIGHT.do(key, SCANS.wrap(compute)), **policy)
+    except Overloaded:
+        raise
     except Exception as e:
+        log.exception('scan.failed', key=key, error=str(e))
         raise HTTPException(500, str(e))
+    entry = project_entry(entry, view)
+    headers = cache_headers(entry, status, CACHE.max_age)
+    if request.method == 'GET' and not_modified(entry, request.headers.get('if-none-match'),
+                                                request.headers.get('if-modified-since')):
+        return Response(status_code=304, headers=headers)
+    return Response(entry.body, media_type='application/json', headers=headers)
+
+
+@app.get("/scan")
+def scan_cached(request: Request, url: str, max_stale: Optional[float] = None, force_refresh: bool = False,
+                view=Depends(response_view)):
+    try:
+        key = flight_key('scan', url)
+    except ValueError as e:
+        raise HTTPException(422, str(e))
+    return cached(request, key, lambda: scan_website(url), max_stale, force_refresh, view)
+
+
+@app.post("/scan")
+def scan(req: ScanRequest, request: Request, prefer: Optional[str] = Header(None),
+         max_stale: Optional[float] = None, force_refresh: bool = False, view=Depends(response_view)):
+    if wants_async(prefer, JOBS_ASYNC_DEFAULT):
+        return enqueue('scan', {'url': req.url})
+    return cached(request, flight_key('scan', req.url), lambda: scan_website(req.url), max_stale, force_refresh,
+                  view)
+
+
+@app.post("/scan/compliance")
+def scan_compliance(req: ComplianceRequest, request: Request, prefer: Optional[str] = Header(None),
+                    max_stale: Optional[float] = None, force_refresh: bool = False, view=Depends(response_view)):
+    if wants_async(prefer, JOBS_ASYNC_DEFAULT):
+        return enqueue('compliance', {'url': req.url, 'frameworks': req.frameworks})
+    frameworks = req.frameworks or DEFAULT_FRAMEWORKS
+    return cached(request, flight_key('compliance', req.url, frameworks),
+                  lambda: run_compliance_scan(req.url, frameworks), max_stale, force_refresh, view)
+
+
+@app.get("/jobs/{job_id}")
+def job_status(job_id: str):
+    job = JOBS.get(job_id)
+    if job is None:
+        raise HTTPException(404, "job not found")
+    return FastJSONResponse(job)
+
+
+@app.get("/stats/coalescing")
+def coalescing_stats():
+    return INFLIGHT.stats()
+
+
+@app.get("/stats/cache")
+def cache_stats():
+    return CACHE.stats()
+
+
+@app.get("/stats/admission")
+def admission_stats():
+    return admission.stats()
+
+
+@app.get("/stats/jobs")
+def job_stats():
+    return JOBS.stats()
+
+
+@app.post("/analytics")
+def analytics(req: AnalyticsRequest):
+    unknown = [key for key in req.group_by if key not in GROUP_KEYS]
+    if unknown:
+        raise HTTPException(422, f"unknown group_by {unknown}; expected {list(GROUP_KEYS)}")
+    with EVALUATIONS.slot():
+        table = ScanTable.from_scans(req.scans, tuple(req.frameworks or ('gdpr', 'ccpa')))
+        return table.report(req.group_by, req.top, req.percentiles)
 
 
 if __name__ == "__main__":
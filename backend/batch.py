@@ -0,0 +1,159 @@
+"""Bedrock batch inference for bulk audit runs.
+
+    python batch.py scans/*.json --local --out results.json
+"""
+import argparse
+import json
+import os
+import time
+import uuid
+from pathlib import Path
+import boto3
+from config import AWS_REGION, BATCH_MODEL_ID, BATCH_ROLE_ARN, BATCH_S3_URI, BATCH_POLL_INTERVAL
+from cookie_memo import COOKIE_MEMO, split_classifications
+from scanner import build_prompt, max_tokens_for
+
+TERMINAL_STATUSES = {'Completed', 'PartiallyCompleted', 'Failed', 'Stopped', 'Expired'}
+
+
+def build_record(scan_id, scan_data):
+    known, unknown = COOKIE_MEMO.partition(scan_data.get('cookies', []))
+    return {
+        'recordId': scan_id,
+        'modelInput': {
+            'anthropic_version': 'bedrock-2023-05-31',
+            'max_tokens': max_tokens_for(unknown),
+            'messages': [{'role': 'user', 'content': build_prompt(scan_data, known, unknown)}]
+        }
+    }
+
+
+def write_jsonl(rows, path):
+    with open(path, 'w') as f:
+        for row in rows:
+            f.write(json.dumps(row) + '\n')
+
+
+def read_jsonl(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+class LocalBatchBackend:
+    """File-based stand-in for Bedrock batch jobs: answers every record with `responder`."""
+
+    def __init__(self, workdir, responder=None):
+        self.workdir = Path(workdir)
+        self.responder = responder or (lambda record: {
+            'content': [{'type': 'text', 'text': f"Local batch result for {record['recordId']}"}]
+        })
+
+    def run(self, input_path, model_id):
+        job_dir = self.workdir / uuid.uuid4().hex
+        job_dir.mkdir(parents=True)
+        output_path = job_dir / f"{Path(input_path).name}.out"
+        rows = []
+        for record in read_jsonl(input_path):
+            try:
+                rows.append({**record, 'modelOutput': self.responder(record)})
+            except Exception as e:
+                rows.append({**record, 'error': {'errorMessage': str(e)}})
+        write_jsonl(rows, output_path)
+        return output_path
+
+
+class BedrockBatchBackend:
+    def __init__(self, s3_uri=BATCH_S3_URI, role_arn=BATCH_ROLE_ARN, region=AWS_REGION,
+                 poll_interval=BATCH_POLL_INTERVAL):
+        if not s3_uri or not role_arn:
+            raise ValueError("BATCH_S3_URI and BATCH_ROLE_ARN are required for Bedrock batch jobs")
+        self.bucket, _, self.prefix = s3_uri[len('s3://'):].partition('/')
+        self.prefix = self.prefix.strip('/')
+        self.role_arn = role_arn
+        self.poll_interval = poll_interval
+        self.s3 = boto3.client('s3', region_name=region)
+        self.bedrock = boto3.client('bedrock', region_name=region)
+
+    def run(self, input_path, model_id):
+        job_name = f"cookielens-{uuid.uuid4().hex[:12]}"
+        input_key = f"{self.prefix}/{job_name}/input/{Path(input_path).name}"
+        self.s3.upload_file(str(input_path), self.bucket, input_key)
+
+        job = self.bedrock.create_model_invocation_job(
+            jobName=job_name,
+            roleArn=self.role_arn,
+            modelId=model_id,
+            inputDataConfig={'s3InputDataConfig': {'s3Uri': f"s3://{self.bucket}/{input_key}"}},
+            outputDataConfig={'s3OutputDataConfig': {'s3Uri': f"s3://{self.bucket}/{self.prefix}/{job_name}/output/"}}
+        )
+        while True:
+            status = self.bedrock.get_model_invocation_job(jobIdentifier=job['jobArn'])['status']
+            if status in TERMINAL_STATUSES:
+                break
+            time.sleep(self.poll_interval)
+        if status not in ('Completed', 'PartiallyCompleted'):
+            raise RuntimeError(f"Batch job {job_name} ended with status {status}")
+
+        job_id = job['jobArn'].rsplit('/', 1)[-1]
+        output_key = f"{self.prefix}/{job_name}/output/{job_id}/{Path(input_path).name}.out"
+        output_path = Path(input_path).with_suffix('.jsonl.out')
+        self.s3.download_file(self.bucket, output_key, str(output_path))
+        return output_path
+
+
+class BatchAnalyzer:
+    def __init__(self, backend, model_id=BATCH_MODEL_ID, workdir='.'):
+        self.backend = backend
+        self.model_id = model_id
+        self.workdir = Path(workdir)
+
+    def run(self, scans):
+        """Analyse {scan_id: scan_data} in one batch job; returns {scan_id: analysis}."""
+        records = [build_record(scan_id, scan) for scan_id, scan in scans.items()]
+        self.workdir.mkdir(parents=True, exist_ok=True)
+        input_path = self.workdir / f"batch-{uuid.uuid4().hex[:12]}.jsonl"
+        write_jsonl(records, input_path)
+
+        output_path = self.backend.run(input_path, self.model_id)
+
+        results = {}
+        for row in read_jsonl(output_path):
+            scan_id = row['recordId']
+            if 'modelOutput' not in row:
+                results[scan_id] = f"AI analysis failed: {row.get('error', {}).get('errorMessage', 'no output')}"
+                continue
+            summary, classifications = split_classifications(row['modelOutput']['content'][0]['text'])
+            COOKIE_MEMO.learn(scans[scan_id].get('cookies', []), classifications)
+            results[scan_id] = summary
+        return results
+
+
+def load_scans(paths):
+    scans = {}
+    for path in paths:
+        with open(path) as f:
+            doc = json.load(f)
+        scans[Path(path).stem] = doc.get('scan_results', doc)
+    return scans
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run AI analysis for many stored scans as one batch job")
+    parser.add_argument('scans', nargs='+', help="scan JSON files; the file name is the scan ID")
+    parser.add_argument('--local', action='store_true', help="use the local file-based stand-in")
+    parser.add_argument('--workdir', default=os.getenv('BATCH_WORKDIR', 'batch-jobs'))
+    parser.add_argument('--out', help="write {scan_id: analysis} here instead of stdout")
+    args = parser.parse_args()
+
+    backend = LocalBatchBackend(args.workdir) if args.local else BedrockBatchBackend()
+    results = BatchAnalyzer(backend, workdir=args.workdir).run(load_scans(args.scans))
+
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(results, f, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import requests
+from config import (
+    BEDROCK_API_KEY, BEDROCK_ENDPOINT, API_TIMEOUT, BEDROCK_MAX_RETRIES, BEDROCK_BACKOFF_BASE,
+    BEDROCK_BACKOFF_MAX, BEDROCK_HEDGE, BEDROCK_HEDGE_MIN_DELAY, CIRCUIT_FAILURE_THRESHOLD,
+    CIRCUIT_RESET_TIMEOUT
+)
+
+THROTTLE_STATUSES = {429, 503}
+
+
+class BedrockError(Exception):
+    pass
+
+
+class ThrottledError(BedrockError):
+    pass
+
+
+class CircuitOpenError(BedrockError):
+    pass
+
+
+class ClientError(BedrockError):
+    """A 4xx other than throttling: the request is at fault, not the service."""
+
+
+class CircuitBreaker:
+    """Opens after `failure_threshold` consecutive failures; lets one probe through after `reset_timeout`."""
+
+    def __init__(self, failure_threshold=CIRCUIT_FAILURE_THRESHOLD, reset_timeout=CIRCUIT_RESET_TIMEOUT,
+                 clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        if self.clock() - self.opened_at >= self.reset_timeout:
+            return 'half_open'
+        return 'open'
+
+    def allow(self):
+        with self._lock:
+            state = self.state
+            if state == 'closed':
+                return True
+            if state == 'half_open' and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._probing or self.failures >= self.failure_threshold:
+                self.opened_at = self.clock()
+            self._probing = False
+
+
+def backoff_delay(attempt, base=BEDROCK_BACKOFF_BASE, cap=BEDROCK_BACKOFF_MAX):
+    """Full-jitter exponential backoff."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class BedrockInvoker:
+    def __init__(self, endpoint=BEDROCK_ENDPOINT, api_key=BEDROCK_API_KEY, timeout=API_TIMEOUT,
+                 max_retries=BEDROCK_MAX_RETRIES, hedge=BEDROCK_HEDGE, hedge_min_delay=BEDROCK_HEDGE_MIN_DELAY,
+                 latency_source=None, breaker=None, post=requests.post, sleep=time.sleep):
+        self.endpoint = endpoint.rstrip('/')
+        self.api_key = api_key
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.hedge = hedge
+        self.hedge_min_delay = hedge_min_delay
+        self.latency_source = latency_source
+        self.breaker = breaker or CircuitBreaker()
+        self.post = post
+        self.sleep = sleep
+        # hedge_wins counts races the hedge won, not time saved: the losing request cannot be interrupted
+        # mid-read and runs to completion. hedge_duplicates counts losers that still succeeded (billed twice),
+        # hedge_saved_seconds how much sooner the winning hedge answered than its primary eventually did.
+        self.stats = {'calls': 0, 'retries': 0, 'hedged': 0, 'hedge_wins': 0, 'hedge_duplicates': 0,
+                      'hedge_saved_seconds': 0.0, 'short_circuited': 0}
+        self._stats_lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix='bedrock')
+
+    def _count(self, name, amount=1):
+        # updated from the hedge threads as well as callers
+        with self._stats_lock:
+            self.stats[name] += amount
+
+    def invoke(self, model_id, body):
+        if not self.breaker.allow():
+            self._count('short_circuited')
+            raise CircuitOpenError("Bedrock circuit open")
+        self._count('calls')
+        try:
+            result = self._hedged(model_id, body) if self.hedge else self._with_retries(model_id, body)
+        except ClientError:
+            # Bedrock answered, so it is healthy: a bad request mustn't open the circuit for everyone
+            self.breaker.record_success()
+            raise
+        except Exception:
+            self.breaker.record_failure()
+            raise
+        self.breaker.record_success()
+        return result
+
+    def hedge_delay(self, model_id):
+        histogram = self.latency_source(model_id) if self.latency_source else None
+        p95 = histogram.percentile(0.95) if histogram else None
+        return max(self.hedge_min_delay, p95 or 0)
+
+    def _hedged(self, model_id, body):
+        cancelled = threading.Event()
+        primary = self._pool.submit(self._with_retries, model_id, body, cancelled)
+        done, _ = wait([primary], timeout=self.hedge_delay(model_id))
+        if done:
+            return primary.result()
+
+        self._count('hedged')
+        hedge = self._pool.submit(self._with_retries, model_id, body, cancelled)
+        pending = {primary, hedge}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    # first answer wins; the loser stops at its next retry boundary, but a request
+                    # already on the wire is left to finish and its answer discarded
+                    cancelled.set()
+                    won_at = time.monotonic()
+                    for loser in pending:
+                        if not loser.cancel():
+                            loser.add_done_callback(lambda f, primary_lost=loser is primary:
+                                                    self._loser_finished(f, primary_lost, won_at))
+                    if future is hedge:
+                        self._count('hedge_wins')
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def _loser_finished(self, future, primary_lost, won_at):
+        if future.cancelled() or future.exception() is not None:
+            return
+        self._count('hedge_duplicates')
+        if primary_lost:
+            self._count('hedge_saved_seconds', time.monotonic() - won_at)
+
+    def _with_retries(self, model_id, body, cancelled=None):
+        for attempt in range(self.max_retries + 1):
+            try:
+                return self._call(model_id, body)
+            except ThrottledError:
+                if attempt == self.max_retries or (cancelled and cancelled.is_set()):
+                    raise
+                self._count('retries')
+                self.sleep(backoff_delay(attempt))
+
+    def _call(self, model_id, body):
+        response = self.post(
+            f"{self.endpoint}/model/{model_id}/invoke",
+            headers={
+                "Authorization": f"Bearer {self.api_key}",
+                "Content-Type": "application/json"
+            },
+            json=body,
+            timeout=self.timeout
+        )
+        if response.status_code in THROTTLE_STATUSES or 'ThrottlingException' in response.headers.get('x-amzn-ErrorType', ''):
+            raise ThrottledError(f"Bedrock throttled ({response.status_code})")
+        if 400 <= response.status_code < 500:
+            raise ClientError(f"Bedrock rejected the request ({response.status_code}): {response.text[:200]}")
+        if response.status_code >= 400:
+            raise BedrockError(f"Bedrock returned {response.status_code}: {response.text[:200]}")
+        return response.json()
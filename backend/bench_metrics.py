@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""Benchmark the cost of the scan instrumentation in metrics.py.
+
+Times the instrumented operations against the same loop without them, single
+threaded and with several threads recording into the same series, and puts
+the per-scan total next to a real scan's duration.
+
+    python bench_metrics.py [--ops 200000] [--threads 8]
+"""
+import argparse
+import threading
+import time
+from metrics import CACHE_REQUESTS, Counter, Histogram, Registry, browser_open, stage, track_scan
+
+# what one instrumented scan records: see scanner.scan_website and lambda_function.scan_website
+SCAN_STAGES = ['browser_launch', 'navigation', 'cookie_extraction', 'storage_extraction', 'bedrock_call',
+               'compliance_evaluation', 's3_upload']
+
+
+def per_op(fn, ops):
+    started = time.perf_counter()
+    fn(ops)
+    return (time.perf_counter() - started) / ops * 1e9
+
+
+def bare(ops):
+    for _ in range(ops):
+        pass
+
+
+def stages(ops):
+    for _ in range(ops):
+        with stage('navigation'):
+            pass
+
+
+def counters(ops):
+    child = CACHE_REQUESTS.labels('hit')
+    for _ in range(ops):
+        child.inc()
+
+
+def labelled_counters(ops):
+    for _ in range(ops):
+        CACHE_REQUESTS.labels('hit').inc()
+
+
+def scans(ops):
+    for _ in range(ops):
+        with track_scan():
+            with stage('browser_launch'):
+                pass
+            with browser_open():
+                for name in SCAN_STAGES[1:]:
+                    with stage(name):
+                        pass
+
+
+def threaded(fn, ops, threads):
+    workers = [threading.Thread(target=fn, args=(ops // threads,)) for _ in range(threads)]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return (time.perf_counter() - started) / ops * 1e9
+
+
+def render_time(series):
+    registry = Registry()
+    histogram = Histogram('bench_seconds', 'bench', ['stage'], registry=registry)
+    counter = Counter('bench_total', 'bench', ['type'], registry=registry)
+    for i in range(series):
+        histogram.labels(f"stage{i}").observe(0.1)
+        counter.labels(f"type{i}").inc()
+    started = time.perf_counter()
+    text = registry.render()
+    return (time.perf_counter() - started) * 1000, len(text)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--ops', type=int, default=200000)
+    parser.add_argument('--threads', type=int, default=8)
+    args = parser.parse_args()
+
+    base = per_op(bare, args.ops)
+    print(f"{'operation':<38}{'ns/op':>10}")
+    for name, fn in [('stage() timer', stages), ('counter inc (bound child)', counters),
+                     ('counter inc (labels lookup)', labelled_counters)]:
+        print(f"{name:<38}{per_op(fn, args.ops) - base:>10.0f}")
+        print(f"{name + f' x{args.threads} threads':<38}{threaded(fn, args.ops, args.threads) - base:>10.0f}")
+
+    scan_ops = args.ops // 10
+    per_scan_us = (per_op(scans, scan_ops) - base) / 1000
+    print(f"\nfull scan instrumentation: {per_scan_us:.1f} us per scan "
+          f"({len(SCAN_STAGES)} stages, scan counter, 2 gauges)")
+    for seconds in (1, 5, 20):
+        print(f"  overhead on a {seconds:>2}s scan: {per_scan_us / (seconds * 1e6) * 100:.5f}%")
+
+    for series in (10, 100, 1000):
+        ms, size = render_time(series)
+        print(f"render /metrics with {series:>4} series per metric: {ms:6.2f} ms, {size / 1024:.0f} KB")
+
+
+if __name__ == "__main__":
+    main()
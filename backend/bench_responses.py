@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""Benchmark serialising scan responses: FastAPI's validated path against fastjson.
+
+Payloads are text.json (a real /scan-with-compliance response) and copies with
+its cookies and localStorage multiplied, for sites that set hundreds of
+cookies. Each is encoded three ways:
+
+- response_model: validate into the response model, dump it, JSONResponse (what
+  `response_model=ScanWithComplianceResponse` does to a returned dict)
+- jsonable_encoder: walk the dict, JSONResponse (a dict returned without a model)
+- fastjson: FastJSONResponse, which the endpoints now return
+
+and then end to end through a FastAPI app with the same routes. Finally, the
+bytes on the wire for each profile (projection.py), plain and compressed
+(compression.py).
+
+    python bench_responses.py [--payload ../text.json] [--repeat 200]
+"""
+import argparse
+import copy
+import json
+import os
+import time
+from fastapi import FastAPI
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from fastapi.testclient import TestClient
+from pydantic import BaseModel
+import compression
+import fastjson
+from fastjson import FastJSONResponse
+from projection import parse_view, project
+
+DEFAULT_PAYLOAD = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'text.json')
+
+
+# the response models of cookielens-extension/backend/app.py
+class ScanResponse(BaseModel):
+    url: str
+    scannedAt: str
+    cookies: list
+    localStorage: dict
+    thirdParties: list
+    humanReadableAnalysis: str
+    analysisFailed: bool = False
+    s3Path: str = None
+
+
+class ScanWithComplianceResponse(BaseModel):
+    scan_results: ScanResponse
+    compliance_analysis: dict
+    third_party_risks: list
+    overall_summary: dict
+
+
+def scaled(document, factor):
+    document = copy.deepcopy(document)
+    scan = document['scan_results']
+    scan['cookies'] = [{**cookie, 'name': f"{cookie['name']}_{i}"} for i in range(factor) for cookie in scan['cookies']]
+    scan['localStorage'] = {f"{key}_{i}": value for i in range(factor) for key, value in scan['localStorage'].items()}
+    return document
+
+
+def validated(document):
+    return JSONResponse(ScanWithComplianceResponse.model_validate(document).model_dump(mode='json')).body
+
+
+def encoded(document):
+    return JSONResponse(jsonable_encoder(document)).body
+
+
+def fast(document):
+    return FastJSONResponse(document).body
+
+
+def per_call(fn, document, repeat):
+    fn(document)
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn(document)
+    return (time.perf_counter() - started) / repeat * 1e6
+
+
+def app_for(document):
+    app = FastAPI()
+
+    @app.get('/validated', response_model=ScanWithComplianceResponse)
+    def validated_route():
+        return document
+
+    @app.get('/fast', response_model=ScanWithComplianceResponse)
+    def fast_route():
+        return FastJSONResponse(document)
+
+    return TestClient(app)
+
+
+def per_request(client, path, repeat):
+    client.get(path)
+    started = time.perf_counter()
+    for _ in range(repeat):
+        client.get(path)
+    return (time.perf_counter() - started) / repeat * 1e6
+
+
+def wire_sizes(document):
+    views = {'full': None, 'compact': parse_view('compact'), 'summary': parse_view('summary'),
+             'summary, 2 fields': parse_view('summary', 'scan_results.summary,overall_summary')}
+    encodings = ['gzip'] + (['br'] if compression.brotli is not None else [])
+    full = len(fastjson.dumps(document))
+    for name, view in views.items():
+        body = fastjson.dumps(project(document, **view) if view else document)
+        sizes = [f"{encoding} {len(compression.compress(body, encoding)) / 1024:5.1f} KB" for encoding in encodings]
+        print(f"  {name:18} {len(body) / 1024:6.1f} KB, " + ', '.join(sizes)
+              + f" ({1 - len(compression.compress(body, encodings[-1])) / full:.0%} saved)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--payload', default=DEFAULT_PAYLOAD)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    with open(args.payload) as f:
+        base = json.load(f)
+    print(f"encoder: {'orjson' if fastjson.orjson is not None else 'json (orjson not installed)'}")
+    for factor in (1, 10, 50):
+        document = scaled(base, factor)
+        # the validated body also carries the model's defaults (analysisFailed, s3Path)
+        assert json.loads(fast(document)) == json.loads(encoded(document))
+        size = len(fast(document))
+        timings = {name: per_call(fn, document, args.repeat)
+                   for name, fn in (('response_model', validated), ('jsonable_encoder', encoded), ('fastjson', fast))}
+        client = app_for(document)
+        requests = {path: per_request(client, f'/{path}', args.repeat // 4 or 1) for path in ('validated', 'fast')}
+        print(f"{len(document['scan_results']['cookies']):4d} cookies, {size / 1024:6.1f} KB: "
+              + ', '.join(f"{name} {us:8.1f} us" for name, us in timings.items())
+              + f" ({timings['response_model'] / timings['fastjson']:.0f}x)")
+        print(f"{'':25}per request: validated {requests['validated']:8.1f} us, fast {requests['fast']:8.1f} us")
+
+    print(f"\nbytes on the wire for {os.path.basename(args.payload)}:")
+    wire_sizes(base)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""Benchmark the local rule-based summary, per call in microseconds.
+
+local_summary stands in for Bedrock on simple scans and whenever Bedrock is
+unavailable. Timed on text.json's scan and copies with its cookies and third
+parties multiplied, both from the scan alone (evaluating the rules and
+classifying trackers itself) and from the compliance results and third-party
+risks the workflow already has.
+
+    python bench_summary.py [--payload ../text.json] [--repeat 2000]
+"""
+import argparse
+import json
+import os
+import time
+from compliance import analyze_third_parties, check_compliance
+from summary import local_summary
+
+DEFAULT_PAYLOAD = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'text.json')
+
+
+def scaled(scan, factor):
+    return {**scan,
+            'cookies': [{**cookie, 'name': f"{cookie['name']}_{i}"} for i in range(factor) for cookie in scan['cookies']],
+            'thirdParties': [f"t{i}.{host}" for i in range(factor) for host in scan['thirdParties']]}
+
+
+def per_call(fn, repeat):
+    fn()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) / repeat * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--payload', default=DEFAULT_PAYLOAD)
+    parser.add_argument('--repeat', type=int, default=2000)
+    args = parser.parse_args()
+
+    with open(args.payload) as f:
+        document = json.load(f)
+    base = document.get('scan_results', document)
+    for factor in (1, 10, 50):
+        scan = scaled(base, factor)
+        compliance = check_compliance(scan)
+        risks = analyze_third_parties(scan['thirdParties'])
+        repeat = max(1, args.repeat // factor)
+        alone = per_call(lambda: local_summary(scan), repeat)
+        given = per_call(lambda: local_summary(scan, compliance, risks), repeat)
+        print(f"{len(scan['cookies']):5d} cookies, {len(scan['thirdParties']):4d} third parties: "
+              f"from the scan {alone:8.1f} us, with compliance and risks {given:6.1f} us")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""Benchmark tracker classification on 100k domains.
+
+Compares the suffix trie + Aho-Corasick classifier against the old linear
+substring scan, for the bundled tracker list and a synthetic 50k-entry list.
+
+    python bench_trackers.py [--domains 100000] [--entries 50000]
+"""
+import argparse
+import random
+import string
+import time
+from trackers import TrackerClassifier, load_classifier
+
+TLDS = ['com', 'net', 'org', 'io', 'co.uk', 'de', 'cn']
+
+
+def random_label(rng, n=8):
+    return ''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(3, n)))
+
+
+def synthetic_database(rng, entries):
+    domains = {f"{random_label(rng)}.{rng.choice(TLDS)}": ('Advertising', f"Vendor {i}", 'high') for i in range(entries)}
+    patterns = {random_label(rng, 12) + str(i): ('Analytics', f"Vendor {i}", 'medium') for i in range(entries // 100)}
+    return domains, patterns
+
+
+def host_samples(rng, domains, count):
+    known = list(domains)
+    hosts = []
+    for _ in range(count):
+        if rng.random() < 0.3:
+            hosts.append(f"{random_label(rng)}.{rng.choice(known)}")
+        else:
+            hosts.append(f"{random_label(rng)}.{random_label(rng)}.{rng.choice(TLDS)}")
+    return hosts
+
+
+def linear_classify(host, table):
+    for pattern, value in table.items():
+        if pattern in host:
+            return value
+    return None
+
+
+def timed(fn, hosts):
+    started = time.perf_counter()
+    for host in hosts:
+        fn(host)
+    return time.perf_counter() - started
+
+
+def report(name, seconds, count):
+    print(f"{name:<52} {seconds * 1000:9.1f} ms  {count / seconds:>12,.0f} domains/s")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--domains', type=int, default=100_000)
+    parser.add_argument('--entries', type=int, default=50_000)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    bundled = load_classifier()
+    domains, patterns = synthetic_database(rng, args.entries)
+    started = time.perf_counter()
+    large = TrackerClassifier()
+    for domain, value in domains.items():
+        large.add_domain(domain, *value)
+    for pattern, value in patterns.items():
+        large.add_pattern(pattern, *value)
+    large.patterns.build()
+    print(f"built {len(large):,}-entry classifier in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    hosts = host_samples(rng, domains, args.domains)
+    print(f"classifying {len(hosts):,} domains\n")
+
+    report(f"trie+AC, bundled list ({len(bundled)} entries)", timed(bundled._classify, hosts), len(hosts))
+    report(f"trie+AC, synthetic list ({len(large):,} entries)", timed(large._classify, hosts), len(hosts))
+    repeated = hosts[:10_000] * 10
+    report("trie+AC, lru-cached (10k distinct hosts)", timed(large.classify, repeated), len(repeated))
+
+    sample = hosts[:max(1, len(hosts) // 100)]
+    table = {**domains, **patterns}
+    linear = timed(lambda h: linear_classify(h, table), sample)
+    report(f"linear substring scan (1% sample, {len(table):,} entries)", linear, len(sample))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,80 +1,27 @@
-FRAMEWORKS = {
-    'gdpr': {
-        'name': 'GDPR',
-        'controls': [
-            {'id': 'secure-flag', 'name': 'Secure cookies'},
-            {'id': 'httponly-flag', 'name': 'HttpOnly protection'},
-            {'id': 'samesite-attr', 'name': 'SameSite attribute'},
-            {'id': 'third-party', 'name': 'Third-party tracking'}
-        ]
-    },
-    'ccpa': {
-        'name': 'CCPA',
-        'controls': [
-            {'id': 'consent', 'name': 'User consent'},
-            {'id': 'third-party', 'name': 'Third-party disclosure'}
-        ]
-    }
-}
+from features import extract_features
+from rules import get_engine
+from trackers import classify_domain
+from metrics import stage
 
-TRACKER_CATEGORIES = {
-    'google-analytics': ('Analytics', 'low'),
-    'googletagmanager': ('Analytics', 'low'),
-    'facebook': ('Advertising', 'medium'),
-    'doubleclick': ('Advertising', 'medium'),
-    'cloudflare': ('CDN', 'low'),
-    'cloudfront': ('CDN', 'low')
-}
-
-
-def check_compliance(scan_data, frameworks=None):
+def check_compliance(scan_data, frameworks=None, features=None, outcomes=None):
     if frameworks is None:
         frameworks = ['gdpr', 'ccpa']
+    engine = get_engine()
+    controls = {fw_id: engine.frameworks[fw_id]['controls'] for fw_id in frameworks if fw_id in engine.frameworks}
     
-    cookies = scan_data.get('cookies', [])
-    third_parties = scan_data.get('thirdParties', [])
-    
+    with stage('compliance_evaluation'):
+        if features is None:
+            features = extract_features(scan_data)
+        evaluated = engine.evaluate_frameworks(controls, features, outcomes)
     results = {}
-    for fw_id in frameworks:
-        if fw_id not in FRAMEWORKS:
-            continue
-        
-        passed, failed, warnings = [], [], []
-        
-        # Check secure flag
-        insecure = [c for c in cookies if not c.get('secure')]
-        if not insecure:
-            passed.append("All cookies use Secure flag")
-        else:
-            failed.append(f"{len(insecure)} cookies missing Secure flag")
-        
-        # Check httpOnly
-        session_cookies = [c for c in cookies if 'session' in c.get('name', '').lower() or 'auth' in c.get('name', '').lower()]
-        non_httponly = [c for c in session_cookies if not c.get('httpOnly')]
-        if session_cookies and not non_httponly:
-            passed.append("Session cookies use HttpOnly")
-        elif non_httponly:
-            failed.append(f"{len(non_httponly)} session cookies missing HttpOnly")
-        
-        # Check sameSite
-        no_samesite = [c for c in cookies if not c.get('sameSite')]
-        if not no_samesite:
-            passed.append("All cookies have SameSite attribute")
-        else:
-            warnings.append(f"{len(no_samesite)} cookies missing SameSite")
-        
-        # Third parties
-        if third_parties:
-            warnings.append(f"{len(third_parties)} third-party services detected")
-        
-        score = (len(passed) / (len(passed) + len(failed)) * 100) if (passed or failed) else 0
-        
+    for fw_id, result in evaluated.items():
         results[fw_id] = {
-            'framework': FRAMEWORKS[fw_id]['name'],
-            'score': round(score, 1),
-            'passed': passed,
-            'failed': failed,
-            'warnings': warnings
+            'framework': engine.frameworks[fw_id]['name'],
+            'score': result['score'],
+            'passed': result['passed'],
+            'failed': result['failed'],
+            'warnings': result['warnings'],
+            'recommendations': result['recommendations']
         }
     
     return results
@@ -83,18 +30,12 @@ def check_compliance(scan_data, frameworks=None):
 def analyze_third_parties(third_parties):
     risks = []
     for domain in third_parties:
-        category, risk_level = 'Unknown', 'medium'
-        
-        for pattern, (cat, risk) in TRACKER_CATEGORIES.items():
-            if pattern in domain:
-                category, risk_level = cat, risk
-                break
-        
+        tracker = classify_domain(domain)
         risks.append({
             'domain': domain,
-            'category': category,
-            'risk_level': risk_level
+            'category': tracker['category'],
+            'owner': tracker['owner'],
+            'risk_level': tracker['risk_level']
         })
     
     return risks
-
@@ -0,0 +1,85 @@
+"""Response compression above a size threshold.
+
+Brotli when the client accepts it and the `brotli` package is installed, gzip
+otherwise. Only complete bodies are compressed: streamed responses (NDJSON from
+/compliance/evaluate) pass through so each line still reaches the client as
+soon as it is written. Compressed responses get a weak ETag, which
+resultcache.not_modified still matches.
+"""
+import gzip
+from starlette.datastructures import Headers, MutableHeaders
+from config import RESPONSE_BROTLI_QUALITY, RESPONSE_COMPRESSION_MIN_SIZE, RESPONSE_GZIP_LEVEL
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE = ('application/json', 'application/x-ndjson', 'text/')
+
+
+def accepted_encoding(accept_encoding):
+    """'br', 'gzip' or None for an Accept-Encoding header."""
+    weights = {}
+    for part in (accept_encoding or '').lower().split(','):
+        name, _, params = part.partition(';')
+        params = params.strip()
+        try:
+            weights[name.strip()] = float(params[2:]) if params.startswith('q=') else 1.0
+        except ValueError:
+            weights[name.strip()] = 0.0
+    for encoding in ('br', 'gzip') if brotli is not None else ('gzip',):
+        if weights.get(encoding, weights.get('*', 0.0)) > 0:
+            return encoding
+    return None
+
+
+def compress(body, encoding):
+    if encoding == 'br':
+        return brotli.compress(body, quality=RESPONSE_BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=RESPONSE_GZIP_LEVEL, mtime=0)
+
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size=RESPONSE_COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        encoding = None
+        if scope['type'] == 'http':
+            encoding = accepted_encoding(Headers(scope=scope).get('accept-encoding'))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start, passthrough
+            if message['type'] == 'http.response.start':
+                start = message
+                return
+            if passthrough or message['type'] != 'http.response.body':
+                await send(message)
+                return
+            headers = MutableHeaders(raw=start['headers'])
+            body = message.get('body', b'')
+            if (message.get('more_body') or len(body) < self.minimum_size or 'content-encoding' in headers
+                    or not headers.get('content-type', '').startswith(COMPRESSIBLE)):
+                passthrough = True
+                await send(start)
+                await send(message)
+                return
+            body = compress(body, encoding)
+            headers['Content-Encoding'] = encoding
+            headers['Content-Length'] = str(len(body))
+            headers.add_vary_header('Accept-Encoding')
+            etag = headers.get('etag')
+            if etag and not etag.startswith('W/'):
+                headers['ETag'] = f'W/{etag}'
+            await send(start)
+            await send({'type': 'http.response.body', 'body': body})
+
+        await self.app(scope, receive, send_compressed)
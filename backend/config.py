@@ -1,4 +1,5 @@
 import os
+import tempfile
 
 BEDROCK_API_KEY = os.getenv('BEDROCK_API_KEY', 'ABSKTGktYXQtNDQwNzQ0MjUwNzIwOlRxQkJLWEFIRWFKaGZaU0lsZjF5SlRza1NEK1FIMk9aS1hqUGVyOEhWcVpzTHlzL0t1YnBLKzI4VnZVPQ==')
 AWS_REGION = os.getenv('AWS_REGION', 'us-east-1')
@@ -6,8 +7,77 @@ AWS_REGION = os.getenv('AWS_REGION', 'us-east-1')
 BROWSER_TIMEOUT = 60000
 API_TIMEOUT = 60
 MAX_TOKENS = 500
+# the ```json classification block comes on top of the summary: room per cookie, and a cap on how many are sent
+CLASSIFY_TOKENS_PER_COOKIE = 50
+CLASSIFY_MAX_COOKIES = int(os.getenv('CLASSIFY_MAX_COOKIES', '40'))
+
+BEDROCK_ENDPOINT = os.getenv('BEDROCK_ENDPOINT', f'https://bedrock-runtime.{AWS_REGION}.amazonaws.com')
+BEDROCK_MAX_RETRIES = int(os.getenv('BEDROCK_MAX_RETRIES', '3'))
+BEDROCK_BACKOFF_BASE = 0.5
+BEDROCK_BACKOFF_MAX = 8.0
+BEDROCK_HEDGE = os.getenv('BEDROCK_HEDGE', '').lower() in ('1', 'true', 'yes')
+BEDROCK_HEDGE_MIN_DELAY = float(os.getenv('BEDROCK_HEDGE_MIN_DELAY', '2'))
+CIRCUIT_FAILURE_THRESHOLD = 5
+CIRCUIT_RESET_TIMEOUT = 30
 
 DEFAULT_FRAMEWORKS = ['gdpr', 'ccpa']
 
+RULES_PATH = os.getenv('RULES_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'rules.json'))
+RULES_RELOAD_INTERVAL = 2
+
+TRACKER_DB_PATH = os.getenv('TRACKER_DB_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'trackers.json'))
+
+COOKIE_MEMO_PATH = os.getenv('COOKIE_MEMO_PATH')
+
+SCAN_HISTORY_DIR = os.getenv('SCAN_HISTORY_DIR')
+SCAN_HISTORY_MAX_ENTRIES = 1000
+
+FAST_MODEL_ID = os.getenv('FAST_MODEL_ID', 'anthropic.claude-3-haiku-20240307-v1:0')
+THOROUGH_MODEL_ID = os.getenv('THOROUGH_MODEL_ID', os.getenv('MODEL_ID', 'anthropic.claude-3-sonnet-20240229-v1:0'))
+ROUTING_FAST_MAX_SCORE = float(os.getenv('ROUTING_FAST_MAX_SCORE', '12'))
+ROUTING_LOCAL_MAX_SCORE = float(os.getenv('ROUTING_LOCAL_MAX_SCORE', '3'))
+
+BATCH_MODEL_ID = os.getenv('BATCH_MODEL_ID', THOROUGH_MODEL_ID)
+BATCH_ROLE_ARN = os.getenv('BATCH_ROLE_ARN')
+BATCH_S3_URI = os.getenv('BATCH_S3_URI')
+BATCH_POLL_INTERVAL = 30
+
+SINGLEFLIGHT_DIR = os.getenv('SINGLEFLIGHT_DIR', os.path.join(tempfile.gettempdir(), 'cookielens-inflight')) or None
+SINGLEFLIGHT_RESULT_TTL = 60
+
+ADMISSION_MAX_SCANS = int(os.getenv('ADMISSION_MAX_SCANS', '4'))
+ADMISSION_MAX_SCAN_QUEUE = int(os.getenv('ADMISSION_MAX_SCAN_QUEUE', '16'))
+ADMISSION_MAX_EVALUATIONS = int(os.getenv('ADMISSION_MAX_EVALUATIONS', '32'))
+ADMISSION_MAX_EVALUATION_QUEUE = int(os.getenv('ADMISSION_MAX_EVALUATION_QUEUE', '64'))
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv('ADMISSION_QUEUE_TIMEOUT', '30'))
+
+RESPONSE_COMPRESSION_MIN_SIZE = int(os.getenv('RESPONSE_COMPRESSION_MIN_SIZE', '1024'))
+RESPONSE_GZIP_LEVEL = int(os.getenv('RESPONSE_GZIP_LEVEL', '6'))
+RESPONSE_BROTLI_QUALITY = int(os.getenv('RESPONSE_BROTLI_QUALITY', '5'))
+
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+LOG_SAMPLE_RATE = float(os.getenv('LOG_SAMPLE_RATE', '1'))
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', '10000'))
+
+TRACING_EXPORTER = os.getenv('TRACING_EXPORTER', '').lower()
+TRACING_FILE = os.getenv('TRACING_FILE', 'traces.jsonl')
+TRACING_SERVICE_NAME = os.getenv('TRACING_SERVICE_NAME', 'cookielens')
+
+# SQLite files shared by API workers and job workers; kept out of the source tree
+DATA_DIR = os.getenv('COOKIELENS_DATA_DIR', os.path.join(tempfile.gettempdir(), 'cookielens'))
+
+RESULT_CACHE_PATH = os.getenv('RESULT_CACHE_PATH', os.path.join(DATA_DIR, 'results.db')) or None
+RESULT_CACHE_MAX_AGE = float(os.getenv('RESULT_CACHE_MAX_AGE', '300'))
+RESULT_CACHE_MEMORY_ENTRIES = 256
+RESULT_CACHE_RETENTION = 86400
+
+JOBS_DB_PATH = os.getenv('JOBS_DB_PATH', os.path.join(DATA_DIR, 'jobs.db'))
+JOBS_ASYNC_DEFAULT = os.getenv('JOBS_ASYNC_DEFAULT', '').lower() in ('1', 'true', 'yes')
+JOBS_VISIBILITY_TIMEOUT = float(os.getenv('JOBS_VISIBILITY_TIMEOUT', '120'))
+JOBS_MAX_ATTEMPTS = int(os.getenv('JOBS_MAX_ATTEMPTS', '3'))
+JOBS_RETRY_BASE = 5
+JOBS_RETRY_MAX = 300
+JOBS_POLL_INTERVAL = 1.0
+
 BROWSER_ARGS = ["--no-sandbox"]
 
@@ -0,0 +1,173 @@
+import json
+import os
+import re
+import threading
+from config import COOKIE_MEMO_PATH
+
+ANY_DOMAIN = '*'
+
+# name pattern -> (purpose, category, risk); patterns ending in '*' match a name prefix
+SEED_COOKIES = {
+    '_ga': ('Distinguishes users for Google Analytics', 'Analytics', 'low'),
+    '_ga_*': ('Persists Google Analytics 4 session state', 'Analytics', 'low'),
+    '_gid': ('Distinguishes users for 24 hours', 'Analytics', 'low'),
+    '_gat': ('Throttles Google Analytics request rate', 'Analytics', 'low'),
+    '_gat_*': ('Throttles Google Analytics request rate', 'Analytics', 'low'),
+    '_gcl_au': ('Google Ads conversion linking', 'Advertising', 'medium'),
+    '_fbp': ('Facebook pixel browser identifier', 'Advertising', 'medium'),
+    '_fbc': ('Facebook click identifier', 'Advertising', 'medium'),
+    'fr': ('Facebook ad delivery and measurement', 'Advertising', 'medium'),
+    '_rdt_uuid': ('Reddit pixel browser identifier', 'Advertising', 'medium'),
+    '_uetsid': ('Microsoft Ads session identifier', 'Advertising', 'medium'),
+    '_uetvid': ('Microsoft Ads visitor identifier', 'Advertising', 'medium'),
+    '_ttp': ('TikTok pixel browser identifier', 'Advertising', 'medium'),
+    '_pin_unauth': ('Pinterest tag visitor identifier', 'Advertising', 'medium'),
+    'ide': ('DoubleClick ad targeting', 'Advertising', 'medium'),
+    '_hjsessionuser_*': ('Hotjar user identifier', 'Analytics', 'low'),
+    '_hjsession_*': ('Hotjar session data', 'Analytics', 'low'),
+    '_clck': ('Microsoft Clarity user identifier', 'Analytics', 'low'),
+    '_clsk': ('Microsoft Clarity session identifier', 'Analytics', 'low'),
+    'ajs_anonymous_id': ('Segment anonymous visitor identifier', 'Analytics', 'low'),
+    '__cf_bm': ('Cloudflare bot management', 'Necessary', 'low'),
+    'cf_clearance': ('Cloudflare challenge clearance', 'Necessary', 'low'),
+    '__stripe_mid': ('Stripe fraud prevention', 'Necessary', 'low'),
+    '__stripe_sid': ('Stripe fraud prevention', 'Necessary', 'low'),
+    'optanonconsent': ('OneTrust consent state', 'Necessary', 'low'),
+    'optanonalertboxclosed': ('OneTrust banner dismissal', 'Necessary', 'low'),
+    'cookieconsent_status': ('Cookie banner consent state', 'Necessary', 'low'),
+    'browserid': ('Salesforce browser identifier', 'Functional', 'low'),
+}
+
+_ID_SEGMENT = re.compile(r'[_.\-](?=[\w\-]*\d)([0-9a-fA-F\-]{6,}|[0-9A-Z]{6,}|\d+)$')
+_CLASSIFICATION_BLOCK = re.compile(r'```json\s*(\[.*?\])\s*```\s*$', re.S)
+# a block cut off by max_tokens: the fence opens and never closes
+_TRUNCATED_BLOCK = re.compile(r'```json(?:(?!```).)*\Z', re.S)
+
+
+def normalize_name(name):
+    """Collapse per-site ID suffixes (`_ga_1A2B3C4D`, `_hjSession_123`) into a `*` pattern."""
+    match = _ID_SEGMENT.search(name)
+    if match:
+        name = name[:match.start() + 1] + '*'
+    return name.lower()
+
+
+def normalize_domain(domain):
+    domain = (domain or '').lower().lstrip('.')
+    return domain[4:] if domain.startswith('www.') else domain
+
+
+def _prefix_pattern(name):
+    match = re.match(r'[_.\-]*[^_.\-]+[_.\-]', name)
+    return name[:match.end()].lower() + '*' if match else None
+
+
+class CookieClassificationStore:
+    def __init__(self, path=None, seed=SEED_COOKIES):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._seed_keys = set()
+        for pattern, (purpose, category, risk) in seed.items():
+            self._entries[(pattern, ANY_DOMAIN)] = {'purpose': purpose, 'category': category, 'risk': risk}
+            self._seed_keys.add((pattern, ANY_DOMAIN))
+        if path and os.path.exists(path):
+            self.load(path)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _candidates(self, name):
+        keys = [name.lower(), normalize_name(name)]
+        prefix = _prefix_pattern(name)
+        if prefix:
+            keys.append(prefix)
+        return keys
+
+    def lookup(self, name, domain=None):
+        domain = normalize_domain(domain)
+        patterns = self._candidates(name)
+        for scope in (domain, ANY_DOMAIN):
+            for pattern in patterns:
+                entry = self._entries.get((pattern, scope))
+                if entry:
+                    return entry
+        return None
+
+    def add(self, name, domain, purpose, category, risk, pattern=None):
+        if not (pattern and pattern.endswith('*') and name.lower().startswith(pattern[:-1].lower())):
+            pattern = normalize_name(name)
+        key = (pattern.lower(), normalize_domain(domain) or ANY_DOMAIN)
+        with self._lock:
+            self._entries[key] = {'purpose': purpose, 'category': category, 'risk': risk}
+
+    def partition(self, cookies):
+        known, unknown = [], []
+        for cookie in cookies:
+            entry = self.lookup(cookie.get('name', ''), cookie.get('domain'))
+            if entry:
+                known.append({'name': cookie.get('name'), **entry})
+            else:
+                unknown.append(cookie)
+        return known, unknown
+
+    def learn(self, cookies, classifications):
+        by_name = {c.get('name'): c for c in cookies}
+        learned = 0
+        for item in classifications:
+            cookie = by_name.get(item.get('name'))
+            if not cookie or not item.get('category'):
+                continue
+            self.add(
+                cookie['name'],
+                cookie.get('domain'),
+                item.get('purpose', ''),
+                item['category'],
+                str(item.get('risk', 'medium')).lower(),
+                pattern=item.get('pattern')
+            )
+            learned += 1
+        if learned and self.path:
+            self.save(self.path)
+        return learned
+
+    def load(self, path):
+        with open(path) as f:
+            rows = json.load(f)
+        with self._lock:
+            for row in rows:
+                self._entries[(row['pattern'], row['domain'])] = {
+                    'purpose': row['purpose'], 'category': row['category'], 'risk': row['risk']
+                }
+
+    def save(self, path):
+        with self._lock:
+            rows = [
+                {'pattern': pattern, 'domain': domain, **entry}
+                for (pattern, domain), entry in self._entries.items()
+                if (pattern, domain) not in self._seed_keys
+            ]
+        tmp = f"{path}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump(rows, f, indent=2)
+        os.replace(tmp, path)
+
+
+def split_classifications(text):
+    """Strip the trailing ```json classification block from a model answer.
+
+    A block truncated by max_tokens, or one that is not valid JSON, is dropped
+    without learning anything from it.
+    """
+    match = _CLASSIFICATION_BLOCK.search(text or '')
+    if not match:
+        truncated = _TRUNCATED_BLOCK.search(text or '')
+        return (text[:truncated.start()].rstrip(), []) if truncated else (text, [])
+    try:
+        items = json.loads(match.group(1))
+    except ValueError:
+        items = []
+    return text[:match.start()].rstrip(), [i for i in items if isinstance(i, dict)]
+
+
+COOKIE_MEMO = CookieClassificationStore(COOKIE_MEMO_PATH)
@@ -0,0 +1,170 @@
+"""Structured event logging: one JSON line per event, written off the request path.
+
+    log = get_logger('cookielens.scan')
+    with scan_context():
+        log.info('scan.started', url=url)      # {"ts": ..., "level": "info", "event": "scan.started",
+                                               #  "scan_id": "3f9c...", "url": ...}
+
+Records are formatted in the calling thread (so the scan ID and trace ID in
+context are captured) and handed to a QueueHandler; one listener thread does
+the blocking writes to stdout. A full queue drops the record and counts it
+instead of blocking a worker. Below WARNING, LOG_SAMPLE_RATE keeps that share
+of scans, decided per scan ID so a kept scan logs every step. Per-step detail
+is logged at DEBUG.
+"""
+import atexit
+import contextvars
+import hashlib
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+import time
+import uuid
+from contextlib import contextmanager
+from config import LOG_LEVEL, LOG_QUEUE_SIZE, LOG_SAMPLE_RATE
+from tracing import current_trace_id
+
+_scan_id = contextvars.ContextVar('cookielens_scan_id', default=None)
+# keyword arguments LoggerAdapter passes through to Logger.log
+_LOG_KWARGS = ('exc_info', 'stack_info', 'stacklevel', 'extra')
+
+
+def current_scan_id():
+    return _scan_id.get()
+
+
+@contextmanager
+def scan_context(scan_id=None):
+    """Tag every record logged inside the block with `scan_id`; an enclosing scan's ID is kept."""
+    if _scan_id.get() is not None and scan_id is None:
+        yield _scan_id.get()
+        return
+    token = _scan_id.set(scan_id or uuid.uuid4().hex[:16])
+    try:
+        yield _scan_id.get()
+    finally:
+        _scan_id.reset(token)
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        event = {
+            'ts': round(record.created, 3),
+            'level': record.levelname.lower(),
+            'logger': record.name,
+            'event': record.getMessage(),
+        }
+        scan_id = getattr(record, 'scan_id', None) or _scan_id.get()
+        if scan_id:
+            event['scan_id'] = scan_id
+        trace_id = current_trace_id()
+        if trace_id:
+            event['trace_id'] = trace_id
+        event.update(getattr(record, 'fields', None) or {})
+        if record.exc_info:
+            event['exception'] = self.formatException(record.exc_info)
+        return json.dumps(event, default=str, ensure_ascii=False)
+
+
+class SamplingFilter(logging.Filter):
+    """Keep `rate` of the scans below WARNING; warnings and errors always pass."""
+
+    def __init__(self, rate=1.0):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        if self.rate >= 1 or record.levelno >= logging.WARNING:
+            return True
+        scan_id = _scan_id.get()
+        if scan_id is None:
+            return random.random() < self.rate
+        bucket = int.from_bytes(hashlib.blake2b(scan_id.encode(), digest_size=4).digest(), 'big')
+        return bucket < self.rate * 2 ** 32
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that formats in the caller and drops records when the queue is full."""
+
+    def __init__(self, queue_):
+        super().__init__(queue_)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # the listener only writes the already formatted line
+        line = self.format(record)
+        record = logging.makeLogRecord({'msg': line, 'levelno': record.levelno, 'levelname': record.levelname,
+                                        'name': record.name, 'created': record.created})
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class EventLogger(logging.LoggerAdapter):
+    """`log.info('event.name', key=value, ...)`: keyword arguments become JSON fields."""
+
+    def process(self, msg, kwargs):
+        fields = {k: kwargs.pop(k) for k in list(kwargs) if k not in _LOG_KWARGS}
+        kwargs.setdefault('extra', {})['fields'] = fields
+        return msg, kwargs
+
+
+_handler = None
+_listener = None
+
+
+def configure(level=LOG_LEVEL, sample_rate=LOG_SAMPLE_RATE, stream=None, queue_size=LOG_QUEUE_SIZE):
+    """Route the `cookielens` loggers through the JSON queue handler (idempotent)."""
+    global _handler, _listener
+    logger = logging.getLogger('cookielens')
+    logger.setLevel(level.upper() if isinstance(level, str) else level)
+    logger.propagate = False
+    if _handler is not None:
+        _handler.filters[0].rate = sample_rate
+        return _handler
+    records = queue.Queue(queue_size)
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(logging.Formatter('%(message)s'))
+    _listener = logging.handlers.QueueListener(records, output)
+    _listener.start()
+    _handler = DroppingQueueHandler(records)
+    _handler.setFormatter(JsonFormatter())
+    _handler.addFilter(SamplingFilter(sample_rate))
+    logger.addHandler(_handler)
+    atexit.register(shutdown)
+    return _handler
+
+
+def flush(timeout=2.0):
+    """Wait until the listener has written everything queued so far (e.g. before a Lambda freeze)."""
+    if _handler is None:
+        return
+    deadline = time.monotonic() + timeout
+    while _handler.queue.unfinished_tasks and time.monotonic() < deadline:
+        time.sleep(0.005)
+
+
+def shutdown():
+    global _handler, _listener
+    if _listener is not None:
+        _listener.stop()
+        logging.getLogger('cookielens').removeHandler(_handler)
+        _handler = _listener = None
+
+
+def dropped():
+    return _handler.dropped if _handler is not None else 0
+
+
+def get_logger(name):
+    """An EventLogger under the `cookielens` hierarchy; call configure() once per process to emit JSON."""
+    if not name.startswith('cookielens'):
+        name = f'cookielens.{name}'
+    return EventLogger(logging.getLogger(name), {})
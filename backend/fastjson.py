@@ -0,0 +1,34 @@
+"""JSON encoding for scan results: orjson when it is installed, the stdlib otherwise.
+
+Scan results are plain dicts built by our own code, so responses carrying them
+skip FastAPI's response_model validation and jsonable_encoder walk: endpoints
+return a FastJSONResponse (or cached bytes) and keep `response_model` only for
+the OpenAPI schema. `bench_responses.py` compares the two paths.
+"""
+import json
+from starlette.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps(obj):
+    """`obj` as compact UTF-8 JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(obj, default=str, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':'), default=str).encode()
+
+
+def loads(data):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class FastJSONResponse(JSONResponse):
+    """A JSONResponse for trusted results: no validation, encoded by dumps(); bytes are sent as they are."""
+
+    def render(self, content):
+        return content if isinstance(content, bytes) else dumps(content)
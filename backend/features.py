@@ -0,0 +1,88 @@
+import time
+from datetime import datetime
+from urllib.parse import urlparse
+
+SHORT_LIVED_SECONDS = 30 * 24 * 3600
+
+# Playwright reports 'Strict'/'Lax'/'None'; the extension's chrome.cookies API 'strict'/'lax'/'no_restriction'/'unspecified'
+SAME_SITE_VALUES = {'strict': 'Strict', 'lax': 'Lax', 'none': 'None', 'no_restriction': 'None'}
+
+
+def scan_time(scan_data):
+    try:
+        return datetime.fromisoformat(scan_data['scannedAt'].rstrip('Z')).timestamp()
+    except (KeyError, TypeError, ValueError):
+        return time.time()
+
+
+def normalize_same_site(value):
+    """'Strict', 'Lax' or 'None' whatever the casing or source, None when unset ('unspecified')."""
+    return SAME_SITE_VALUES.get(str(value).lower()) if value else None
+
+
+def expiry_class(expires, now):
+    if expires is None or expires < 0:
+        return 'session'
+    return 'short' if expires - now <= SHORT_LIVED_SECONDS else 'long'
+
+
+def is_first_party(cookie_domain, site_host):
+    domain = (cookie_domain or '').lower().lstrip('.')
+    if not domain or not site_host:
+        return True
+    return site_host == domain or site_host.endswith('.' + domain) or domain.endswith('.' + site_host)
+
+
+def extract_features(scan_data):
+    """Walk the cookie list once; every framework and control reads the result."""
+    cookies = scan_data.get('cookies', [])
+    third_parties = scan_data.get('thirdParties', [])
+    host = (urlparse(scan_data.get('url') or '').hostname or '').lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    now = scan_time(scan_data)
+
+    rows = []
+    insecure, session_cookies, session_non_httponly, no_samesite = [], [], [], []
+    expiry = {'session': 0, 'short': 0, 'long': 0}
+    first_party = 0
+
+    for cookie in cookies:
+        name = cookie.get('name', '')
+        lowered = name.lower()
+        row = {
+            'name': name,
+            'domain': cookie.get('domain', ''),
+            'secure': bool(cookie.get('secure')),
+            'http_only': bool(cookie.get('httpOnly')),
+            'same_site': normalize_same_site(cookie.get('sameSite')),
+            'session_named': 'session' in lowered or 'auth' in lowered,
+            'expiry': expiry_class(cookie.get('expires'), now),
+            'first_party': is_first_party(cookie.get('domain'), host),
+        }
+        rows.append(row)
+
+        if not row['secure']:
+            insecure.append(name)
+        if row['session_named']:
+            session_cookies.append(name)
+            if not row['http_only']:
+                session_non_httponly.append(name)
+        if not row['same_site']:
+            no_samesite.append(name)
+        expiry[row['expiry']] += 1
+        first_party += row['first_party']
+
+    return {
+        'rows': rows,
+        'cookie_count': len(rows),
+        'insecure': insecure,
+        'session_cookies': session_cookies,
+        'session_non_httponly': session_non_httponly,
+        'no_samesite': no_samesite,
+        'expiry': expiry,
+        'first_party_cookies': first_party,
+        'third_party_cookies': len(rows) - first_party,
+        'third_parties': list(third_parties),
+        'third_party_count': len(third_parties),
+    }
@@ -0,0 +1,127 @@
+"""Previous scan per site, and the diff between it and a re-scan.
+
+A re-scan usually changes only a few cookies or third parties. The diff says what
+changed; rule outcomes whose features did not change are carried over, and the AI
+summary is reused when nothing material changed.
+"""
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from config import SCAN_HISTORY_DIR, SCAN_HISTORY_MAX_ENTRIES
+from features import expiry_class, normalize_same_site, scan_time
+from urlcanon import site_key
+
+
+def cookie_key(cookie):
+    return cookie.get('name', ''), (cookie.get('domain') or '').lower().lstrip('.'), cookie.get('path') or '/'
+
+
+def _cookie_state(cookie, now):
+    # values and absolute expiry timestamps change on every visit; compare what the rules look at
+    return {
+        'secure': bool(cookie.get('secure')),
+        'httpOnly': bool(cookie.get('httpOnly')),
+        'sameSite': normalize_same_site(cookie.get('sameSite')),
+        'expiry': expiry_class(cookie.get('expires'), now),
+    }
+
+
+def diff_scans(previous, current):
+    """Added, removed and changed cookies and third parties between two scans of one site."""
+    old_now, new_now = scan_time(previous), scan_time(current)
+    old = {cookie_key(c): _cookie_state(c, old_now) for c in previous.get('cookies', [])}
+    new = {cookie_key(c): _cookie_state(c, new_now) for c in current.get('cookies', [])}
+
+    def describe(key):
+        name, domain, path = key
+        return {'name': name, 'domain': domain, 'path': path}
+
+    changed = []
+    for key in old.keys() & new.keys():
+        fields = {f: [old[key][f], new[key][f]] for f in new[key] if old[key][f] != new[key][f]}
+        if fields:
+            changed.append({**describe(key), 'fields': fields})
+
+    old_parties, new_parties = set(previous.get('thirdParties', [])), set(current.get('thirdParties', []))
+    cookies = {
+        'added': [describe(k) for k in sorted(new.keys() - old.keys())],
+        'removed': [describe(k) for k in sorted(old.keys() - new.keys())],
+        'changed': sorted(changed, key=lambda c: (c['name'], c['domain'], c['path'])),
+    }
+    third_parties = {
+        'added': sorted(new_parties - old_parties),
+        'removed': sorted(old_parties - new_parties),
+    }
+    return {
+        'previous_scan_at': previous.get('scannedAt'),
+        'cookies': cookies,
+        'third_parties': third_parties,
+        'material': any(cookies.values()) or any(third_parties.values()),
+    }
+
+
+def changed_features(old, new):
+    return {name for name, value in new.items() if old.get(name) != value}
+
+
+def reusable_outcomes(previous_outcomes, changed, engine):
+    """Rule outcomes from the previous scan whose inputs are unchanged."""
+    return {
+        rule_id: outcome for rule_id, outcome in previous_outcomes.items()
+        if rule_id in engine.rules and not engine.rules[rule_id].depends & changed
+    }
+
+
+class ScanHistory:
+    """Latest scan per site (urlcanon.site_key), kept in memory and optionally one JSON file per site."""
+
+    def __init__(self, directory=None, max_entries=SCAN_HISTORY_MAX_ENTRIES):
+        self.directory = directory
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, hashlib.sha1(key.encode()).hexdigest() + '.json')
+
+    def get(self, url):
+        key = site_key(url)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+        if not self.directory:
+            return None
+        try:
+            with open(self._path(key)) as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        self._remember(key, entry)
+        return entry
+
+    def put(self, url, entry):
+        key = site_key(url)
+        self._remember(key, entry)
+        if self.directory:
+            path = self._path(key)
+            # concurrent runs for one site (other frameworks, or with and without www.) can't coalesce
+            tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, 'w') as f:
+                json.dump({'key': key, **entry}, f)
+            os.replace(tmp, path)
+
+    def _remember(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+HISTORY = ScanHistory(SCAN_HISTORY_DIR)
@@ -0,0 +1,192 @@
+"""Durable job queue in SQLite.
+
+The API enqueues a job and answers 202 with its ID; worker processes (worker.py)
+lease jobs one at a time. A lease is only valid until its visibility timeout, so
+a job whose worker dies is picked up again; failures are retried with backoff
+until `max_attempts`, then the job is marked failed.
+"""
+import json
+import os
+import random
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from config import JOBS_DB_PATH, JOBS_MAX_ATTEMPTS, JOBS_RETRY_BASE, JOBS_RETRY_MAX, JOBS_VISIBILITY_TIMEOUT
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    available_at REAL NOT NULL,
+    lease_owner TEXT,
+    lease_expires REAL,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (status, available_at);
+"""
+
+QUEUED, RUNNING, SUCCEEDED, FAILED = 'queued', 'running', 'succeeded', 'failed'
+
+
+def retry_delay(attempt, base=JOBS_RETRY_BASE, cap=JOBS_RETRY_MAX):
+    return random.uniform(0, min(cap, base * 2 ** (attempt - 1)))
+
+
+class JobQueue:
+    def __init__(self, path=JOBS_DB_PATH, visibility_timeout=JOBS_VISIBILITY_TIMEOUT, max_attempts=JOBS_MAX_ATTEMPTS):
+        self.path = path
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        self._local = threading.local()
+
+    def _db(self):
+        # one connection per thread; sqlite3 connections can't be shared across threads
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            # opened on first use, so importing the API doesn't create the file
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            db.row_factory = sqlite3.Row
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=NORMAL')
+            db.executescript(SCHEMA)
+            self._local.db = db
+        return db
+
+    def _connect(self):
+        return _Transaction(self._db())
+
+    def enqueue(self, kind, payload, max_attempts=None):
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._connect() as db:
+            db.execute(
+                "INSERT INTO jobs (id, kind, payload, status, max_attempts, available_at, created_at, updated_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, kind, json.dumps(payload), QUEUED, max_attempts or self.max_attempts, now, now, now)
+            )
+        return job_id
+
+    def lease(self, kinds, owner):
+        """Claim the oldest runnable job of one of `kinds`, or return None."""
+        now = time.time()
+        marks = ','.join('?' * len(kinds))
+        with self._connect() as db:
+            while True:
+                row = db.execute(
+                    f"SELECT * FROM jobs WHERE kind IN ({marks}) AND ("
+                    f" (status = ? AND available_at <= ?) OR (status = ? AND lease_expires <= ?))"
+                    f" ORDER BY available_at LIMIT 1",
+                    (*kinds, QUEUED, now, RUNNING, now)
+                ).fetchone()
+                if row is None:
+                    return None
+                if row['status'] == RUNNING and row['attempts'] >= row['max_attempts']:
+                    # its last worker died mid-run; don't hand it out again
+                    db.execute("UPDATE jobs SET status = ?, error = ?, lease_owner = NULL, updated_at = ? WHERE id = ?",
+                               (FAILED, 'lease expired on final attempt', now, row['id']))
+                    continue
+                db.execute(
+                    "UPDATE jobs SET status = ?, attempts = attempts + 1, lease_owner = ?, lease_expires = ?,"
+                    " updated_at = ? WHERE id = ?",
+                    (RUNNING, owner, now + self.visibility_timeout, now, row['id'])
+                )
+                return {'id': row['id'], 'kind': row['kind'], 'payload': json.loads(row['payload']),
+                        'attempts': row['attempts'] + 1}
+
+    def heartbeat(self, job_id, owner):
+        """Extend a lease; False means it was lost (expired and taken by another worker)."""
+        with self._connect() as db:
+            cursor = db.execute(
+                "UPDATE jobs SET lease_expires = ?, updated_at = ? WHERE id = ? AND lease_owner = ? AND status = ?",
+                (time.time() + self.visibility_timeout, time.time(), job_id, owner, RUNNING)
+            )
+            return cursor.rowcount == 1
+
+    def complete(self, job_id, owner, result):
+        with self._connect() as db:
+            cursor = db.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = NULL, lease_owner = NULL, updated_at = ?"
+                " WHERE id = ? AND lease_owner = ? AND status = ?",
+                (SUCCEEDED, json.dumps(result), time.time(), job_id, owner, RUNNING)
+            )
+            return cursor.rowcount == 1
+
+    def fail(self, job_id, owner, error):
+        now = time.time()
+        with self._connect() as db:
+            row = db.execute("SELECT attempts, max_attempts FROM jobs WHERE id = ? AND lease_owner = ? AND status = ?",
+                             (job_id, owner, RUNNING)).fetchone()
+            if row is None:
+                return False
+            if row['attempts'] < row['max_attempts']:
+                db.execute(
+                    "UPDATE jobs SET status = ?, error = ?, lease_owner = NULL, available_at = ?, updated_at = ?"
+                    " WHERE id = ?",
+                    (QUEUED, error, now + retry_delay(row['attempts']), now, job_id)
+                )
+            else:
+                db.execute("UPDATE jobs SET status = ?, error = ?, lease_owner = NULL, updated_at = ? WHERE id = ?",
+                           (FAILED, error, now, job_id))
+            return True
+
+    def get(self, job_id):
+        row = self._db().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = {
+            'id': row['id'],
+            'kind': row['kind'],
+            'status': row['status'],
+            'attempts': row['attempts'],
+            'created_at': row['created_at'],
+            'updated_at': row['updated_at'],
+        }
+        if row['error']:
+            job['error'] = row['error']
+        if row['status'] == SUCCEEDED:
+            job['result'] = json.loads(row['result'])
+        return job
+
+    def stats(self):
+        rows = self._db().execute("SELECT kind, status, COUNT(*) AS n FROM jobs GROUP BY kind, status").fetchall()
+        stats = {}
+        for row in rows:
+            stats.setdefault(row['kind'], {})[row['status']] = row['n']
+        return stats
+
+
+class _Transaction:
+    """BEGIN IMMEDIATE ... COMMIT, so a lease's SELECT and UPDATE are one atomic step across processes."""
+
+    def __init__(self, db):
+        self.db = db
+
+    def __enter__(self):
+        self.db.execute('BEGIN IMMEDIATE')
+        return self.db
+
+    def __exit__(self, exc_type, exc, tb):
+        self.db.execute('ROLLBACK' if exc_type else 'COMMIT')
+
+
+def job_accepted(job_id):
+    return {'job_id': job_id, 'status': QUEUED, 'status_url': f"/jobs/{job_id}"}
+
+
+def wants_async(prefer_header, default=False):
+    """RFC 7240 `Prefer: respond-async` opts a request into the job queue."""
+    return default or 'respond-async' in (prefer_header or '').lower()
+
+
+def default_owner():
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
@@ -0,0 +1,225 @@
+"""Prometheus metrics, rendered in the text exposition format by GET /metrics.
+
+A small in-process registry instead of a client library: counters, gauges and
+histograms with labels, each child guarded by its own lock. Recording is a
+dict lookup, a bisect and a locked add, so it stays on in production
+(`bench_metrics.py` measures the overhead). Values are per process; scrape each
+uvicorn worker, or run one worker per port.
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+import tracing
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+STAGE_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 40, 80]
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [*zip(names, values), *extra]
+    if not pairs:
+        return ''
+    escaped = (str(v).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n') for _, v in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labels=(), registry=REGISTRY):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labels)
+        self._children = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self._children[()] = self._child()
+        registry.register(self)
+
+    def labels(self, *values):
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} takes labels {self.labelnames}, got {values}")
+            with self._lock:
+                child = self._children.setdefault(values, self._child())
+        return child
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for values, child in sorted(self._children.items()):
+            lines.extend(child.samples(self.name, self.labelnames, values))
+        return lines
+
+
+class _Value:
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount=1):
+        with self._lock:
+            self.value -= amount
+
+    def set(self, value):
+        self.value = value
+
+    def samples(self, name, labelnames, values):
+        return [f"{name}{_format_labels(labelnames, values)} {_format_value(self.value)}"]
+
+
+class Counter(_Metric):
+    kind = 'counter'
+    _child = _Value
+
+    def inc(self, amount=1):
+        self._children[()].inc(amount)
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+    _child = _Value
+
+    def inc(self, amount=1):
+        self._children[()].inc(amount)
+
+    def dec(self, amount=1):
+        self._children[()].dec(amount)
+
+    def set(self, value):
+        self._children[()].set(value)
+
+    @contextmanager
+    def track(self):
+        """+1 for the duration of the block."""
+        self.inc()
+        try:
+            yield
+        finally:
+            self.dec()
+
+
+class _Buckets:
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        i = bisect.bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.total += value
+
+    def samples(self, name, labelnames, values):
+        with self._lock:
+            counts, total = list(self.counts), self.total
+        lines, cumulative = [], 0
+        for bound, count in zip(self.bounds + [float('inf')], counts):
+            cumulative += count
+            labels = _format_labels(labelnames, values, [('le', _format_value(bound))])
+            lines.append(f"{name}_bucket{labels} {cumulative}")
+        labels = _format_labels(labelnames, values)
+        lines.append(f"{name}_sum{labels} {_format_value(round(total, 6))}")
+        lines.append(f"{name}_count{labels} {cumulative}")
+        return lines
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labels=(), buckets=STAGE_BUCKETS, registry=REGISTRY):
+        self.buckets = sorted(buckets)
+        super().__init__(name, documentation, labels, registry)
+
+    def _child(self):
+        return _Buckets(self.buckets)
+
+    def observe(self, value):
+        self._children[()].observe(value)
+
+
+STAGE_SECONDS = Histogram('cookielens_stage_duration_seconds',
+                          'Duration of scan stages (browser_launch, navigation, cookie_extraction, '
+                          'storage_extraction, compliance_evaluation, bedrock_call, s3_upload)', ['stage'])
+SCANS = Counter('cookielens_scans_total', 'Browser scans by outcome', ['outcome'])
+ERRORS = Counter('cookielens_errors_total', 'Errors by stage and exception type', ['stage', 'type'])
+CACHE_REQUESTS = Counter('cookielens_cache_requests_total', 'Result cache lookups by result', ['result'])
+SCANS_IN_FLIGHT = Gauge('cookielens_scans_in_flight', 'Browser scans currently running')
+BROWSERS_OPEN = Gauge('cookielens_browsers_open', 'Chromium instances currently open')
+
+
+class stage:
+    """Time a scan stage, as a histogram sample and a `scan.<name>` trace span;
+    an exception is counted under the stage and re-raised.
+
+    A plain class rather than @contextmanager: it is entered several times per scan.
+    """
+    __slots__ = ('name', 'started', '_span')
+
+    def __init__(self, name):
+        self.name = name
+        self._span = tracing.span(f"scan.{name}")
+
+    def __enter__(self):
+        self._span.__enter__()
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None and issubclass(exc_type, Exception):
+            ERRORS.labels(self.name, exc_type.__name__).inc()
+        STAGE_SECONDS.labels(self.name).observe(time.perf_counter() - self.started)
+        self._span.__exit__(exc_type, exc, tb)
+        return False
+
+
+@contextmanager
+def track_scan():
+    """Count a whole scan by outcome and keep it in the in-flight gauge while it runs (under a `scan` span)."""
+    SCANS_IN_FLIGHT.inc()
+    try:
+        with tracing.span('scan'):
+            yield
+    except Exception:
+        SCANS.labels('error').inc()
+        raise
+    else:
+        SCANS.labels('success').inc()
+    finally:
+        SCANS_IN_FLIGHT.dec()
+
+
+def browser_open():
+    """Keep a launched browser in the open-browsers gauge until the block exits."""
+    return BROWSERS_OPEN.track()
@@ -0,0 +1,114 @@
+"""Slimmer views of scan responses for clients that only show a summary.
+
+    ?profile=compact   cookie values and localStorage values replaced by a hash and a length
+    ?profile=summary   no cookie, localStorage or third-party lists, only their aggregates
+    ?include=cookies   with either profile, keep these sections as scanned
+    ?fields=url,summary,scan_results.humanReadableAnalysis
+                       only these (dotted) fields of the response
+
+Both profiles add `summary` (counts, flag totals, storage size) to the scan. On
+compliance responses the profile applies to `scan_results`. Views are built
+from the cached full result, so they share its cache entry and freshness.
+"""
+import hashlib
+from collections import Counter
+from fastjson import dumps
+from resultcache import CacheEntry, etag_for
+
+PROFILES = ('full', 'compact', 'summary')
+SECTIONS = ('cookies', 'localStorage', 'thirdParties')
+
+
+def split_list(value):
+    return [item.strip() for item in (value or '').split(',') if item.strip()]
+
+
+def parse_view(profile='full', fields=None, include=None):
+    """A view for project(), or None for the full response; ValueError for an unknown profile or section."""
+    if profile not in PROFILES:
+        raise ValueError(f"unknown profile {profile!r}; expected one of {', '.join(PROFILES)}")
+    include = split_list(include)
+    unknown = [section for section in include if section not in SECTIONS]
+    if unknown:
+        raise ValueError(f"cannot include {unknown}; expected some of {', '.join(SECTIONS)}")
+    fields = split_list(fields)
+    if profile == 'full' and not fields:
+        return None
+    return {'profile': profile, 'fields': fields, 'include': include}
+
+
+def digest(value):
+    return hashlib.sha256(str(value).encode()).hexdigest()[:16]
+
+
+def scan_summary(scan):
+    cookies = scan.get('cookies') or []
+    storage = scan.get('localStorage') or {}
+    return {
+        'cookieCount': len(cookies),
+        'sessionCookies': sum(1 for c in cookies if c.get('expires', -1) in (-1, None)),
+        'secureCookies': sum(1 for c in cookies if c.get('secure')),
+        'httpOnlyCookies': sum(1 for c in cookies if c.get('httpOnly')),
+        'sameSite': dict(Counter(c.get('sameSite') or 'unset' for c in cookies)),
+        'cookieDomains': len({c.get('domain') for c in cookies}),
+        'localStorageItems': len(storage),
+        'localStorageBytes': sum(len(str(k)) + len(str(v)) for k, v in storage.items()),
+        'thirdPartyCount': len(scan.get('thirdParties') or []),
+    }
+
+
+def slim_scan(scan, profile, include=()):
+    slim = {**scan, 'summary': scan_summary(scan)}
+    if profile == 'summary':
+        for section in SECTIONS:
+            if section not in include:
+                slim.pop(section, None)
+        return slim
+    if 'cookies' not in include:
+        slim['cookies'] = [
+            {**{k: v for k, v in cookie.items() if k != 'value'},
+             'valueHash': digest(cookie.get('value', '')), 'valueLength': len(cookie.get('value') or '')}
+            for cookie in scan.get('cookies') or []
+        ]
+    if 'localStorage' not in include:
+        slim['localStorage'] = {key: {'valueHash': digest(value), 'valueLength': len(str(value))}
+                                for key, value in (scan.get('localStorage') or {}).items()}
+    return slim
+
+
+def select(document, fields):
+    """The dotted `fields` of `document`; missing ones are left out."""
+    selected = {}
+    fields = set(fields)
+    for path in fields:
+        *parents, leaf = path.split('.')
+        if any('.'.join(parents[:i]) in fields for i in range(1, len(parents) + 1)):
+            continue  # an enclosing field is selected whole
+        source = document
+        for key in parents:
+            source = source.get(key) if isinstance(source, dict) else None
+        if not isinstance(source, dict) or leaf not in source:
+            continue
+        target = selected
+        for key in parents:
+            target = target.setdefault(key, {})
+        target[leaf] = source[leaf]
+    return selected
+
+
+def project(document, profile='full', fields=(), include=()):
+    if profile != 'full':
+        if isinstance(document.get('scan_results'), dict):
+            document = {**document, 'scan_results': slim_scan(document['scan_results'], profile, include)}
+        elif 'cookies' in document:
+            document = slim_scan(document, profile, include)
+    return select(document, fields) if fields else document
+
+
+def project_entry(entry, view):
+    """`entry` as seen through `view`, with its own body and ETag but the same age."""
+    if view is None:
+        return entry
+    result = project(entry.result, **view)
+    body = dumps(result)
+    return CacheEntry(body, etag_for(body), entry.stored_at, result)
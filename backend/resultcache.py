@@ -0,0 +1,204 @@
+"""Scan result cache with HTTP freshness control.
+
+Two tiers: an in-process LRU, then a SQLite file shared by every uvicorn worker
+on the host. An entry is fresh for `max_age` seconds; a client may accept an
+older one with `max_stale` or skip the cache with `force_refresh` (or the
+matching `Cache-Control` request directives). Entries keep their serialised
+body (JSON bytes, see fastjson) and a content ETag, so hits are answered
+without re-serialising and conditional GETs with 304.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from email.utils import formatdate, parsedate_to_datetime
+from config import RESULT_CACHE_MAX_AGE, RESULT_CACHE_MEMORY_ENTRIES, RESULT_CACHE_PATH, RESULT_CACHE_RETENTION
+from fastjson import dumps, loads
+from metrics import CACHE_REQUESTS
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    body BLOB NOT NULL,
+    etag TEXT NOT NULL,
+    stored_at REAL NOT NULL
+)
+"""
+
+PRUNE_EVERY = 100
+
+
+class CacheEntry:
+    __slots__ = ('body', 'etag', 'stored_at', '_result')
+
+    def __init__(self, body, etag, stored_at, result=None):
+        # rows written before bodies were bytes hold text
+        self.body = body.encode() if isinstance(body, str) else body
+        self.etag = etag
+        self.stored_at = stored_at
+        self._result = result
+
+    @property
+    def result(self):
+        if self._result is None:
+            self._result = loads(self.body)
+        return self._result
+
+    def age(self, now=None):
+        return max(0.0, (now or time.time()) - self.stored_at)
+
+
+class ResultCache:
+    def __init__(self, path=RESULT_CACHE_PATH, max_age=RESULT_CACHE_MAX_AGE, max_entries=RESULT_CACHE_MEMORY_ENTRIES,
+                 retention=RESULT_CACHE_RETENTION):
+        """`path` is the shared SQLite tier; None keeps results in this process only."""
+        self.path = path
+        self.max_age = max_age
+        self.max_entries = max_entries
+        self.retention = retention
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._counts = {'hits': 0, 'stale_hits': 0, 'shared_hits': 0, 'misses': 0, 'refreshes': 0}
+        self._puts = 0
+
+    def _db(self):
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            # opened on first use, so importing the API doesn't create the file
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=NORMAL')
+            db.execute(SCHEMA)
+            self._local.db = db
+        return db
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+        if not self.path:
+            return None
+        row = self._db().execute("SELECT body, etag, stored_at FROM results WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        entry = CacheEntry(*row)
+        self._remember(key, entry)
+        with self._lock:
+            self._counts['shared_hits'] += 1
+        return entry
+
+    def put(self, key, result):
+        entry = entry_for(result)
+        self._remember(key, entry)
+        if self.path:
+            db = self._db()
+            db.execute("INSERT OR REPLACE INTO results (key, body, etag, stored_at) VALUES (?, ?, ?, ?)",
+                       (key, entry.body, entry.etag, entry.stored_at))
+            self._puts += 1
+            if self._puts % PRUNE_EVERY == 0:
+                db.execute("DELETE FROM results WHERE stored_at < ?", (time.time() - self.retention,))
+        return entry
+
+    def _remember(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_or_compute(self, key, compute, max_age=None, max_stale=0, force_refresh=False, cacheable=None):
+        """Return (entry, status): 'hit', 'stale' (served within max_stale), 'miss' or 'refresh'.
+
+        A computed result for which `cacheable(result)` is false is returned without being stored.
+        """
+        entry = None if force_refresh else self.get(key)
+        if entry is not None:
+            fresh_for = self.max_age if max_age is None else min(max_age, self.max_age)
+            age = entry.age()
+            status = 'hit' if age <= fresh_for else 'stale' if age <= fresh_for + max_stale else None
+            if status:
+                with self._lock:
+                    self._counts['hits' if status == 'hit' else 'stale_hits'] += 1
+                CACHE_REQUESTS.labels(status).inc()
+                return entry, status
+        status = 'refresh' if force_refresh else 'miss'
+        with self._lock:
+            self._counts['refreshes' if force_refresh else 'misses'] += 1
+        CACHE_REQUESTS.labels(status).inc()
+        result = compute()
+        if cacheable is not None and not cacheable(result):
+            return entry_for(result), status
+        return self.put(key, result), status
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+        if self.path:
+            self._db().execute("DELETE FROM results WHERE key = ?", (key,))
+
+    def stats(self):
+        with self._lock:
+            counts = dict(self._counts)
+            counts['memory_entries'] = len(self._entries)
+        served = counts['hits'] + counts['stale_hits']
+        total = served + counts['misses'] + counts['refreshes']
+        counts['hit_rate'] = round(served / total, 4) if total else 0.0
+        counts['max_age'] = self.max_age
+        return counts
+
+
+def entry_for(result):
+    body = dumps(result)
+    return CacheEntry(body, etag_for(body), time.time(), result)
+
+
+def etag_for(body):
+    return hashlib.sha256(body).hexdigest()[:32]
+
+
+def freshness(cache_control=None, max_stale=None, force_refresh=False):
+    """Merge query parameters with Cache-Control request directives into get_or_compute() keyword arguments."""
+    policy = {'max_age': None, 'max_stale': max_stale or 0, 'force_refresh': bool(force_refresh)}
+    for directive in (cache_control or '').lower().split(','):
+        name, _, value = directive.strip().partition('=')
+        if name in ('no-cache', 'no-store'):
+            policy['force_refresh'] = True
+        elif name == 'max-age' and value.isdigit():
+            policy['max_age'] = int(value)
+            if int(value) == 0:
+                policy['force_refresh'] = True
+        elif name == 'max-stale':
+            # bare max-stale means any staleness is acceptable
+            policy['max_stale'] = max(policy['max_stale'], int(value) if value.isdigit() else float('inf'))
+    return policy
+
+
+def cache_headers(entry, status, max_age):
+    age = int(entry.age())
+    return {
+        'ETag': f'"{entry.etag}"',
+        'Last-Modified': formatdate(entry.stored_at, usegmt=True),
+        'Cache-Control': f"max-age={max(0, int(max_age) - age)}",
+        'Age': str(age),
+        'X-Cache': status.upper(),
+    }
+
+
+def not_modified(entry, if_none_match=None, if_modified_since=None):
+    """True when a conditional request's validators still match `entry`."""
+    if if_none_match:
+        tags = {tag.strip().removeprefix('W/').strip('"') for tag in if_none_match.split(',')}
+        return '*' in tags or entry.etag in tags
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+        return int(entry.stored_at) <= since
+    return False
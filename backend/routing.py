@@ -0,0 +1,112 @@
+import bisect
+import threading
+from collections import deque
+from config import FAST_MODEL_ID, THOROUGH_MODEL_ID, ROUTING_FAST_MAX_SCORE, ROUTING_LOCAL_MAX_SCORE
+
+# complexity weights per scan feature
+WEIGHTS = {
+    'unknown_cookies': 1.0,
+    'known_cookies': 0.25,
+    'third_parties': 2.0,
+    'local_storage': 0.5,
+}
+
+LATENCY_BUCKETS = [0.25, 0.5, 1, 2, 4, 8, 16, 32, 64]
+
+
+class LatencyHistogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = list(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+
+    def percentile(self, q):
+        """Upper bound of the bucket holding the q-th quantile (None until observed)."""
+        if not self.count:
+            return None
+        target, seen = q * self.count, 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= target:
+                return self.buckets[i] if i < len(self.buckets) else float('inf')
+
+    def snapshot(self):
+        return {
+            'count': self.count,
+            'sum': round(self.total, 3),
+            'buckets': {str(b): n for b, n in zip(self.buckets + ['+Inf'], self.counts)},
+            'p50': self.percentile(0.5),
+            'p95': self.percentile(0.95),
+        }
+
+
+def complexity_score(scan_data, unknown_cookies=None):
+    cookies = scan_data.get('cookies', [])
+    unknown = len(cookies) if unknown_cookies is None else len(unknown_cookies)
+    return (
+        WEIGHTS['unknown_cookies'] * unknown
+        + WEIGHTS['known_cookies'] * (len(cookies) - unknown)
+        + WEIGHTS['third_parties'] * len(scan_data.get('thirdParties', []))
+        + WEIGHTS['local_storage'] * len(scan_data.get('localStorage') or {})
+    )
+
+
+class ModelRouter:
+    def __init__(self, fast_model=FAST_MODEL_ID, thorough_model=THOROUGH_MODEL_ID,
+                 fast_max_score=ROUTING_FAST_MAX_SCORE, local_max_score=ROUTING_LOCAL_MAX_SCORE, history=100):
+        self.fast_model = fast_model
+        self.thorough_model = thorough_model
+        self.fast_max_score = fast_max_score
+        self.local_max_score = local_max_score
+        self._lock = threading.Lock()
+        self._decisions = {}
+        self._fallbacks = {}
+        self._recent = deque(maxlen=history)
+        self._latency = {}
+
+    def route(self, scan_data, unknown_cookies=None):
+        score = complexity_score(scan_data, unknown_cookies)
+        if score <= self.local_max_score:
+            tier, model_id = 'local', None
+        elif score <= self.fast_max_score:
+            tier, model_id = 'fast', self.fast_model
+        else:
+            tier, model_id = 'thorough', self.thorough_model
+        decision = {'tier': tier, 'model_id': model_id, 'score': round(score, 2)}
+        with self._lock:
+            self._decisions[tier] = self._decisions.get(tier, 0) + 1
+            self._recent.append({'url': scan_data.get('url'), **decision})
+        return decision
+
+    def record_fallback(self, reason):
+        with self._lock:
+            self._fallbacks[reason] = self._fallbacks.get(reason, 0) + 1
+
+    def observe(self, model_id, seconds):
+        with self._lock:
+            self._latency.setdefault(model_id, LatencyHistogram()).observe(seconds)
+
+    def latency(self, model_id):
+        return self._latency.get(model_id)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'fast_model': self.fast_model,
+                'thorough_model': self.thorough_model,
+                'fast_max_score': self.fast_max_score,
+                'local_max_score': self.local_max_score,
+                'decisions': dict(self._decisions),
+                'fallbacks': dict(self._fallbacks),
+                'recent': list(self._recent),
+                'latency': {m: h.snapshot() for m, h in self._latency.items()},
+            }
+
+
+ROUTER = ModelRouter()
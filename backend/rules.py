@@ -0,0 +1,251 @@
+"""Declarative compliance rules compiled into a control dispatch table.
+
+Rules live in rules.json: each binds control-id keywords to a predicate over the
+feature table from features.extract_features, plus message templates. Framework
+controls listed there may carry a `when` expression; they are skipped, not
+scored, for scans where it is false. Predicates
+and `{expr}` template fields are compiled once into functions whose keyword
+parameters are the feature names they read, so evaluating a control is a single
+call and rule dependencies are known up front.
+
+Expressions are data, not code: compile_expression accepts only the syntax in
+ALLOWED_NODES (arithmetic, comparisons, boolean logic, comprehensions), calls to
+SAFE_BUILTINS and the string/dict methods in SAFE_METHODS, and names from
+FEATURE_NAMES. Anything else is a RuleError when the file is loaded.
+"""
+import ast
+import json
+import os
+import re
+import threading
+import time
+from config import RULES_PATH, RULES_RELOAD_INTERVAL
+
+SAFE_BUILTINS = {
+    'len': len, 'any': any, 'all': all, 'min': min, 'max': max, 'sum': sum,
+    'sorted': sorted, 'set': set, 'round': round, 'str': str, 'True': True, 'False': False, 'None': None,
+}
+
+FEATURE_NAMES = {
+    'rows', 'cookie_count', 'insecure', 'session_cookies', 'session_non_httponly', 'no_samesite',
+    'expiry', 'first_party_cookies', 'third_party_cookies', 'third_parties', 'third_party_count',
+}
+
+SAFE_METHODS = {'join', 'get', 'items', 'keys', 'values', 'lower', 'upper', 'startswith', 'endswith', 'count'}
+
+ALLOWED_NODES = (
+    ast.Expression, ast.BoolOp, ast.And, ast.Or, ast.UnaryOp, ast.Not, ast.USub, ast.UAdd,
+    ast.BinOp, ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod,
+    ast.Compare, ast.Eq, ast.NotEq, ast.Lt, ast.LtE, ast.Gt, ast.GtE, ast.In, ast.NotIn, ast.Is, ast.IsNot,
+    ast.IfExp, ast.Call, ast.keyword, ast.Name, ast.Load, ast.Store, ast.Constant, ast.Attribute,
+    ast.Subscript, ast.Slice, ast.Tuple, ast.List, ast.Set,
+    ast.ListComp, ast.SetComp, ast.GeneratorExp, ast.comprehension,
+)
+
+_FIELD = re.compile(r'\{([^{}]+)\}')
+
+
+class RuleError(Exception):
+    pass
+
+
+def _free_names(tree):
+    bound = {
+        n.id for node in ast.walk(tree) if isinstance(node, ast.comprehension)
+        for n in ast.walk(node.target) if isinstance(n, ast.Name)
+    }
+    return {
+        node.id for node in ast.walk(tree)
+        if isinstance(node, ast.Name) and isinstance(node.ctx, ast.Load)
+    } - bound
+
+
+def _check_syntax(tree, expr, source):
+    for node in ast.walk(tree):
+        if not isinstance(node, ALLOWED_NODES):
+            raise RuleError(f"{source}: {type(node).__name__} is not allowed in {expr!r}")
+        if isinstance(node, ast.Attribute) and node.attr not in SAFE_METHODS:
+            raise RuleError(f"{source}: attribute {node.attr!r} is not allowed in {expr!r}")
+        if isinstance(node, ast.Call) and not (
+                isinstance(node.func, ast.Attribute) or
+                isinstance(node.func, ast.Name) and node.func.id in SAFE_BUILTINS):
+            raise RuleError(f"{source}: only builtins and methods can be called in {expr!r}")
+
+
+def compile_expression(expr, source):
+    try:
+        tree = ast.parse(expr, mode='eval')
+    except SyntaxError as e:
+        raise RuleError(f"{source}: invalid expression {expr!r}: {e.msg}")
+    _check_syntax(tree, expr, source)
+    names = _free_names(tree) - set(SAFE_BUILTINS)
+    unknown = names - FEATURE_NAMES
+    if unknown:
+        raise RuleError(f"{source}: unknown feature(s) {sorted(unknown)} in {expr!r}")
+    # lambda *, <features read>, **_: <expr>, built from the checked tree rather than from source text
+    params = sorted(names)
+    fn_tree = ast.Expression(ast.Lambda(
+        ast.arguments(posonlyargs=[], args=[], vararg=None, kwonlyargs=[ast.arg(name) for name in params],
+                      kw_defaults=[None] * len(params), kwarg=ast.arg('_'), defaults=[]),
+        tree.body))
+    fn = eval(compile(ast.fix_missing_locations(fn_tree), source, 'eval'), {'__builtins__': SAFE_BUILTINS})
+    return fn, names
+
+
+def compile_template(template, source):
+    parts, names, pos = [], set(), 0
+    for match in _FIELD.finditer(template):
+        if match.start() > pos:
+            parts.append(template[pos:match.start()])
+        fn, used = compile_expression(match.group(1), source)
+        parts.append(fn)
+        names |= used
+        pos = match.end()
+    if pos < len(template):
+        parts.append(template[pos:])
+
+    if all(isinstance(p, str) for p in parts):
+        text = ''.join(parts)
+        return (lambda **_: text), names
+    return (lambda **f: ''.join(p if isinstance(p, str) else str(p(**f)) for p in parts)), names
+
+
+def compile_message(spec, source):
+    """A message is a template or a list of [condition, template] pairs ending in a default template."""
+    if isinstance(spec, str):
+        return compile_template(spec, source)
+    branches, names = [], set()
+    for item in spec:
+        condition, template = (item if isinstance(item, list) else ['True', item])
+        test, used_test = compile_expression(condition, source)
+        render, used_render = compile_template(template, source)
+        branches.append((test, render))
+        names |= used_test | used_render
+
+    def render(**f):
+        for test, branch in branches:
+            if test(**f):
+                return branch(**f)
+        return ''
+    return render, names
+
+
+class CompiledRule:
+    def __init__(self, spec):
+        self.id = spec['id']
+        self.match = [k.lower() for k in spec.get('match', [self.id])]
+        self.severity = spec.get('severity', 'fail')
+        if self.severity not in ('fail', 'warn'):
+            raise RuleError(f"{self.id}: severity must be 'fail' or 'warn'")
+        self.predicate, names = compile_expression(spec['pass'], self.id)
+        self.pass_message, pass_names = compile_message(spec['messages']['pass'], self.id)
+        self.fail_message, fail_names = compile_message(spec['messages']['fail'], self.id)
+        self.recommendation, rec_names = compile_template(spec.get('recommendation', ''), self.id)
+        self.depends = frozenset(names | pass_names | fail_names | rec_names)
+
+    def evaluate(self, features):
+        if self.predicate(**features):
+            return {'rule': self.id, 'outcome': 'pass', 'message': self.pass_message(**features),
+                    'recommendation': ''}
+        return {'rule': self.id, 'outcome': self.severity, 'message': self.fail_message(**features),
+                'recommendation': self.recommendation(**features)}
+
+
+class RuleEngine:
+    def __init__(self, path=RULES_PATH, reload_interval=RULES_RELOAD_INTERVAL):
+        self.path = path
+        self.reload_interval = reload_interval
+        self.last_error = None
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._checked_at = 0
+        self._load()
+
+    def _load(self):
+        mtime = os.path.getmtime(self.path)
+        with open(self.path) as f:
+            spec = json.load(f)
+        rules = [CompiledRule(r) for r in spec['rules']]
+        self.rules = {r.id: r for r in rules}
+        self.frameworks = spec.get('frameworks', {})
+        for framework in self.frameworks.values():
+            for control in framework['controls']:
+                if 'when' in control:
+                    control['applies'], _ = compile_expression(control['when'], control['id'])
+        # swapped as one tuple so readers never pair new rules with a stale dispatch table
+        self._table = (rules, {})
+        self._mtime = mtime
+
+    def reload_if_changed(self):
+        now = time.monotonic()
+        if now - self._checked_at < self.reload_interval:
+            return False
+        self._checked_at = now
+        try:
+            if os.path.getmtime(self.path) == self._mtime:
+                return False
+            with self._lock:
+                self._load()
+            self.last_error = None
+            return True
+        except (OSError, ValueError, KeyError, RuleError) as e:
+            # keep serving the last good rule set
+            self.last_error = str(e)
+            return False
+
+    def rule_for(self, control_id):
+        """Resolve a control ID to its rule once; later lookups are a dict hit."""
+        ordered, dispatch = self._table
+        try:
+            return dispatch[control_id]
+        except KeyError:
+            lowered = control_id.lower()
+            rule = next((r for r in ordered if any(k in lowered for k in r.match)), None)
+            dispatch[control_id] = rule
+            return rule
+
+    def evaluate(self, controls, features, outcomes=None):
+        """Evaluate one framework's controls; `outcomes` memoises rule results across frameworks."""
+        if outcomes is None:
+            outcomes = {}
+        result = {'passed': [], 'failed': [], 'warnings': [], 'recommendations': [], 'controls': {}}
+        for control in controls:
+            control_id = control.get('id', '')
+            rule = self.rule_for(control_id)
+            if rule is None:
+                continue
+            # a framework control with a `when` condition is not scored for scans it doesn't apply to
+            applies = control.get('applies')
+            if applies is not None and not applies(**features):
+                continue
+            outcome = outcomes.get(rule.id)
+            if outcome is None:
+                outcome = outcomes[rule.id] = rule.evaluate(features)
+            result['controls'][control_id] = outcome
+            if outcome['outcome'] == 'pass':
+                result['passed'].append(outcome['message'])
+            else:
+                result['failed' if outcome['outcome'] == 'fail' else 'warnings'].append(outcome['message'])
+                result['recommendations'].append(outcome['recommendation'])
+        total = len(result['passed']) + len(result['failed'])
+        result['score'] = round(len(result['passed']) / total * 100, 1) if total else 0
+        return result
+
+    @property
+    def version(self):
+        """Changes whenever the rule file is reloaded; stored rule outcomes are only valid for one version."""
+        return self._mtime
+
+    def evaluate_frameworks(self, controls_by_framework, features, outcomes=None):
+        """`outcomes` may be pre-seeded with rule results that are still valid for this scan."""
+        if outcomes is None:
+            outcomes = {}
+        return {fw: self.evaluate(controls, features, outcomes) for fw, controls in controls_by_framework.items()}
+
+
+ENGINE = RuleEngine()
+
+
+def get_engine():
+    ENGINE.reload_if_changed()
+    return ENGINE
@@ -1,44 +1,69 @@
 import json
-import requests
+import time
 from playwright.sync_api import sync_playwright
 from urllib.parse import urlparse
 from datetime import datetime
-from config import BEDROCK_API_KEY, AWS_REGION, BROWSER_TIMEOUT, API_TIMEOUT, MAX_TOKENS, BROWSER_ARGS
+from config import BEDROCK_API_KEY, BROWSER_TIMEOUT, MAX_TOKENS, BROWSER_ARGS, CLASSIFY_MAX_COOKIES, CLASSIFY_TOKENS_PER_COOKIE
+from bedrock_client import BedrockInvoker, CircuitOpenError
+from cookie_memo import COOKIE_MEMO, split_classifications
+from routing import ROUTER
+from summary import local_summary
+from metrics import browser_open, stage, track_scan
+from tracing import set_attributes
+from eventlog import get_logger, scan_context
+
+BEDROCK = BedrockInvoker(latency_source=ROUTER.latency)
+log = get_logger('scan')
 
 
 def scan_website(url):
+    with scan_context(), track_scan():
+        scan_data = collect_scan(url)
+        scan_data["aiAnalysis"], _ = analyze_with_ai(scan_data)
+    return scan_data
+
+
+def collect_scan(url):
+    """Run the browser and return the raw scan, without AI analysis."""
+    log.info('scan.started', url=url)
     with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True, args=BROWSER_ARGS)
-        context = browser.new_context()
-        page = context.new_page()
-        
-        third_parties = set()
-        
-        def track_requests(request):
-            try:
-                host = urlparse(request.url).hostname or ""
-                base_host = urlparse(url).hostname or ""
-                if not host.endswith(base_host):
-                    third_parties.add(host)
-            except:
-                pass
-        
-        page.on("request", track_requests)
-        page.goto(url, wait_until="load", timeout=BROWSER_TIMEOUT)
-        
-        cookies = context.cookies()
-        local_storage = page.evaluate("""
-            () => {
-                const data = {};
-                for (let i = 0; i < localStorage.length; i++) {
-                    const key = localStorage.key(i);
-                    data[key] = localStorage.getItem(key);
-                }
-                return data;
-            }
-        """)
-        
-        browser.close()
+        with stage('browser_launch'):
+            browser = p.chromium.launch(headless=True, args=BROWSER_ARGS)
+        with browser_open():
+            context = browser.new_context()
+            page = context.new_page()
+            
+            third_parties = set()
+            
+            def track_requests(request):
+                try:
+                    host = urlparse(request.url).hostname or ""
+                    base_host = urlparse(url).hostname or ""
+                    if not host.endswith(base_host):
+                        third_parties.add(host)
+                except:
+                    pass
+            
+            page.on("request", track_requests)
+            with stage('navigation'):
+                page.goto(url, wait_until="load", timeout=BROWSER_TIMEOUT)
+            log.debug('scan.page_loaded', url=url)
+            
+            with stage('cookie_extraction'):
+                cookies = context.cookies()
+            with stage('storage_extraction'):
+                local_storage = page.evaluate("""
+                    () => {
+                        const data = {};
+                        for (let i = 0; i < localStorage.length; i++) {
+                            const key = localStorage.key(i);
+                            data[key] = localStorage.getItem(key);
+                        }
+                        return data;
+                    }
+                """)
+            
+            browser.close()
     
     scan_data = {
         "url": url,
@@ -47,20 +72,30 @@ def scan_website(url):
         "localStorage": local_storage,
         "thirdParties": list(third_parties)
     }
-    
-    scan_data["aiAnalysis"] = analyze_with_ai(scan_data)
+    set_attributes({
+        'url.host': urlparse(url).hostname or '',
+        'scan.cookie_count': len(cookies),
+        'scan.third_party_count': len(third_parties),
+    })
+    log.info('scan.collected', url=url, cookie_count=len(cookies), local_storage_count=len(local_storage),
+             third_party_count=len(third_parties))
     
     return scan_data
 
 
-def analyze_with_ai(scan_data):
-    if not BEDROCK_API_KEY:
-        return "AI analysis unavailable (no API key)"
-    
-    try:
-        prompt = f"""Analyze this privacy scan (max 100 words):
+def build_prompt(scan_data, known_cookies, unknown_cookies):
+    payload = {k: v for k, v in scan_data.items() if k != 'cookies'}
+    payload['knownCookies'] = [
+        {'name': c['name'], 'category': c['category'], 'risk': c['risk']} for c in known_cookies
+    ]
+    # the rest are classified on a later scan, once these are in the memo
+    payload['cookies'] = unknown_cookies[:CLASSIFY_MAX_COOKIES]
+    if len(unknown_cookies) > CLASSIFY_MAX_COOKIES:
+        payload['otherCookies'] = [c.get('name') for c in unknown_cookies[CLASSIFY_MAX_COOKIES:]]
+
+    prompt = f"""Analyze this privacy scan (max 100 words):
 
-{json.dumps(scan_data, indent=2)}
+{json.dumps(payload, indent=2)}
 
 Format:
 **Risk Level**: [Low/Medium/High]
@@ -72,25 +107,68 @@ Format:
 - Action 1
 - Action 2"""
 
-        url = f"https://bedrock-runtime.{AWS_REGION}.amazonaws.com/model/anthropic.claude-3-sonnet-20240229-v1:0/invoke"
-        
-        response = requests.post(
-            url,
-            headers={
-                "Authorization": f"Bearer {BEDROCK_API_KEY}",
-                "Content-Type": "application/json"
-            },
-            json={
+    if unknown_cookies:
+        prompt += """
+
+Then classify every entry in "cookies" in a final ```json block:
+[{"name": "...", "pattern": "prefix_* if the name is a family, else omit", "purpose": "...", "category": "Necessary/Functional/Analytics/Advertising", "risk": "low/medium/high"}]"""
+
+    return prompt
+
+
+def max_tokens_for(unknown_cookies):
+    """The summary's budget plus a classification row for each cookie build_prompt sends"""
+    return MAX_TOKENS + CLASSIFY_TOKENS_PER_COOKIE * min(len(unknown_cookies), CLASSIFY_MAX_COOKIES)
+
+
+def _fallback_reason(decision, deadline):
+    if decision['tier'] == 'local':
+        return 'low_complexity'
+    if not BEDROCK_API_KEY:
+        return 'no_api_key'
+    if BEDROCK.breaker.state == 'open':
+        return 'circuit_open'
+    if deadline is not None:
+        histogram = ROUTER.latency(decision['model_id'])
+        expected = histogram.percentile(0.5) if histogram else 0
+        if deadline <= expected:
+            return 'deadline'
+    return None
+
+
+def analyze_with_ai(scan_data, deadline=None, compliance_results=None, third_party_risks=None):
+    """(summary, source): source is 'model', or 'local' when local_summary stood in for Bedrock.
+
+    Pass the compliance results and third-party risks when the caller already has them, so the
+    local fallback doesn't evaluate the rules again.
+    """
+    known, unknown = COOKIE_MEMO.partition(scan_data.get('cookies', []))
+    decision = ROUTER.route(scan_data, unknown)
+
+    reason = _fallback_reason(decision, deadline)
+    if reason:
+        ROUTER.record_fallback(reason)
+        return local_summary(scan_data, compliance_results, third_party_risks), 'local'
+    
+    try:
+        prompt = build_prompt(scan_data, known, unknown)
+        model_id = decision['model_id']
+
+        started = time.perf_counter()
+        with stage('bedrock_call'):
+            result = BEDROCK.invoke(model_id, {
                 "anthropic_version": "bedrock-2023-05-31",
-                "max_tokens": MAX_TOKENS,
+                "max_tokens": max_tokens_for(unknown),
                 "messages": [{"role": "user", "content": prompt}]
-            },
-            timeout=API_TIMEOUT
-        )
-        response.raise_for_status()
+            })
+        ROUTER.observe(model_id, time.perf_counter() - started)
         
-        return response.json()['content'][0]['text']
+        summary, classifications = split_classifications(result['content'][0]['text'])
+        COOKIE_MEMO.learn(unknown, classifications)
+        return summary, 'model'
     
-    except Exception as e:
-        return f"AI analysis failed: {str(e)}"
-
+    except CircuitOpenError:
+        ROUTER.record_fallback('circuit_open')
+    except Exception:
+        ROUTER.record_fallback('bedrock_error')
+    return local_summary(scan_data, compliance_results, third_party_risks), 'local'
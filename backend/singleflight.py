@@ -0,0 +1,151 @@
+"""Single-flight: concurrent calls for the same key share one execution.
+
+When many requests ask for the same site at once, the first becomes the leader
+and runs the scan; the rest wait for it and get the same result object (treat
+it as read-only). Across uvicorn/worker processes on one host, leaders also
+take a byte-range lock in a shared lock file: a process that finds the key
+locked waits for the other process and reuses the result it left in the lock
+directory instead of launching its own browser.
+"""
+import fcntl
+import hashlib
+import json
+import os
+import threading
+import time
+from config import SINGLEFLIGHT_DIR, SINGLEFLIGHT_RESULT_TTL
+from urlcanon import canonicalize_url
+
+LOCK_SLOTS = 1 << 20
+_MISSING = object()
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self, directory=SINGLEFLIGHT_DIR, result_ttl=SINGLEFLIGHT_RESULT_TTL):
+        """`directory` holds the cross-process lock file and results; None coalesces in-process only."""
+        self.directory = directory
+        self.result_ttl = result_ttl
+        self._calls = {}
+        self._lock = threading.Lock()
+        self._counts = {'requests': 0, 'executed': 0, 'coalesced': 0, 'coalesced_remote': 0, 'errors': 0}
+        self._lock_fd = None
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self._lock_fd = os.open(os.path.join(directory, 'inflight.lock'), os.O_RDWR | os.O_CREAT, 0o644)
+
+    def do(self, key, fn, *args, **kwargs):
+        """Run fn(*args, **kwargs) unless a call for `key` is already in flight; return its result."""
+        with self._lock:
+            self._counts['requests'] += 1
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self._counts['coalesced'] += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = self._run_shared(key, fn, args, kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            with self._lock:
+                self._counts['errors'] += 1
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def _run_shared(self, key, fn, args, kwargs):
+        if self._lock_fd is None:
+            return self._execute(fn, args, kwargs)
+
+        digest = hashlib.sha1(key.encode()).hexdigest()
+        slot = int(digest[:8], 16) % LOCK_SLOTS
+        started = time.time()
+        try:
+            fcntl.lockf(self._lock_fd, fcntl.LOCK_EX | fcntl.LOCK_NB, 1, slot)
+        except OSError:
+            # another process is running this key; wait for it and take its result
+            fcntl.lockf(self._lock_fd, fcntl.LOCK_EX, 1, slot)
+            result = self._read_result(digest, started)
+            if result is not _MISSING:
+                fcntl.lockf(self._lock_fd, fcntl.LOCK_UN, 1, slot)
+                with self._lock:
+                    self._counts['coalesced_remote'] += 1
+                return result
+        try:
+            result = self._execute(fn, args, kwargs)
+            self._write_result(digest, result)
+            return result
+        finally:
+            fcntl.lockf(self._lock_fd, fcntl.LOCK_UN, 1, slot)
+
+    def _execute(self, fn, args, kwargs):
+        with self._lock:
+            self._counts['executed'] += 1
+        return fn(*args, **kwargs)
+
+    def _result_path(self, digest):
+        return os.path.join(self.directory, f"{digest}.json")
+
+    def _read_result(self, digest, since):
+        # only a result finished while we waited counts; older files are leftovers
+        try:
+            with open(self._result_path(digest)) as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return _MISSING
+        return entry['result'] if entry.get('finished_at', 0) >= since else _MISSING
+
+    def _write_result(self, digest, result):
+        path = self._result_path(digest)
+        try:
+            data = json.dumps({'finished_at': time.time(), 'result': result})
+        except (TypeError, ValueError):
+            return
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, 'w') as f:
+            f.write(data)
+        os.replace(tmp, path)
+        self._prune()
+
+    def _prune(self):
+        cutoff = time.time() - self.result_ttl
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.json'):
+                try:
+                    if entry.stat().st_mtime < cutoff:
+                        os.unlink(entry.path)
+                except OSError:
+                    pass
+
+    def stats(self):
+        with self._lock:
+            counts = dict(self._counts)
+            counts['in_flight'] = len(self._calls)
+        shared = counts['coalesced'] + counts['coalesced_remote']
+        counts['hit_rate'] = round(shared / counts['requests'], 4) if counts['requests'] else 0.0
+        return counts
+
+
+def flight_key(kind, url, *options):
+    """Key for a scan of `url` with `options` (e.g. frameworks); order of each option's values is ignored."""
+    parts = [kind, canonicalize_url(url)]
+    for option in options:
+        parts.append(','.join(sorted(option)) if isinstance(option, (list, tuple, set)) else str(option))
+    return ' '.join(parts)
@@ -0,0 +1,67 @@
+from compliance import check_compliance, analyze_third_parties
+
+# failed/warning message keyword -> recommended action
+ACTIONS = [
+    ('secure', "Set the Secure flag on all cookies so they only travel over HTTPS"),
+    ('httponly', "Mark session and auth cookies HttpOnly to keep them away from scripts"),
+    ('samesite', "Add SameSite=Lax or Strict to cookies to limit cross-site requests"),
+    ('consent', "Show a consent banner before setting non-essential cookies"),
+    ('third-party', "List every third-party service and its purpose in the privacy policy"),
+]
+
+RISK_ORDER = {'low': 0, 'medium': 1, 'high': 2}
+
+
+def _messages(result, *keys):
+    return [m for key in keys for m in result.get(key, [])]
+
+
+def _risk_level(scores, risky_trackers):
+    worst = min(scores) if scores else 100
+    if worst < 50 or len(risky_trackers) >= 5:
+        return 'High'
+    if worst < 80 or risky_trackers:
+        return 'Medium'
+    return 'Low'
+
+
+def local_summary(scan_data, compliance_results=None, third_party_risks=None):
+    """Rule-based report in the same markdown format the Bedrock prompt asks for."""
+    if compliance_results is None:
+        compliance_results = check_compliance(scan_data)
+    if third_party_risks is None:
+        third_party_risks = analyze_third_parties(scan_data.get('thirdParties', []))
+
+    failed, warnings, recommendations = [], [], []
+    for result in compliance_results.values():
+        failed += _messages(result, 'failed', 'failed_controls')
+        warnings += _messages(result, 'warnings')
+        recommendations += [r for r in result.get('recommendations', []) if r]
+
+    risky = [r for r in third_party_risks if RISK_ORDER.get(r.get('risk_level'), 1) >= 1]
+    risky.sort(key=lambda r: -RISK_ORDER.get(r.get('risk_level'), 1))
+    scores = [
+        r['score'] for r in compliance_results.values()
+        if _messages(r, 'passed', 'failed', 'passed_controls', 'failed_controls')
+    ]
+
+    findings = list(dict.fromkeys(failed)) + list(dict.fromkeys(warnings))
+    if risky:
+        names = ', '.join(r['domain'] for r in risky[:3])
+        findings.insert(len(failed), f"{len(risky)} medium/high-risk third parties ({names})")
+    if not findings:
+        findings = ["No cookie security issues detected"]
+
+    if not recommendations:
+        text = ' '.join(findings).lower()
+        recommendations = [action for keyword, action in ACTIONS if keyword in text]
+    if risky and not any('third-part' in r.lower() for r in recommendations):
+        recommendations.append(ACTIONS[-1][1])
+    if not recommendations:
+        recommendations = ["Keep monitoring new cookies and third parties on each release"]
+
+    lines = [f"**Risk Level**: {_risk_level(scores, risky)}", "**Key Findings**:"]
+    lines += [f"- {f}" for f in findings[:3]]
+    lines += ["", "**Recommendations**:"]
+    lines += [f"- {r}" for r in list(dict.fromkeys(recommendations))[:3]]
+    return '\n'.join(lines)
@@ -0,0 +1,51 @@
+"""Admission control: concurrency cap, bounded queue and Retry-After"""
+import threading
+import time
+import pytest
+from admission import AdmissionController, Overloaded
+
+
+def test_caps_concurrency_and_rejects_beyond_queue():
+    controller = AdmissionController('scans', max_concurrent=2, max_queue=1, queue_timeout=5, initial_estimate=10)
+    release = threading.Event()
+    peak, active, lock = [0], [0], threading.Lock()
+
+    @controller.wrap
+    def scan():
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        release.wait()
+        with lock:
+            active[0] -= 1
+
+    threads = [threading.Thread(target=scan) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    while controller.stats()['queue_depth'] < 1:
+        time.sleep(0.01)
+
+    with pytest.raises(Overloaded) as rejected:
+        scan()
+    assert rejected.value.reason == 'queue full'
+    # two callers ahead (one running, one parked) over two slots of ~10s each
+    assert rejected.value.retry_after == 10
+
+    release.set()
+    for thread in threads:
+        thread.join()
+    stats = controller.stats()
+    assert peak[0] == 2 and stats['admitted'] == 3 and stats['rejected_queue_full'] == 1
+    assert stats['active'] == 0 and stats['ewma_duration_seconds'] < 10
+
+
+def test_parked_caller_times_out():
+    controller = AdmissionController('scans', max_concurrent=1, max_queue=4, queue_timeout=0.05)
+    token = controller.enter()
+    with pytest.raises(Overloaded) as rejected:
+        controller.enter()
+    assert rejected.value.reason == 'queue timeout'
+    controller.leave(token)
+    assert controller.stats()['rejected_timeout'] == 1 and controller.stats()['queue_depth'] == 0
+    with controller.slot():
+        assert controller.stats()['active'] == 1
@@ -0,0 +1,58 @@
+"""Columnar analytics over a handful of hand-built scans"""
+
+from analytics import ScanTable
+
+
+def test_metrics_and_group_by():
+    scans = [
+        {'url': 'https://www.a.example', 'scannedAt': '2025-01-01T00:00:00Z', 'thirdParties': ['doubleclick.net'],
+         'cookies': [
+             {'name': 'session_id', 'domain': '.a.example', 'secure': True, 'httpOnly': False, 'sameSite': 'Lax'},
+             {'name': 'IDE', 'domain': '.doubleclick.net', 'secure': True, 'httpOnly': True, 'sameSite': 'None',
+              'expires': 1735689600 + 400 * 86400},
+         ]},
+        {'url': 'https://b.example', 'scannedAt': '2025-01-01T00:00:00Z', 'thirdParties': [],
+         'cookies': [{'name': 'pref', 'domain': 'b.example', 'expires': 1735689600 + 86400}],
+         'compliance_analysis': {'gdpr': {'score': 90.0}, 'ccpa': {'score': 50.0}}},
+    ]
+    table = ScanTable.from_scans(scans)
+    report = table.report(group_by=['category'])
+
+    assert report['cookies'] == 3
+    assert report['cookie_pct']['missing_samesite'] == 33.33
+    assert report['cookie_pct']['third_party'] == 33.33
+    assert report['cookie_pct']['session_named_without_http_only'] == 33.33
+    assert report['scan_pct']['insecure'] == 50.0
+    assert report['percentiles']['cookie_lifetime_days'] == {'p50': 200.5, 'p90': 360.1, 'p99': 396.01, 'mean': 200.5}
+    assert report['scores']['gdpr']['scans'] == 2
+    assert table.scores['gdpr'][1] == 90.0
+
+    by_category = {g['category']: g for g in report['groups']['category']}
+    assert by_category['Advertising']['cookies'] == 1
+    assert by_category['Advertising']['samesite_none_pct'] == 100.0
+    assert by_category['Unknown']['scans'] == 2
+
+
+def test_same_site_values_from_the_extension():
+    cookies = [{'name': name, 'domain': 'a.example', 'sameSite': value}
+               for name, value in [('a', 'lax'), ('b', 'STRICT'), ('c', 'no_restriction'), ('d', 'unspecified'),
+                                   ('e', None), ('f', 'None')]]
+    report = ScanTable.from_scans([{'url': 'https://a.example', 'cookies': cookies}]).report(group_by=['same_site'])
+    by_value = {g['same_site']: g['cookies'] for g in report['groups']['same_site']}
+    assert by_value == {'Lax': 1, 'Strict': 1, 'None': 2, 'missing': 2}
+
+
+def test_api_rejects_bad_analytics_requests(monkeypatch, tmp_path):
+    from fastapi.testclient import TestClient
+    import api
+    from jobs import JobQueue
+    from resultcache import ResultCache
+    monkeypatch.setattr(api, 'CACHE', ResultCache(str(tmp_path / 'results.db')))
+    monkeypatch.setattr(api, 'JOBS', JobQueue(str(tmp_path / 'jobs.db')))
+    client = TestClient(api.app)
+    scan = {'url': 'https://a.example', 'cookies': [{'name': 'a', 'domain': 'a.example'}]}
+
+    assert client.post('/analytics', json={'scans': [scan], 'percentiles': [50, 99.9]}).status_code == 200
+    for body in ({'scans': [scan], 'percentiles': [150]}, {'scans': [scan], 'percentiles': [-1]},
+                 {'scans': [scan, 'a.example']}, {'scans': [scan], 'top': 0}):
+        assert client.post('/analytics', json=body).status_code == 422, body
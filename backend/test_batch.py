@@ -0,0 +1,25 @@
+"""Batch analysis through the local file-based stand-in"""
+
+from batch import BatchAnalyzer, LocalBatchBackend, read_jsonl
+
+
+def test_outputs_map_back_to_scan_ids(tmp_path):
+    def responder(record):
+        if record['recordId'] == 'broken':
+            raise RuntimeError("model error")
+        text = f"**Risk Level**: Low for {record['recordId']}"
+        return {'content': [{'type': 'text', 'text': text}]}
+
+    scans = {
+        'site-a': {'url': 'https://a.example', 'cookies': [{'name': '_ga', 'domain': '.a.example'}]},
+        'site-b': {'url': 'https://b.example', 'cookies': []},
+        'broken': {'url': 'https://c.example', 'cookies': []},
+    }
+    results = BatchAnalyzer(LocalBatchBackend(tmp_path, responder), workdir=tmp_path).run(scans)
+
+    assert results['site-a'] == "**Risk Level**: Low for site-a"
+    assert results['site-b'] == "**Risk Level**: Low for site-b"
+    assert results['broken'].startswith("AI analysis failed: model error")
+
+    inputs = read_jsonl(next(tmp_path.glob('batch-*.jsonl')))
+    assert [r['recordId'] for r in inputs] == ['site-a', 'site-b', 'broken']
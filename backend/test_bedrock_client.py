@@ -0,0 +1,133 @@
+"""Bedrock invoker against a local fault-injecting stub server"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from bedrock_client import BedrockInvoker, CircuitBreaker, CircuitOpenError, ClientError, ThrottledError
+from routing import LatencyHistogram
+
+
+class FaultyBedrock(BaseHTTPRequestHandler):
+    """Pops one fault per request: 'ok', 'throttle', 'error', 'invalid' or a delay in seconds."""
+    faults = []
+    hits = 0
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        type(self).hits += 1
+        fault = self.faults.pop(0) if self.faults else 'ok'
+        if isinstance(fault, (int, float)):
+            time.sleep(fault)
+            fault = 'ok'
+        if fault == 'throttle':
+            self._reply(429, {'message': 'Too many requests'}, {'x-amzn-ErrorType': 'ThrottlingException'})
+        elif fault == 'error':
+            self._reply(500, {'message': 'Internal failure'})
+        elif fault == 'invalid':
+            self._reply(400, {'message': 'Input is too long for requested model'}, {'x-amzn-ErrorType': 'ValidationException'})
+        else:
+            self._reply(200, {'content': [{'type': 'text', 'text': f'answer {self.hits}'}]})
+
+    def _reply(self, status, body, headers=None):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub():
+    FaultyBedrock.faults, FaultyBedrock.hits = [], 0
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FaultyBedrock)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+
+def make_invoker(endpoint, **kwargs):
+    kwargs.setdefault('sleep', lambda seconds: None)
+    return BedrockInvoker(endpoint=endpoint, api_key='test', timeout=5, **kwargs)
+
+
+def test_retries_through_throttling(stub):
+    FaultyBedrock.faults = ['throttle', 'throttle', 'ok']
+    invoker = make_invoker(stub, max_retries=3)
+
+    result = invoker.invoke('model', {})
+
+    assert result['content'][0]['text'] == 'answer 3'
+    assert invoker.stats['retries'] == 2
+
+
+def test_gives_up_after_max_retries(stub):
+    FaultyBedrock.faults = ['throttle'] * 5
+    invoker = make_invoker(stub, max_retries=2)
+
+    with pytest.raises(ThrottledError):
+        invoker.invoke('model', {})
+    assert FaultyBedrock.hits == 3
+
+
+def test_hedge_wins_over_slow_primary(stub):
+    FaultyBedrock.faults = [1.5, 'ok']
+    histogram = LatencyHistogram()
+    histogram.observe(0.1)
+    invoker = make_invoker(stub, hedge=True, hedge_min_delay=0.1, latency_source=lambda model: histogram)
+
+    started = time.perf_counter()
+    result = invoker.invoke('model', {})
+
+    assert time.perf_counter() - started < 1.0
+    assert result['content'][0]['text'] == 'answer 2'
+    assert invoker.stats['hedged'] == 1
+    assert invoker.stats['hedge_wins'] == 1
+
+    # the primary was not interrupted: it finishes later and is counted as a duplicate
+    invoker._pool.shutdown(wait=True)
+    assert invoker.stats['hedge_duplicates'] == 1
+    assert 0.5 < invoker.stats['hedge_saved_seconds'] < 1.5
+
+
+def test_circuit_opens_and_fails_fast(stub):
+    FaultyBedrock.faults = ['error'] * 3
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30, clock=lambda: now[0])
+    invoker = make_invoker(stub, max_retries=0, breaker=breaker)
+
+    for _ in range(2):
+        with pytest.raises(Exception):
+            invoker.invoke('model', {})
+    with pytest.raises(CircuitOpenError):
+        invoker.invoke('model', {})
+    assert FaultyBedrock.hits == 2
+
+    now[0] = 31
+    FaultyBedrock.faults = []
+    assert invoker.invoke('model', {})['content'][0]['text'] == 'answer 3'
+    assert breaker.state == 'closed'
+
+
+def test_client_errors_do_not_open_the_circuit(stub):
+    FaultyBedrock.faults = ['error', 'invalid', 'invalid', 'invalid', 'error']
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30)
+    invoker = make_invoker(stub, max_retries=0, breaker=breaker)
+
+    with pytest.raises(Exception):
+        invoker.invoke('model', {})
+    for _ in range(3):
+        with pytest.raises(ClientError, match='400'):
+            invoker.invoke('model', {})
+    assert breaker.state == 'closed' and breaker.failures == 0
+    # a bad request in between resets the run of server failures
+    with pytest.raises(Exception):
+        invoker.invoke('model', {})
+    assert breaker.state == 'closed'
@@ -0,0 +1,53 @@
+"""Cookie classification memo: parsing model answers, learning and persistence"""
+import json
+from cookie_memo import CookieClassificationStore, split_classifications
+from scanner import build_prompt, max_tokens_for
+from config import CLASSIFY_MAX_COOKIES, MAX_TOKENS
+
+SUMMARY = "**Risk Level**: Low\n**Key Findings**:\n- Few trackers"
+ROWS = [{"name": "acme_pref", "purpose": "Stores UI preferences", "category": "Functional", "risk": "Low"},
+        {"name": "_pk_id.1.abcd", "pattern": "_pk_*", "purpose": "Matomo visitor", "category": "Analytics"}]
+
+
+def test_split_classifications():
+    text = f"{SUMMARY}\n\n```json\n{json.dumps(ROWS)}\n```\n"
+    assert split_classifications(text) == (SUMMARY, ROWS)
+    assert split_classifications(SUMMARY) == (SUMMARY, [])
+    assert split_classifications(None) == (None, [])
+    # cut off by max_tokens, or not JSON: the block goes, nothing is learned
+    assert split_classifications(f"{SUMMARY}\n\n```json\n{json.dumps(ROWS)[:60]}") == (SUMMARY, [])
+    assert split_classifications(f"{SUMMARY}\n```json\n[{{name: 1}}]\n```") == (SUMMARY, [])
+    assert split_classifications(f'{SUMMARY}\n```json\n[1, {{"name": "a"}}]\n```') == (SUMMARY, [{"name": "a"}])
+
+
+def test_learn_stores_rows_for_cookies_that_were_sent(tmp_path):
+    store = CookieClassificationStore(str(tmp_path / 'memo.json'))
+    cookies = [{"name": "acme_pref", "domain": ".www.acme.com"}, {"name": "_pk_id.1.abcd", "domain": "acme.com"}]
+    rows = ROWS + [{"name": "never_sent", "category": "Advertising"}, {"name": "acme_pref"}]
+    assert store.learn(cookies, rows) == 2
+    assert store.lookup("acme_pref", "acme.com")["risk"] == "low"
+    assert store.lookup("acme_pref", "other.com") is None
+    assert store.lookup("_pk_ses.7.ffff", "acme.com")["category"] == "Analytics"
+    assert store.lookup("never_sent", "acme.com") is None
+    assert store.partition(cookies) == ([{"name": "acme_pref", **store.lookup("acme_pref", "acme.com")},
+                                          {"name": "_pk_id.1.abcd", **store.lookup("_pk_id.1.abcd", "acme.com")}], [])
+
+
+def test_memo_persists_learned_entries_only(tmp_path):
+    path = tmp_path / 'memo.json'
+    store = CookieClassificationStore(str(path))
+    store.learn([{"name": "acme_pref", "domain": "acme.com"}], ROWS[:1])
+    saved = json.loads(path.read_text())
+    assert saved == [{"pattern": "acme_pref", "domain": "acme.com", "purpose": "Stores UI preferences",
+                      "category": "Functional", "risk": "low"}]
+    reloaded = CookieClassificationStore(str(path))
+    assert len(reloaded) == len(store)
+    assert reloaded.lookup("acme_pref", "acme.com") == store.lookup("acme_pref", "acme.com")
+    assert reloaded.lookup("_ga", "anything.com")["category"] == "Analytics"
+
+
+def test_prompt_caps_cookies_to_classify():
+    cookies = [{"name": f"c{i}", "domain": "acme.com"} for i in range(CLASSIFY_MAX_COOKIES + 5)]
+    payload = build_prompt({"url": "https://acme.com/"}, [], cookies)
+    assert payload.count('"name": "c') == CLASSIFY_MAX_COOKIES
+    assert max_tokens_for(cookies) == max_tokens_for(cookies[:CLASSIFY_MAX_COOKIES]) > max_tokens_for([]) == MAX_TOKENS
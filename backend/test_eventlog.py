@@ -0,0 +1,66 @@
+"""JSON event lines, scan correlation, sampling and the non-blocking queue"""
+import io
+import json
+import logging
+import queue
+import pytest
+import eventlog
+from eventlog import DroppingQueueHandler, SamplingFilter, get_logger, scan_context
+
+
+@pytest.fixture
+def output():
+    stream = io.StringIO()
+    eventlog.shutdown()  # importing api (other tests) configures stdout logging
+    eventlog.configure(level='INFO', sample_rate=1.0, stream=stream)
+    yield stream
+    eventlog.shutdown()
+
+
+def lines(stream):
+    eventlog.flush()
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+
+def test_one_json_line_per_event_with_scan_id(output):
+    log = get_logger('scan')
+    with scan_context() as scan_id:
+        log.info('scan.started', url='https://example.com/')
+        log.debug('scan.page_loaded')
+        with scan_context():
+            log.info('scan.collected', cookie_count=3)
+    log.info('outside')
+    try:
+        raise ValueError('boom')
+    except ValueError:
+        log.exception('scan.failed')
+
+    started, collected, outside, failed = lines(output)
+    assert started['event'] == 'scan.started' and started['logger'] == 'cookielens.scan'
+    assert started['url'] == 'https://example.com/' and started['level'] == 'info'
+    assert started['scan_id'] == collected['scan_id'] == scan_id and collected['cookie_count'] == 3
+    assert 'scan_id' not in outside
+    assert failed['level'] == 'error' and 'ValueError: boom' in failed['exception']
+
+
+def test_sampling_is_per_scan_and_keeps_warnings():
+    sampler = SamplingFilter(0.5)
+    info = logging.makeLogRecord({'levelno': logging.INFO})
+    warning = logging.makeLogRecord({'levelno': logging.WARNING})
+    kept = 0
+    for i in range(400):
+        with scan_context(f'scan-{i}'):
+            decision = sampler.filter(info)
+            assert all(sampler.filter(info) == decision for _ in range(3))
+            assert sampler.filter(warning)
+            kept += decision
+    assert 140 < kept < 260
+
+
+def test_full_queue_drops_instead_of_blocking():
+    handler = DroppingQueueHandler(queue.Queue(1))
+    handler.setFormatter(eventlog.JsonFormatter())
+    for i in range(3):
+        handler.handle(logging.makeLogRecord({'msg': f'event {i}', 'levelno': logging.INFO, 'levelname': 'INFO'}))
+    assert handler.dropped == 2
+    assert json.loads(handler.queue.get_nowait().getMessage())['event'] == 'event 0'
@@ -0,0 +1,62 @@
+"""The cookie feature table every framework and control reads"""
+import pytest
+from features import SHORT_LIVED_SECONDS, expiry_class, extract_features, is_first_party, normalize_same_site, scan_time
+
+SCANNED_AT = '2025-01-01T00:00:00'
+
+
+def test_extract_features():
+    now = scan_time({'scannedAt': SCANNED_AT})
+    scan = {
+        'url': 'https://www.Shop.example/cart', 'scannedAt': SCANNED_AT,
+        'thirdParties': ['cdn.example', 'ads.example'],
+        'cookies': [
+            {'name': 'SESSIONID', 'domain': '.shop.example', 'secure': True, 'httpOnly': True, 'sameSite': 'Lax'},
+            {'name': 'auth_token', 'domain': 'shop.example', 'secure': False, 'sameSite': 'no_restriction',
+             'expires': now + 3600},
+            {'name': 'IDE', 'domain': '.doubleclick.net', 'secure': True, 'sameSite': 'unspecified',
+             'expires': now + 400 * 86400},
+            {'name': 'pref', 'domain': 'static.shop.example', 'secure': True, 'expires': -1},
+        ],
+    }
+    features = extract_features(scan)
+
+    assert features['cookie_count'] == 4
+    assert features['session_cookies'] == ['SESSIONID', 'auth_token']
+    assert features['session_non_httponly'] == ['auth_token']
+    assert features['insecure'] == ['auth_token']
+    assert features['no_samesite'] == ['IDE', 'pref']
+    assert features['expiry'] == {'session': 2, 'short': 1, 'long': 1}
+    assert features['first_party_cookies'] == 3 and features['third_party_cookies'] == 1
+    assert features['third_parties'] == ['cdn.example', 'ads.example'] and features['third_party_count'] == 2
+    assert [row['same_site'] for row in features['rows']] == ['Lax', 'None', None, None]
+
+    empty = extract_features({})
+    assert empty['cookie_count'] == 0 and empty['rows'] == [] and empty['third_party_count'] == 0
+
+
+@pytest.mark.parametrize('offset, expected', [
+    (None, 'session'), (-1, 'session'), (SHORT_LIVED_SECONDS, 'short'), (SHORT_LIVED_SECONDS + 1, 'long'),
+])
+def test_expiry_class(offset, expected):
+    now = 1_700_000_000
+    expires = offset if offset is None or offset < 0 else now + offset
+    assert expiry_class(expires, now) == expected
+
+
+@pytest.mark.parametrize('domain, host, first_party', [
+    ('.shop.example', 'shop.example', True),
+    ('shop.example', 'www.shop.example', True),
+    ('static.shop.example', 'shop.example', True),
+    ('', 'shop.example', True),
+    ('ads.example', 'shop.example', False),
+    ('hop.example', 'shop.example', False),
+])
+def test_is_first_party(domain, host, first_party):
+    assert is_first_party(domain, host) is first_party
+
+
+def test_normalize_same_site():
+    assert [normalize_same_site(v) for v in ('Strict', 'lax', 'LAX', 'None', 'no_restriction')] == \
+        ['Strict', 'Lax', 'Lax', 'None', 'None']
+    assert [normalize_same_site(v) for v in (None, '', 'unspecified')] == [None, None, None]
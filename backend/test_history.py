@@ -0,0 +1,79 @@
+"""Scan diffs and carrying rule outcomes over between scans of one site"""
+import threading
+
+from compliance import check_compliance
+from features import extract_features
+from history import ScanHistory, changed_features, diff_scans, reusable_outcomes
+from rules import get_engine
+
+
+def scan(cookies, third_parties=()):
+    return {'url': 'https://www.a.example/', 'scannedAt': '2025-01-01T00:00:00',
+            'cookies': cookies, 'thirdParties': list(third_parties)}
+
+
+def test_rescan_reevaluates_only_affected_rules(tmp_path):
+    before = scan([{'name': 'sid', 'domain': '.a.example', 'value': '1', 'secure': False, 'sameSite': 'Lax'}],
+                  ['cdn.example'])
+    after = scan([{'name': 'sid', 'domain': '.a.example', 'value': '2', 'secure': True, 'sameSite': 'Lax'}],
+                 ['cdn.example'])
+
+    changes = diff_scans(before, after)
+    assert changes['material']
+    assert changes['cookies']['changed'] == [
+        {'name': 'sid', 'domain': 'a.example', 'path': '/', 'fields': {'secure': [False, True]}}]
+    assert not diff_scans(before, scan([dict(before['cookies'][0], value='3')], ['cdn.example']))['material']
+
+    engine = get_engine()
+    old_features, old_outcomes = extract_features(before), {}
+    check_compliance(before, features=old_features, outcomes=old_outcomes)
+
+    features = extract_features(after)
+    outcomes = reusable_outcomes(old_outcomes, changed_features(old_features, features), engine)
+    assert 'secure-flag' not in outcomes and 'third-party' in outcomes
+    incremental = check_compliance(after, features=features, outcomes=outcomes)
+    assert incremental == check_compliance(after)
+
+    history = ScanHistory(str(tmp_path))
+    history.put('https://www.A.example/', {'outcomes': old_outcomes})
+    assert ScanHistory(str(tmp_path)).get('https://a.example')['outcomes'] == old_outcomes
+
+
+def test_concurrent_puts_for_one_site(tmp_path):
+    history = ScanHistory(str(tmp_path))
+    barrier = threading.Barrier(8)
+    errors = []
+
+    def put(i):
+        barrier.wait()
+        try:
+            for _ in range(20):
+                history.put('https://www.a.example/' if i % 2 else 'https://a.example/', {'run': i})
+        except OSError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=put, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert [p.name for p in tmp_path.iterdir() if p.suffix == '.tmp'] == []
+    assert ScanHistory(str(tmp_path)).get('https://a.example')['run'] in range(8)
+
+
+def test_only_model_analyses_are_reused(monkeypatch):
+    import workflow
+    monkeypatch.setattr(workflow, 'analyze_with_ai', lambda scan_data, **known: ('fresh', 'model'))
+
+    def analyze(previous):
+        return workflow.analyze_ai({'scan_results': {}, 'previous': previous, 'changes': {'material': False},
+                                    'compliance_results': {}, 'third_party_risks': []})
+
+    state = analyze({'ai_analysis': 'from bedrock', 'ai_source': 'model'})
+    assert state['scan_results']['aiAnalysis'] == 'from bedrock' and state['changes']['ai_reused']
+    # a local-summary fallback, or an entry recorded before sources were, is analysed again
+    for previous in ({'ai_analysis': 'rule-based', 'ai_source': 'local'}, {'ai_analysis': 'unknown'}):
+        state = analyze(previous)
+        assert state['scan_results']['aiAnalysis'] == 'fresh' and not state['changes']['ai_reused']
+        assert state['ai_source'] == state['changes']['ai_source'] == 'model'
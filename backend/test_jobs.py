@@ -0,0 +1,42 @@
+"""SQLite job queue leases, retries and worker processing"""
+
+import jobs
+from jobs import JobQueue
+from worker import Worker
+
+
+def test_worker_retries_then_succeeds(tmp_path, monkeypatch):
+    monkeypatch.setattr(jobs, 'retry_delay', lambda attempt: 0)
+    queue = JobQueue(str(tmp_path / 'jobs.db'))
+    calls = []
+
+    def flaky(payload):
+        calls.append(payload)
+        if len(calls) == 1:
+            raise RuntimeError("browser crashed")
+        return {'url': payload['url'], 'cookies': []}
+
+    job_id = queue.enqueue('scan', {'url': 'https://a.example'})
+    worker = Worker(queue, {'scan': flaky})
+    assert worker.run_once()
+    assert queue.get(job_id)['status'] == 'queued'
+    assert queue.get(job_id)['error'] == "RuntimeError: browser crashed"
+    assert worker.run_once()
+    assert not worker.run_once()
+
+    job = queue.get(job_id)
+    assert job['status'] == 'succeeded' and job['attempts'] == 2
+    assert job['result'] == {'url': 'https://a.example', 'cookies': []}
+
+
+def test_expired_lease_is_taken_over(tmp_path):
+    queue = JobQueue(str(tmp_path / 'jobs.db'), visibility_timeout=0, max_attempts=2)
+    job_id = queue.enqueue('scan', {'url': 'https://a.example'})
+
+    assert queue.lease(['compliance'], 'w1') is None
+    assert queue.lease(['scan'], 'w1')['id'] == job_id
+    # w1 stopped heartbeating; w2 picks the job up and w1's late result is ignored
+    assert queue.lease(['scan'], 'w2')['attempts'] == 2
+    assert not queue.complete(job_id, 'w1', {'stale': True})
+    assert queue.lease(['scan'], 'w3') is None
+    assert queue.get(job_id)['status'] == 'failed'
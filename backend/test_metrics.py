@@ -0,0 +1,61 @@
+"""Prometheus text rendering and stage instrumentation"""
+import pytest
+from metrics import ERRORS, SCANS, SCANS_IN_FLIGHT, STAGE_SECONDS, Counter, Gauge, Histogram, Registry, stage
+
+
+def test_render_exposition_format():
+    registry = Registry()
+    requests = Counter('req_total', 'Requests', ['path'], registry=registry)
+    in_flight = Gauge('in_flight', 'In flight', registry=registry)
+    latency = Histogram('latency_seconds', 'Latency', buckets=[0.1, 1], registry=registry)
+    requests.labels('/scan').inc()
+    requests.labels('/a"b').inc(2)
+    with in_flight.track():
+        in_flight.inc()
+    latency.observe(0.05)
+    latency.observe(0.5)
+    latency.observe(3)
+
+    assert registry.render().splitlines() == [
+        '# HELP req_total Requests', '# TYPE req_total counter',
+        'req_total{path="/a\\"b"} 2', 'req_total{path="/scan"} 1',
+        '# HELP in_flight In flight', '# TYPE in_flight gauge', 'in_flight 1',
+        '# HELP latency_seconds Latency', '# TYPE latency_seconds histogram',
+        'latency_seconds_bucket{le="0.1"} 1', 'latency_seconds_bucket{le="1"} 2', 'latency_seconds_bucket{le="+Inf"} 3',
+        'latency_seconds_sum 3.55', 'latency_seconds_count 3',
+    ]
+
+
+def test_stage_records_duration_and_errors():
+    before = STAGE_SECONDS.labels('test_stage').counts[:]
+    with pytest.raises(TimeoutError):
+        with stage('test_stage'):
+            raise TimeoutError()
+    with stage('test_stage'):
+        pass
+    assert sum(STAGE_SECONDS.labels('test_stage').counts) == sum(before) + 2
+    assert ERRORS.labels('test_stage', 'TimeoutError').value == 1
+
+
+def test_workflow_counts_each_browser_scan(monkeypatch, tmp_path):
+    import workflow
+    from history import ScanHistory
+
+    def collect_scan(url):
+        assert SCANS_IN_FLIGHT.labels().value == in_flight + 1
+        if 'broken' in url:
+            raise TimeoutError('navigation timed out')
+        return {'url': url, 'scannedAt': '2025-01-01T00:00:00', 'cookies': [], 'localStorage': {}, 'thirdParties': []}
+
+    monkeypatch.setattr(workflow, 'collect_scan', collect_scan)
+    monkeypatch.setattr(workflow, 'analyze_with_ai', lambda scan_data, **known: ('summary', 'local'))
+    monkeypatch.setattr(workflow, 'HISTORY', ScanHistory(str(tmp_path)))
+    in_flight = SCANS_IN_FLIGHT.labels().value
+    succeeded, failed = SCANS.labels('success').value, SCANS.labels('error').value
+
+    workflow.run_compliance_scan('https://a.example/')
+    with pytest.raises(Exception, match='navigation timed out'):
+        workflow.run_compliance_scan('https://broken.example/')
+    assert SCANS.labels('success').value == succeeded + 1
+    assert SCANS.labels('error').value == failed + 1
+    assert SCANS_IN_FLIGHT.labels().value == in_flight
@@ -0,0 +1,69 @@
+"""Response profiles, field selection and compression"""
+import json
+import os
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from starlette.responses import Response, StreamingResponse
+from compression import CompressionMiddleware, accepted_encoding
+from projection import parse_view, project
+
+with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'text.json')) as f:
+    RESPONSE = json.load(f)
+
+
+def test_profiles_drop_or_hash_payloads():
+    scan = RESPONSE['scan_results']
+    compact = project(RESPONSE, **parse_view('compact'))['scan_results']
+    assert all('value' not in cookie and cookie['valueLength'] == len(original['value'])
+               for cookie, original in zip(compact['cookies'], scan['cookies']))
+    assert set(compact['localStorage']) == set(scan['localStorage'])
+    assert compact['summary']['cookieCount'] == len(scan['cookies'])
+    assert compact['summary']['thirdPartyCount'] == len(scan['thirdParties'])
+
+    summary = project(scan, **parse_view('summary', include='thirdParties'))
+    assert 'cookies' not in summary and 'localStorage' not in summary
+    assert summary['thirdParties'] == scan['thirdParties']
+    assert summary['humanReadableAnalysis'] == scan['humanReadableAnalysis']
+    assert 'value' in scan['cookies'][0]  # the cached result is left alone
+
+
+def test_fields_and_validation():
+    view = parse_view(fields='overall_summary.overall_score, scan_results.url,scan_results,missing.key')
+    assert project(RESPONSE, **view) == {
+        'overall_summary': {'overall_score': RESPONSE['overall_summary']['overall_score']},
+        'scan_results': RESPONSE['scan_results'],
+    }
+    assert parse_view() is None
+    with pytest.raises(ValueError):
+        parse_view('tiny')
+    with pytest.raises(ValueError):
+        parse_view('summary', include='cookies,passwords')
+
+
+def test_compresses_complete_bodies_above_threshold():
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=100)
+    body = json.dumps(RESPONSE).encode()
+
+    @app.get('/big')
+    def big():
+        return Response(body, media_type='application/json', headers={'ETag': '"abc"'})
+
+    @app.get('/small')
+    def small():
+        return {'ok': True}
+
+    @app.get('/stream')
+    def stream():
+        return StreamingResponse(iter([b'{"a": 1}\n'] * 50), media_type='application/x-ndjson')
+
+    client = TestClient(app)
+    response = client.get('/big', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['content-encoding'] == 'gzip' and response.headers['etag'] == 'W/"abc"'
+    assert int(response.headers['content-length']) < len(body) / 2 and response.content == body
+    assert 'accept-encoding' in response.headers['vary'].lower()
+    assert 'content-encoding' not in client.get('/small', headers={'Accept-Encoding': 'gzip'}).headers
+    assert 'content-encoding' not in client.get('/stream', headers={'Accept-Encoding': 'gzip'}).headers
+    assert 'content-encoding' not in client.get('/big', headers={'Accept-Encoding': 'identity'}).headers
+    assert accepted_encoding('gzip;q=0, deflate') is None
@@ -0,0 +1,62 @@
+"""Tiered scan result cache, freshness directives and conditional requests"""
+from resultcache import ResultCache, freshness, not_modified
+
+
+def test_tiers_freshness_and_refresh(tmp_path, monkeypatch):
+    path = str(tmp_path / 'results.db')
+    cache = ResultCache(path, max_age=60)
+    scans = []
+
+    def scan():
+        scans.append(1)
+        return {'url': 'https://a.example', 'cookies': [len(scans)]}
+
+    entry, status = cache.get_or_compute('scan a.example', scan)
+    assert status == 'miss' and entry.result['cookies'] == [1]
+    assert cache.get_or_compute('scan a.example', scan)[1] == 'hit'
+
+    # another worker process only shares the SQLite tier
+    other = ResultCache(path, max_age=60)
+    shared, status = other.get_or_compute('scan a.example', scan)
+    assert status == 'hit' and shared.etag == entry.etag and len(scans) == 1
+    assert isinstance(shared.body, bytes) and shared.body == entry.body
+
+    monkeypatch.setattr(entry, 'stored_at', entry.stored_at - 90)
+    assert cache.get_or_compute('scan a.example', scan, max_stale=60)[1] == 'stale'
+    entry, status = cache.get_or_compute('scan a.example', scan)
+    assert status == 'miss' and entry.result['cookies'] == [2]
+    assert cache.get_or_compute('scan a.example', scan, force_refresh=True)[1] == 'refresh'
+    assert cache.stats()['hits'] == 1 and cache.stats()['stale_hits'] == 1
+
+
+def test_request_directives_and_validators():
+    assert freshness('no-cache')['force_refresh']
+    assert freshness('max-age=0')['force_refresh']
+    assert freshness('max-stale=30', max_stale=10)['max_stale'] == 30
+    assert freshness('max-stale')['max_stale'] == float('inf')
+    assert freshness(None, force_refresh=True) == {'max_age': None, 'max_stale': 0, 'force_refresh': True}
+
+    entry = ResultCache(None).put('k', {'cookies': []})
+    assert not_modified(entry, f'W/"{entry.etag}", "other"')
+    assert not not_modified(entry, '"other"')
+    assert not_modified(entry, if_modified_since='Fri, 01 Jan 2100 00:00:00 GMT')
+    assert not not_modified(entry, if_modified_since='Mon, 01 Jan 2001 00:00:00 GMT')
+
+
+def test_reads_text_bodies_written_before_bytes(tmp_path):
+    path = str(tmp_path / 'results.db')
+    cache = ResultCache(path)
+    cache._db().execute("INSERT INTO results (key, body, etag, stored_at) VALUES (?, ?, ?, ?)",
+                        ('old', '{"url": "https://a.example"}', 'tag', 0))
+    entry = ResultCache(path).get('old')
+    assert entry.body == b'{"url": "https://a.example"}' and entry.result == {'url': 'https://a.example'}
+
+
+def test_uncacheable_results_are_not_stored():
+    cache = ResultCache(None)
+    results = iter([{'analysisFailed': True}, {'analysisFailed': False}])
+    ok = lambda result: not result['analysisFailed']
+    entry, status = cache.get_or_compute('k', lambda: next(results), cacheable=ok)
+    assert status == 'miss' and entry.result['analysisFailed'] and cache.get('k') is None
+    entry, status = cache.get_or_compute('k', lambda: next(results), cacheable=ok)
+    assert status == 'miss' and cache.get('k') is entry
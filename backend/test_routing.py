@@ -0,0 +1,58 @@
+"""Model routing: complexity thresholds, fallbacks and stats"""
+from routing import LatencyHistogram, ModelRouter, complexity_score
+
+
+def scan(cookies=0, third_parties=0, local_storage=0):
+    return {
+        'url': 'https://example.com',
+        'cookies': [{'name': f'c{i}'} for i in range(cookies)],
+        'thirdParties': [f'tp{i}.com' for i in range(third_parties)],
+        'localStorage': {f'k{i}': 'v' for i in range(local_storage)},
+    }
+
+
+def test_complexity_score_weights_known_cookies_lower():
+    data = scan(cookies=4, third_parties=1, local_storage=2)
+    assert complexity_score(data) == 4 + 2 + 1
+    assert complexity_score(data, unknown_cookies=data['cookies'][:1]) == 1 + 0.75 + 2 + 1
+
+
+def test_route_thresholds():
+    router = ModelRouter(fast_model='fast', thorough_model='thorough', fast_max_score=12, local_max_score=3)
+    assert router.route(scan(cookies=3)) == {'tier': 'local', 'model_id': None, 'score': 3}
+    assert router.route(scan(cookies=4))['tier'] == 'fast'
+    assert router.route(scan(cookies=12)) == {'tier': 'fast', 'model_id': 'fast', 'score': 12}
+    assert router.route(scan(cookies=11, local_storage=3)) == {'tier': 'thorough', 'model_id': 'thorough',
+                                                                'score': 12.5}
+    # cookies already in the memo barely count
+    many = scan(cookies=12)
+    assert router.route(many, unknown_cookies=[])['tier'] == 'local'
+
+
+def test_fallbacks_and_stats():
+    router = ModelRouter(fast_model='fast', thorough_model='thorough', history=2)
+    router.route(scan())
+    router.route(scan(cookies=8))
+    router.route(scan(cookies=50))
+    router.record_fallback('no_api_key')
+    router.record_fallback('bedrock_error')
+    router.record_fallback('no_api_key')
+    router.observe('fast', 0.3)
+    router.observe('fast', 1.5)
+
+    stats = router.stats()
+    assert stats['decisions'] == {'local': 1, 'fast': 1, 'thorough': 1}
+    assert stats['fallbacks'] == {'no_api_key': 2, 'bedrock_error': 1}
+    assert [d['tier'] for d in stats['recent']] == ['fast', 'thorough']
+    assert stats['latency']['fast']['count'] == 2
+    assert stats['latency']['fast']['p50'] == 0.5
+    assert router.latency('thorough') is None
+
+
+def test_histogram_percentile():
+    histogram = LatencyHistogram(buckets=[1, 2])
+    assert histogram.percentile(0.5) is None
+    for seconds in (0.5, 1.5, 1.5, 5):
+        histogram.observe(seconds)
+    assert histogram.percentile(0.5) == 2
+    assert histogram.percentile(1.0) == float('inf')
@@ -0,0 +1,87 @@
+"""Rule compilation, hot reload and the compliance results built on them"""
+import json
+import os
+import pytest
+from compliance import check_compliance
+from rules import RULES_PATH, RuleEngine, RuleError, compile_expression, compile_message
+
+with open(RULES_PATH) as f:
+    SPEC = json.load(f)
+
+
+def write(path, spec, mtime):
+    path.write_text(json.dumps(spec))
+    os.utime(path, (mtime, mtime))
+
+
+def test_expressions_compile_to_feature_functions():
+    fn, names = compile_expression("len([n for n in insecure if n]) > cookie_count // 2", 'r')
+    assert names == {'insecure', 'cookie_count'}
+    assert fn(insecure=['a', 'b', None], cookie_count=3, rows=[]) is True
+    render, names = compile_message([["not session_cookies", "none"], "{', '.join(session_cookies)}"], 'r')
+    assert render(session_cookies=[]) == 'none' and render(session_cookies=['a', 'b']) == 'a, b'
+
+
+@pytest.mark.parametrize('expr, error', [
+    ("cookie_count >", "invalid expression"),
+    ("cookies > 0", "unknown feature(s) ['cookies']"),
+    ("__import__('os')", "only builtins and methods"),
+    ("insecure.__class__", "attribute '__class__'"),
+    ("sorted(insecure, key=lambda n: n)", "Lambda is not allowed"),
+    ("[x := 1]", "NamedExpr is not allowed"),
+    ("2 ** cookie_count", "Pow is not allowed"),
+])
+def test_rejected_expressions(expr, error):
+    with pytest.raises(RuleError, match='^r: ') as e:
+        compile_expression(expr, 'r')
+    assert error in str(e.value)
+
+
+def test_hot_reload_and_keeping_the_last_good_rules(tmp_path):
+    path = tmp_path / 'rules.json'
+    write(path, SPEC, 1000)
+    engine = RuleEngine(str(path), reload_interval=0)
+    assert engine.reload_if_changed() is False and engine.version == 1000
+
+    spec = json.loads(json.dumps(SPEC))
+    spec['rules'][0]['messages']['pass'] = 'Consent banner found'
+    write(path, spec, 2000)
+    assert engine.reload_if_changed() is True and engine.version == 2000
+    assert engine.rule_for('ccpa-consent').pass_message() == 'Consent banner found'
+
+    spec['rules'][0]['pass'] = 'cookie_count.__class__'
+    write(path, spec, 3000)
+    assert engine.reload_if_changed() is False
+    assert "attribute '__class__'" in engine.last_error
+    assert engine.version == 2000 and engine.rule_for('ccpa-consent').pass_message() == 'Consent banner found'
+
+    path.write_text('{"rules": [')
+    os.utime(path, (4000, 4000))
+    assert engine.reload_if_changed() is False and engine.version == 2000
+
+    write(path, SPEC, 5000)
+    assert engine.reload_if_changed() is True and engine.last_error is None
+
+
+def test_check_compliance():
+    cookie = {'name': 'pref', 'domain': 'a.example', 'value': '1', 'secure': False, 'httpOnly': False,
+              'sameSite': 'Lax', 'expires': 1900000000}
+    results = check_compliance({'url': 'https://a.example/', 'cookies': [cookie], 'thirdParties': ['ads.example']})
+
+    # every framework scores the cookie flags; httpOnly only counts with session cookies,
+    # third parties only warn
+    for result in results.values():
+        assert result['passed'] == ["All cookies have 'sameSite' attribute set"]
+        assert result['failed'] == ["1 cookie(s) missing 'Secure' flag: pref"]
+        assert result['warnings'] == ['Detected 1 third-party service(s)'] and result['score'] == 50.0
+
+    empty = check_compliance({'url': 'https://a.example/', 'cookies': [], 'thirdParties': []}, ['ccpa', 'nope'])
+    assert list(empty) == ['ccpa'] and empty['ccpa']['score'] == 100.0 and empty['ccpa']['warnings'] == []
+
+
+def test_check_compliance_scores_for_text_json():
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'text.json')) as f:
+        scan = json.load(f)['scan_results']
+    results = check_compliance(scan)
+    assert {fw: r['score'] for fw, r in results.items()} == {'gdpr': 33.3, 'ccpa': 33.3}
+    assert all(len(r['failed']) == 2 and len(r['warnings']) == 1 for r in results.values())
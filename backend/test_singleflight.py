@@ -0,0 +1,86 @@
+"""Single-flight coalescing within a process and across processes"""
+import multiprocessing
+import threading
+import time
+from singleflight import SingleFlight, flight_key
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight(directory=None)
+    calls = []
+    started = threading.Event()
+
+    def scan(url):
+        calls.append(url)
+        started.set()
+        time.sleep(0.2)
+        return {'url': url, 'cookies': []}
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flight.do('k', scan, 'https://a.example')))
+               for _ in range(8)]
+    threads[0].start()
+    started.wait()
+    for thread in threads[1:]:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert calls == ['https://a.example']
+    assert len(results) == 8 and all(r is results[0] for r in results)
+    stats = flight.stats()
+    assert stats['executed'] == 1 and stats['coalesced'] == 7 and stats['hit_rate'] == 0.875
+    # nothing stays in flight, so the next call scans again
+    flight.do('k', scan, 'https://a.example')
+    assert len(calls) == 2
+
+
+def test_error_reaches_every_waiter():
+    flight = SingleFlight(directory=None)
+    release = threading.Event()
+
+    def scan():
+        release.wait()
+        raise RuntimeError("navigation timeout")
+
+    errors = []
+
+    def call():
+        try:
+            flight.do('k', scan)
+        except RuntimeError as e:
+            errors.append(str(e))
+
+    threads = [threading.Thread(target=call) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    while flight.stats()['requests'] < 3:
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert errors == ["navigation timeout"] * 3
+
+
+def _slow_leader(directory, ready):
+    flight = SingleFlight(directory)
+    flight.do('scan https://a.example', lambda: (ready.set(), time.sleep(0.5), {'cookies': ['from leader']})[2])
+
+
+def test_other_process_reuses_leader_result(tmp_path):
+    ready = multiprocessing.Event()
+    leader = multiprocessing.Process(target=_slow_leader, args=(str(tmp_path), ready))
+    leader.start()
+    assert ready.wait(5)
+
+    flight = SingleFlight(str(tmp_path))
+    result = flight.do('scan https://a.example', lambda: {'cookies': ['own scan']})
+    leader.join()
+    assert result == {'cookies': ['from leader']}
+    assert flight.stats()['coalesced_remote'] == 1 and flight.stats()['executed'] == 0
+
+
+def test_flight_key_ignores_url_spelling_and_framework_order():
+    assert flight_key('compliance', 'HTTPS://Example.com/?utm_source=x', ['ccpa', 'gdpr']) == \
+        flight_key('compliance', 'https://example.com', ['gdpr', 'ccpa'])
+    assert flight_key('scan', 'https://example.com') != flight_key('compliance', 'https://example.com')
@@ -0,0 +1,43 @@
+"""Local rule-based summary"""
+from compliance import check_compliance
+from summary import local_summary
+
+SCAN = {
+    'url': 'https://a.example/', 'scannedAt': '2025-01-01T00:00:00',
+    'cookies': [{'name': 'session_id', 'domain': 'a.example', 'secure': False, 'httpOnly': False, 'sameSite': 'Lax'},
+                {'name': 'pref', 'domain': 'a.example', 'secure': True, 'httpOnly': True, 'sameSite': 'Strict',
+                 'expires': 1900000000}],
+    'thirdParties': ['doubleclick.net', 'fonts.gstatic.com'],
+}
+
+
+def sections(text):
+    risk, findings, recommendations = text.split('\n', 1)[0], *text.split('**Recommendations**:')
+    return risk, [l[2:] for l in findings.splitlines() if l.startswith('- ')], \
+        [l[2:] for l in recommendations.splitlines() if l.startswith('- ')]
+
+
+def test_findings_and_recommendations_follow_the_rules():
+    risk, findings, recommendations = sections(local_summary(SCAN))
+    assert risk == '**Risk Level**: High'
+    assert findings[0] == "1 cookie(s) missing 'Secure' flag: session_id"
+    assert findings[1] == "1 session cookie(s) missing 'httpOnly' flag"
+    assert len(findings) == len(recommendations) == 3
+    assert recommendations[0].startswith("Set 'Secure' flag")
+
+
+def test_clean_scan():
+    clean = {**SCAN, 'cookies': [SCAN['cookies'][1]], 'thirdParties': []}
+    risk, findings, recommendations = sections(local_summary(clean))
+    assert risk == '**Risk Level**: Low'
+    assert findings == ["No cookie security issues detected"]
+    assert recommendations == ["Keep monitoring new cookies and third parties on each release"]
+
+
+def test_uses_the_results_it_is_given():
+    results = check_compliance(SCAN, ['gdpr'])
+    results['gdpr']['failed'] = results['gdpr']['failed'][:1]
+    assert local_summary(SCAN, results, []) != local_summary(SCAN)
+    assert local_summary(SCAN, check_compliance(SCAN), None) == local_summary(SCAN)
+    risk, findings, _ = sections(local_summary(SCAN, {}, []))
+    assert risk == '**Risk Level**: Low' and findings == ["No cookie security issues detected"]
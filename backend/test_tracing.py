@@ -0,0 +1,74 @@
+"""Span nesting, trace export and the request middleware"""
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+import tracing
+from metrics import stage, track_scan
+from tracing import TracingMiddleware, parse_traceparent, set_attributes, span, to_otlp
+
+
+class ListExporter:
+    def __init__(self):
+        self.traces = []
+
+    def export(self, spans):
+        self.traces.append(spans)
+
+
+@pytest.fixture
+def exported(monkeypatch):
+    exporter = ListExporter()
+    monkeypatch.setattr(tracing.TRACER, 'exporter', exporter)
+    return exporter.traces
+
+
+def test_disabled_by_default():
+    assert tracing.exporter_from_config('', 'unused') is None
+    with span('ignored') as s:
+        set_attributes({'a': 1})
+    assert s is None
+
+
+def test_stages_nest_under_scan_and_export_once(exported):
+    with track_scan():
+        with stage('navigation'):
+            pass
+        with pytest.raises(TimeoutError):
+            with stage('cookie_extraction'):
+                raise TimeoutError('slow')
+        set_attributes({'scan.cookie_count': 3})
+
+    assert len(exported) == 1
+    spans = {s.name: s for s in exported[0]}
+    root = spans['scan']
+    assert root.parent_id is None and root.attributes == {'scan.cookie_count': 3}
+    assert spans['scan.navigation'].parent_id == root.span_id
+    assert spans['scan.cookie_extraction'].error == 'TimeoutError: slow'
+    assert {s.trace_id for s in exported[0]} == {root.trace_id}
+
+    otlp = to_otlp(exported[0], 'test')['resourceSpans'][0]['scopeSpans'][0]['spans']
+    by_name = {s['name']: s for s in otlp}
+    assert by_name['scan']['attributes'] == [{'key': 'scan.cookie_count', 'value': {'intValue': '3'}}]
+    assert by_name['scan.cookie_extraction']['status']['code'] == 2
+    assert 'parentSpanId' not in by_name['scan']
+
+
+def test_middleware_root_span_and_traceparent(exported):
+    app = FastAPI()
+    app.add_middleware(TracingMiddleware)
+
+    @app.get('/scan')
+    def scan():
+        with stage('navigation'):
+            pass
+        return {'ok': True}
+
+    upstream = '00-' + 'a' * 32 + '-' + 'b' * 16 + '-01'
+    response = TestClient(app).get('/scan', headers={'traceparent': upstream})
+
+    trace_id, span_id = parse_traceparent(response.headers['traceparent'])
+    spans = {s.name: s for s in exported[0]}
+    root = spans['GET /scan']
+    assert trace_id == 'a' * 32 and root.span_id == span_id and root.parent_id == 'b' * 16
+    assert root.attributes['http.status_code'] == 200
+    assert spans['scan.navigation'].parent_id == root.span_id
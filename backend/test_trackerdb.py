@@ -0,0 +1,61 @@
+"""Compiled tracker database: build, lookups and parity with the JSON classifier"""
+import json
+import pytest
+from config import TRACKER_DB_PATH
+from trackerdb import MAGIC, TrackerDB, build, is_compiled, reverse_domain
+from trackers import load_classifier
+
+with open(TRACKER_DB_PATH) as f:
+    SOURCE = json.load(f)
+DOMAINS = SOURCE['domains']
+
+HOSTS = list(DOMAINS) + [f"cdn.eu.{domain}" for domain in DOMAINS] + [
+    'www.facebook-cdn.example', 'd1.cloudfront.net', 'stats.doubleclick.example', 'example.com', '', 'localhost',
+]
+
+
+@pytest.fixture
+def compiled(tmp_path):
+    path = str(tmp_path / 'trackers.db')
+    assert build([TRACKER_DB_PATH], path) == (len(DOMAINS), len(SOURCE['patterns']))
+    return path
+
+
+def test_build_and_lookup_round_trip(compiled):
+    assert is_compiled(compiled) and not is_compiled(TRACKER_DB_PATH)
+    db = TrackerDB(compiled)
+    try:
+        assert len(db) == len(DOMAINS)
+        for domain, (category, owner, risk) in DOMAINS.items():
+            assert db.find(reverse_domain(domain).encode()) == {'category': category, 'owner': owner,
+                                                                 'risk_level': risk}
+        assert db.find(b'com.example') is None
+    finally:
+        db.close()
+
+
+def test_parity_with_json_classifier(compiled):
+    from_json, from_db = load_classifier(TRACKER_DB_PATH), load_classifier(compiled)
+    assert len(from_json) == len(from_db)
+    for host in HOSTS:
+        assert from_db.classify(host) == from_json.classify(host), host
+
+
+@pytest.mark.parametrize('content', [
+    b'PK\x03\x04 not a tracker database at all',
+    MAGIC[:4],
+    MAGIC + b'\x63\x00\x00\x00' + b'\x00' * 40,
+])
+def test_rejects_foreign_and_corrupt_files(tmp_path, content):
+    path = tmp_path / 'bad.db'
+    path.write_bytes(content)
+    with pytest.raises(ValueError):
+        TrackerDB(str(path))
+
+
+def test_rejects_truncated_file(compiled, tmp_path):
+    data = open(compiled, 'rb').read()
+    path = tmp_path / 'truncated.db'
+    path.write_bytes(data[:len(data) // 2])
+    with pytest.raises(ValueError, match='truncated or corrupt'):
+        TrackerDB(str(path))
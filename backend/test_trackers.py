@@ -0,0 +1,43 @@
+"""Suffix trie and Aho-Corasick lookups behind classify_domain"""
+from trackers import UNKNOWN, AhoCorasick, SuffixTrie, TrackerClassifier
+
+
+def test_suffix_trie_longest_suffix_wins():
+    trie = SuffixTrie()
+    trie.add('google.com', 'google')
+    trie.add('.Ads.Google.com.', 'ads')
+    assert len(trie) == 2
+    assert trie.longest_match('google.com') == 'google'
+    assert trie.longest_match('mail.google.com') == 'google'
+    assert trie.longest_match('ads.google.com') == 'ads'
+    assert trie.longest_match('x.y.ads.google.com') == 'ads'
+    # whole labels only
+    assert trie.longest_match('notgoogle.com') is None
+    assert trie.longest_match('google.com.evil.example') is None
+    assert trie.longest_match('com') is None
+
+
+def test_aho_corasick_finds_patterns_anywhere():
+    automaton = AhoCorasick()
+    for priority, pattern in enumerate(['analytics', 'tics', 'ads', 'lytic']):
+        automaton.add(pattern, pattern, priority)
+    assert automaton.search('cdn.analytics.example') == 'analytics'
+    assert automaton.search('x-lytics.example') == 'tics'  # via fail links
+    assert automaton.search('downloads.example') == 'ads'
+    assert automaton.search('ad.example') is None
+    assert automaton.search('') is None
+    # the earliest added pattern wins when several occur, wherever they are in the host
+    assert automaton.search('ads.analytics.example') == 'analytics'
+
+
+def test_classifier_prefers_domains_over_patterns():
+    classifier = TrackerClassifier()
+    classifier.add_domain('doubleclick.net', 'Advertising', 'Google', 'high')
+    classifier.add_pattern('facebook', 'Social', 'Meta')
+    assert classifier.classify('stats.g.DoubleClick.net.')['risk_level'] == 'high'
+    assert classifier.classify('static.xx.facebook-cdn.example')['owner'] == 'Meta'
+    assert classifier.classify('example.com') is UNKNOWN
+    assert classifier.classify(None) is UNKNOWN
+
+    classifier.add_domain('facebook-cdn.example', 'CDN', 'Meta', 'low')
+    assert classifier.classify('static.xx.facebook-cdn.example')['category'] == 'CDN'
@@ -0,0 +1,97 @@
+"""URL canonicalisation: examples and properties"""
+from pathlib import Path
+from urllib.parse import parse_qsl, quote, urlencode, urlsplit
+from hypothesis import given, strategies as st
+from urlcanon import DEFAULT_PORTS, canonicalize_url, is_tracking_param, site_key
+
+labels = st.text('abcdefghijklmnopqrstuvwxyz0123456789', min_size=1, max_size=12)
+hosts = st.builds(lambda ls, tld: '.'.join(ls + [tld]), st.lists(labels, min_size=1, max_size=3),
+                  st.sampled_from(['com', 'example', 'org', 'xn--p1ai']))
+segments = st.text(st.characters(blacklist_characters='/?#%\\', blacklist_categories=('Cs', 'Cc')), min_size=1,
+                   max_size=8)
+params = st.lists(st.tuples(st.text('abcdefghij_', min_size=1, max_size=6), st.text(max_size=8)), max_size=4)
+urls = st.builds(
+    lambda scheme, host, port, path, query: f"{scheme}://{host}{port}/{'/'.join(path)}{query}",
+    st.sampled_from(['http', 'https', 'HTTPS', 'Http']),
+    hosts.map(str.upper) | hosts,
+    st.sampled_from(['', ':8080', ':443', ':80']),
+    st.lists(segments, max_size=3),
+    st.sampled_from(['', '?b=2&a=1', '?utm_source=x', '?q=a+b&q=c']),
+)
+
+
+def test_spellings_of_one_page_agree():
+    canonical = 'https://example.com/'
+    for url in ['https://example.com', 'https://example.com/', 'HTTPS://Example.com/?utm_source=x',
+                'https://example.com:443/#top', 'example.com', ' https://EXAMPLE.com./?fbclid=1&gclid=2 ']:
+        assert canonicalize_url(url) == canonical
+    assert canonicalize_url('http://Bücher.example:8080/a/./b/../c/?b=2&a=1') == \
+        'http://xn--bcher-kva.example:8080/a/c?a=1&b=2'
+    assert canonicalize_url('https://a.example/%7euser/%2f') == 'https://a.example/~user/%2F'
+    assert site_key('http://www.a.example/') == 'a.example'
+
+
+@given(urls)
+def test_idempotent(url):
+    canonical = canonicalize_url(url)
+    assert canonicalize_url(canonical) == canonical
+
+
+@given(urls, st.sampled_from(['#frag', '?utm_medium=mail', '/', 'upper']))
+def test_equivalent_spellings_collapse(url, variation):
+    scheme, rest = url.split('://', 1)
+    host, sep, tail = rest.partition('/')
+    if variation == 'upper':
+        variant = f"{scheme.upper()}://{host.upper()}{sep}{tail}"
+    elif variation == '/' and '?' in url:
+        variant = url.replace('?', '/?', 1)
+    elif variation == '?utm_medium=mail' and '?' in url:
+        variant = url + '&utm_medium=mail'
+    else:
+        variant = url + variation
+    assert canonicalize_url(variant) == canonicalize_url(url)
+
+
+@given(urls)
+def test_shape(url):
+    parts = urlsplit(canonicalize_url(url))
+    assert parts.scheme in ('http', 'https') and parts.hostname == parts.hostname.lower()
+    assert not parts.fragment and parts.port != DEFAULT_PORTS[parts.scheme]
+    pairs = parse_qsl(parts.query, keep_blank_values=True)
+    assert pairs == sorted(pairs) and not any(is_tracking_param(k) for k, _ in pairs)
+    assert parts.path == '/' or not parts.path.endswith('/')
+
+
+@given(params, params)
+def test_query_order_is_irrelevant(first, second):
+    def url(pairs):
+        return 'https://a.example/p?' + urlencode(pairs, quote_via=quote)
+    assert canonicalize_url(url(first + second)) == canonicalize_url(url(second + first))
+
+
+def test_lambda_copies_match():
+    source = Path(__file__).with_name('urlcanon.py').read_text()
+    root = Path(__file__).resolve().parent.parent
+    for copy in [root / 'cookielens-lambda', root / 'cookielens-extension' / 'cookielens-lambda',
+                 root / 'cookielens-extension' / 'lambda-deploy']:
+        assert (copy / 'urlcanon.py').read_text() == source
+
+
+def test_api_keys_on_the_canonical_url_but_scans_the_one_sent(monkeypatch, tmp_path):
+    from fastapi.testclient import TestClient
+    import api
+    from jobs import JobQueue
+    from resultcache import ResultCache
+    from singleflight import SingleFlight
+    scanned = []
+    monkeypatch.setattr(api, 'CACHE', ResultCache(str(tmp_path / 'results.db')))
+    monkeypatch.setattr(api, 'JOBS', JobQueue(str(tmp_path / 'jobs.db')))
+    monkeypatch.setattr(api, 'INFLIGHT', SingleFlight(None))
+    monkeypatch.setattr(api, 'scan_website', lambda url: scanned.append(url) or {'url': url})
+    client = TestClient(api.app)
+
+    sent = 'HTTPS://Example.com/?utm_source=x&b=1'
+    assert client.post('/scan', json={'url': sent}).json() == {'url': sent}
+    assert client.get('/scan', params={'url': 'https://example.com/?b=1'}).headers['x-cache'] == 'HIT'
+    assert scanned == [sent]
+    assert client.post('/scan', json={'url': 'https://example.com:99999/'}).status_code == 422
@@ -0,0 +1,245 @@
+"""OpenTelemetry-style tracing without the SDK.
+
+A root span per API request (TracingMiddleware), child spans per workflow node
+and per scanner stage (metrics.stage opens one), carried through contextvars so
+they follow requests into the threadpool. When a trace's root span ends, the
+whole trace is written by the configured exporter:
+
+- `console`: one JSON line per span on stderr
+- `otlp-file`: one OTLP/JSON `ExportTraceServiceRequest` per trace, appended to
+  TRACING_FILE (readable by the OpenTelemetry collector's file receiver, otel-tui, ...)
+
+With no exporter configured, span() does nothing.
+"""
+import contextvars
+import json
+import os
+import sys
+import threading
+import time
+from config import TRACING_EXPORTER, TRACING_FILE, TRACING_SERVICE_NAME
+
+_current = contextvars.ContextVar('cookielens_span', default=None)
+
+KINDS = {'internal': 1, 'server': 2, 'client': 3}
+
+
+class Span:
+    __slots__ = ('trace', 'name', 'span_id', 'parent_id', 'kind', 'start', 'end', 'attributes', 'error', 'local_root')
+
+    def __init__(self, trace, name, parent_id, kind, attributes, local_root=False):
+        self.trace = trace
+        self.local_root = local_root
+        self.name = name
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.kind = kind
+        self.start = time.time_ns()
+        self.end = None
+        self.attributes = dict(attributes or {})
+        self.error = None
+
+    @property
+    def trace_id(self):
+        return self.trace.trace_id
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+
+class _Trace:
+    def __init__(self, trace_id):
+        self.trace_id = trace_id
+        self.spans = []
+        self.lock = threading.Lock()
+
+
+class Tracer:
+    def __init__(self, exporter=None):
+        self.exporter = exporter
+
+    @property
+    def enabled(self):
+        return self.exporter is not None
+
+    def start(self, name, attributes=None, kind='internal', remote_parent=None):
+        parent = _current.get()
+        if parent is not None:
+            return Span(parent.trace, name, parent.span_id, kind, attributes)
+        if remote_parent:
+            trace, parent_id = _Trace(remote_parent[0]), remote_parent[1]
+        else:
+            trace, parent_id = _Trace(os.urandom(16).hex()), None
+        return Span(trace, name, parent_id, kind, attributes, local_root=True)
+
+    def finish(self, span):
+        span.end = time.time_ns()
+        trace = span.trace
+        with trace.lock:
+            trace.spans.append(span)
+            # the local root ends last; export the trace in one piece
+            spans = trace.spans[:] if span.local_root else None
+            if span.local_root:
+                trace.spans.clear()
+        if spans:
+            try:
+                self.exporter.export(spans)
+            except Exception as e:
+                print(f"trace export failed: {e}", file=sys.stderr)
+
+
+class span:
+    """`with span('name', {'attr': value}) as s:` opens a child of the current span (s is None when tracing is off)."""
+    __slots__ = ('name', 'attributes', 'kind', 'remote_parent', '_span', '_token')
+
+    def __init__(self, name, attributes=None, kind='internal', remote_parent=None):
+        self.name = name
+        self.attributes = attributes
+        self.kind = kind
+        self.remote_parent = remote_parent
+        self._span = None
+
+    def __enter__(self):
+        if not TRACER.enabled:
+            return None
+        self._span = TRACER.start(self.name, self.attributes, self.kind, self.remote_parent)
+        self._token = _current.set(self._span)
+        return self._span
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._span is None:
+            return False
+        if exc_type is not None:
+            self._span.error = f"{exc_type.__name__}: {exc}"
+            self._span.attributes['exception.type'] = exc_type.__name__
+        _current.reset(self._token)
+        TRACER.finish(self._span)
+        return False
+
+
+def set_attributes(attributes):
+    """Add attributes to the current span, if any."""
+    current = _current.get()
+    if current is not None:
+        current.attributes.update(attributes)
+
+
+def current_trace_id():
+    current = _current.get()
+    return current.trace_id if current is not None else None
+
+
+def traced(name, fn):
+    """fn wrapped in a span called `name` (used for LangGraph nodes)."""
+    def wrapper(*args, **kwargs):
+        with span(name):
+            return fn(*args, **kwargs)
+    wrapper.__name__ = getattr(fn, '__name__', name)
+    return wrapper
+
+
+def _otlp_value(value):
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+
+def to_otlp(spans, service_name=TRACING_SERVICE_NAME):
+    return {'resourceSpans': [{
+        'resource': {'attributes': [{'key': 'service.name', 'value': {'stringValue': service_name}}]},
+        'scopeSpans': [{
+            'scope': {'name': 'cookielens'},
+            'spans': [{
+                'traceId': s.trace_id,
+                'spanId': s.span_id,
+                **({'parentSpanId': s.parent_id} if s.parent_id else {}),
+                'name': s.name,
+                'kind': KINDS[s.kind],
+                'startTimeUnixNano': str(s.start),
+                'endTimeUnixNano': str(s.end),
+                'attributes': [{'key': k, 'value': _otlp_value(v)} for k, v in s.attributes.items()],
+                'status': {'code': 2, 'message': s.error} if s.error else {'code': 1},
+            } for s in spans],
+        }],
+    }]}
+
+
+class ConsoleExporter:
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stderr
+        self._lock = threading.Lock()
+
+    def export(self, spans):
+        lines = [json.dumps({
+            'trace_id': s.trace_id,
+            'span_id': s.span_id,
+            'parent_id': s.parent_id,
+            'name': s.name,
+            'duration_ms': round((s.end - s.start) / 1e6, 3),
+            'attributes': s.attributes,
+            **({'error': s.error} if s.error else {}),
+        }, default=str) for s in sorted(spans, key=lambda s: s.start)]
+        with self._lock:
+            self.stream.write('\n'.join(lines) + '\n')
+            self.stream.flush()
+
+
+class OTLPFileExporter:
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans):
+        line = json.dumps(to_otlp(spans), default=str)
+        with self._lock, open(self.path, 'a') as f:
+            f.write(line + '\n')
+
+
+def exporter_from_config(name=TRACING_EXPORTER, path=TRACING_FILE):
+    if name == 'console':
+        return ConsoleExporter()
+    if name in ('otlp-file', 'file', 'otlp'):
+        return OTLPFileExporter(path)
+    return None
+
+
+TRACER = Tracer(exporter_from_config())
+
+
+def parse_traceparent(header):
+    """(trace_id, parent_span_id) from a W3C traceparent header, or None."""
+    parts = (header or '').split('-')
+    if len(parts) == 4 and len(parts[1]) == 32 and len(parts[2]) == 16 and parts[1] != '0' * 32:
+        return parts[1], parts[2]
+    return None
+
+
+class TracingMiddleware:
+    """ASGI middleware opening the root span of each HTTP request and returning its traceparent."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or not TRACER.enabled:
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope.get('headers') or [])
+        remote = parse_traceparent(headers.get(b'traceparent', b'').decode('latin-1'))
+        attributes = {'http.method': scope['method'], 'http.target': scope['path']}
+        with span(f"{scope['method']} {scope['path']}", attributes, kind='server', remote_parent=remote) as root:
+            async def send_with_trace(message):
+                if message['type'] == 'http.response.start':
+                    root.set_attribute('http.status_code', message['status'])
+                    if message['status'] >= 500:
+                        root.error = f"HTTP {message['status']}"
+                    message.setdefault('headers', [])
+                    message['headers'] = [*message['headers'],
+                                          (b'traceparent', f"00-{root.trace_id}-{root.span_id}-01".encode())]
+                await send(message)
+
+            await self.app(scope, receive, send_with_trace)
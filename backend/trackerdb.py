@@ -0,0 +1,221 @@
+"""Compiled, memory-mapped tracker/vendor database.
+
+Layout (little-endian):
+
+    header   magic, version, domain count, pattern count, label count,
+             and the offsets of the sections below
+    index    one (key offset u32, key length u16, pad u16) slot per domain,
+             sorted by reversed domain ("net.doubleclick")
+    records  one (category u32, owner u32, risk u8, pad) slot per domain
+    patterns (key offset, key length, pad) + record slots for substring rules
+    labels   (offset u32, length u16, pad u16) per category/owner/risk string
+    blob     UTF-8 bytes of every key and label
+
+The file is opened with mmap, so every worker shares the same page-cache pages
+and a lookup is a binary search over the index with no per-process parse.
+
+    python trackerdb.py build trackers.json services.json -o trackers.db
+    python trackerdb.py lookup trackers.db googleads.g.doubleclick.net
+"""
+import argparse
+import json
+import mmap
+import struct
+import sys
+
+MAGIC = b'CLTRKDB\x00'
+VERSION = 1
+HEADER = struct.Struct('<8sIIIIIIIII')
+SLOT = struct.Struct('<IHH')
+RECORD = struct.Struct('<IIB3x')
+RISKS = ['low', 'medium', 'high']
+
+DISCONNECT_RISKS = {'Advertising': 'high', 'FingerprintingInvasive': 'high', 'Analytics': 'medium',
+                    'Social': 'medium', 'Content': 'low'}
+
+
+def iter_entries(path):
+    """Yield ('domain' | 'pattern', key, (category, owner, risk)) from a tracker list.
+
+    Accepts the CookieLens format ({"domains": ..., "patterns": ...}) and
+    Disconnect's services.json ({"categories": ...}).
+    """
+    with open(path) as f:
+        data = json.load(f)
+    if 'categories' in data:
+        for category, services in data['categories'].items():
+            for service in services:
+                for owner, sites in service.items():
+                    for domains in sites.values():
+                        if not isinstance(domains, list):
+                            continue
+                        for domain in domains:
+                            yield 'domain', domain, (category, owner, DISCONNECT_RISKS.get(category, 'medium'))
+        return
+    for domain, value in data.get('domains', {}).items():
+        yield 'domain', domain, tuple(value)
+    for pattern, value in data.get('patterns', {}).items():
+        yield 'pattern', pattern, tuple(value)
+
+
+def reverse_domain(domain):
+    return '.'.join(reversed(domain.lower().strip('.').split('.')))
+
+
+def build(sources, output):
+    domains, patterns = {}, {}
+    for source in sources:
+        for kind, key, value in iter_entries(source):
+            if kind == 'domain':
+                domains[reverse_domain(key).encode()] = value
+            else:
+                patterns[key.lower().encode()] = value
+
+    labels, label_ids = [], {}
+
+    def label(text):
+        text = text or ''
+        if text not in label_ids:
+            label_ids[text] = len(labels)
+            labels.append(text.encode())
+        return label_ids[text]
+
+    def record(value):
+        category, owner, risk = value
+        return RECORD.pack(label(category), label(owner), RISKS.index(risk) if risk in RISKS else 1)
+
+    keys = sorted(domains)
+    blob = bytearray()
+
+    def put(data):
+        offset = len(blob)
+        blob.extend(data)
+        return SLOT.pack(offset, len(data), 0)
+
+    index = b''.join(put(k) for k in keys)
+    records = b''.join(record(domains[k]) for k in keys)
+    pattern_section = b''.join(put(p) + record(v) for p, v in patterns.items())
+    label_section = b''.join(put(text) for text in labels)
+
+    index_off = HEADER.size
+    records_off = index_off + len(index)
+    patterns_off = records_off + len(records)
+    labels_off = patterns_off + len(pattern_section)
+    blob_off = labels_off + len(label_section)
+
+    with open(output, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(keys), len(patterns), len(labels),
+                            index_off, records_off, patterns_off, labels_off, blob_off))
+        f.write(index)
+        f.write(records)
+        f.write(pattern_section)
+        f.write(label_section)
+        f.write(blob)
+    return len(keys), len(patterns)
+
+
+def is_compiled(path):
+    with open(path, 'rb') as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+class TrackerDB:
+    """Read-only view of a compiled database; implements SuffixTrie's lookup interface."""
+
+    def __init__(self, path):
+        self._file = open(path, 'rb')
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mm)
+        try:
+            (magic, version, self.count, self.pattern_count, label_count, self._index, self._records,
+             self._patterns, labels_off, self._blob) = HEADER.unpack_from(self._mm, 0)
+        except struct.error:
+            magic = version = None
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"{path} is not a version {VERSION} CookieLens tracker database")
+        if not (self._index <= self._records <= self._patterns <= labels_off <= self._blob <= len(self._mm)) or \
+                self._records - self._index != self.count * SLOT.size:
+            self.close()
+            raise ValueError(f"{path} is truncated or corrupt")
+        # category/owner labels are decoded once; the index, records and keys stay mapped
+        self._labels = [str(self._key(labels_off + i * SLOT.size), 'utf-8') or None for i in range(label_count)]
+
+    def __len__(self):
+        return self.count
+
+    def close(self):
+        self._view.release()
+        self._mm.close()
+        self._file.close()
+
+    def _key(self, slot_offset):
+        """The key as a view into the mapping, without copying it"""
+        offset, length, _ = SLOT.unpack_from(self._view, slot_offset)
+        start = self._blob + offset
+        return self._view[start:start + length]
+
+    def _sort_key(self, slot_offset):
+        # memoryviews only compare for equality, so the binary search orders short bytes copies;
+        # slicing the mmap directly is faster than view.tobytes() for ~20-byte domain keys
+        offset, length, _ = SLOT.unpack_from(self._view, slot_offset)
+        start = self._blob + offset
+        return self._mm[start:start + length]
+
+    def _record(self, offset):
+        category, owner, risk = RECORD.unpack_from(self._view, offset)
+        return {'category': self._labels[category], 'owner': self._labels[owner], 'risk_level': RISKS[risk]}
+
+    def find(self, reversed_key):
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            key = self._sort_key(self._index + mid * SLOT.size)
+            if key < reversed_key:
+                lo = mid + 1
+            elif key > reversed_key:
+                hi = mid
+            else:
+                return self._record(self._records + mid * RECORD.size)
+        return None
+
+    def longest_match(self, host):
+        labels = host.split('.')
+        for n in range(len(labels), 0, -1):
+            entry = self.find('.'.join(reversed(labels[-n:])).encode())
+            if entry:
+                return entry
+        return None
+
+    def patterns(self):
+        stride = SLOT.size + RECORD.size
+        for i in range(self.pattern_count):
+            offset = self._patterns + i * stride
+            yield str(self._key(offset), 'utf-8'), self._record(offset + SLOT.size)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or query a compiled tracker database")
+    commands = parser.add_subparsers(dest='command', required=True)
+    build_cmd = commands.add_parser('build', help="compile tracker lists into one database")
+    build_cmd.add_argument('sources', nargs='+', help="CookieLens trackers.json or Disconnect services.json files")
+    build_cmd.add_argument('-o', '--output', required=True)
+    lookup_cmd = commands.add_parser('lookup', help="classify host names")
+    lookup_cmd.add_argument('database')
+    lookup_cmd.add_argument('hosts', nargs='+')
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        domains, patterns = build(args.sources, args.output)
+        print(f"Wrote {args.output}: {domains} domains, {patterns} patterns")
+        return
+
+    from trackers import load_classifier
+    classifier = load_classifier(args.database)
+    for host in args.hosts:
+        entry = classifier.classify(host)
+        print(f"{host}\t{entry['category']}\t{entry['owner'] or '-'}\t{entry['risk_level']}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
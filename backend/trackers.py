@@ -0,0 +1,153 @@
+"""Tracker classification backed by a reversed-label suffix trie and an Aho-Corasick automaton.
+
+Domain entries match the domain itself and every subdomain (longest suffix wins);
+pattern entries match anywhere in the host. Both lookups cost time proportional to
+the host name, not to the size of the tracker database.
+"""
+from collections import deque
+from functools import lru_cache
+from config import TRACKER_DB_PATH
+from trackerdb import TrackerDB, is_compiled, iter_entries
+
+UNKNOWN = {'category': 'Unknown', 'owner': None, 'risk_level': 'medium'}
+
+_END = '$'
+
+
+def _entry(value):
+    category, owner, risk = value
+    return {'category': category, 'owner': owner, 'risk_level': risk}
+
+
+class SuffixTrie:
+    def __init__(self):
+        self.root = {}
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def add(self, domain, value):
+        node = self.root
+        for label in reversed(domain.lower().strip('.').split('.')):
+            node = node.setdefault(label, {})
+        if _END not in node:
+            self.size += 1
+        node[_END] = value
+
+    def longest_match(self, host):
+        node, found = self.root, None
+        for label in reversed(host.split('.')):
+            node = node.get(label)
+            if node is None:
+                break
+            found = node.get(_END, found)
+        return found
+
+
+class AhoCorasick:
+    def __init__(self):
+        self.goto = [{}]
+        self.fail = [0]
+        self.out = [None]
+        self._built = False
+
+    def add(self, pattern, value, priority):
+        state = 0
+        for ch in pattern.lower():
+            nxt = self.goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self.goto)
+                self.goto[state][ch] = nxt
+                self.goto.append({})
+                self.fail.append(0)
+                self.out.append(None)
+            state = nxt
+        if self.out[state] is None or priority < self.out[state][0]:
+            self.out[state] = (priority, value)
+        self._built = False
+
+    def build(self):
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self.goto[state].items():
+                queue.append(nxt)
+                f = self.fail[state]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(ch, 0)
+                # inherit the best (lowest priority number) output along the fail chain
+                inherited = self.out[self.fail[nxt]]
+                if inherited and (self.out[nxt] is None or inherited[0] < self.out[nxt][0]):
+                    self.out[nxt] = inherited
+        self._built = True
+
+    def search(self, text):
+        """Return the value of the highest-priority pattern occurring in `text`."""
+        if not self._built:
+            self.build()
+        state, best = 0, None
+        goto, fail, out = self.goto, self.fail, self.out
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            hit = out[state]
+            if hit and (best is None or hit[0] < best[0]):
+                best = hit
+        return best[1] if best else None
+
+
+class TrackerClassifier:
+    def __init__(self, domains=None):
+        self.domains = domains if domains is not None else SuffixTrie()
+        self.patterns = AhoCorasick()
+        self._pattern_count = 0
+        self.classify = lru_cache(maxsize=65536)(self._classify)
+
+    def __len__(self):
+        return len(self.domains) + self._pattern_count
+
+    def add_domain(self, domain, category, owner=None, risk='medium'):
+        self.domains.add(domain, _entry((category, owner, risk)))
+        self.classify.cache_clear()
+
+    def add_pattern(self, pattern, category, owner=None, risk='medium'):
+        self.patterns.add(pattern, _entry((category, owner, risk)), self._pattern_count)
+        self._pattern_count += 1
+        self.classify.cache_clear()
+
+    def load(self, path):
+        for kind, key, value in iter_entries(path):
+            if kind == 'domain':
+                self.domains.add(key, _entry(value))
+            else:
+                self.patterns.add(key, _entry(value), self._pattern_count)
+                self._pattern_count += 1
+        self.classify.cache_clear()
+        return self
+
+    def _classify(self, domain):
+        host = (domain or '').lower().strip('.')
+        entry = self.domains.longest_match(host) or self.patterns.search(host)
+        return entry or UNKNOWN
+
+
+def load_classifier(path=TRACKER_DB_PATH):
+    """Open a compiled database (see trackerdb.py) with mmap, or index a JSON list in memory."""
+    if not is_compiled(path):
+        return TrackerClassifier().load(path)
+    db = TrackerDB(path)
+    classifier = TrackerClassifier(domains=db)
+    for pattern, entry in db.patterns():
+        classifier.patterns.add(pattern, entry, classifier._pattern_count)
+        classifier._pattern_count += 1
+    return classifier
+
+
+CLASSIFIER = load_classifier()
+
+
+def classify_domain(domain):
+    return CLASSIFIER.classify(domain)
@@ -0,0 +1,91 @@
+"""Canonical URLs for cache keys, coalescing and scan history.
+
+`https://example.com`, `HTTPS://Example.com:443/?utm_source=x#top` and pydantic's
+`https://example.com/` all canonicalise to `https://example.com/`:
+
+- scheme and host lower-cased, host IDNA-encoded, trailing dot and default port dropped
+- dot segments resolved, percent-escapes normalised, trailing slash dropped (except the root)
+- tracking parameters (utm_*, gclid, fbclid, ...) removed and the rest sorted
+- fragment removed
+
+Stdlib only, so the Lambda packages can ship a copy of this file.
+"""
+import re
+from functools import lru_cache
+from urllib.parse import parse_qsl, quote, urlencode, urlsplit, urlunsplit
+
+CACHE_SIZE = 4096
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+TRACKING_PREFIXES = ('utm_',)
+TRACKING_PARAMS = frozenset({
+    'gclid', 'gclsrc', 'dclid', 'gbraid', 'wbraid', 'fbclid', 'msclkid', 'yclid', 'twclid', 'ttclid',
+    'li_fat_id', 'igshid', 'mc_cid', 'mc_eid', '_ga', '_gl', '_hsenc', '_hsmi', 'mkt_tok', 'oly_anon_id',
+    'oly_enc_id', 'vero_id', 'rb_clickid', 's_cid', 'ref_src', 'spm',
+})
+UNRESERVED = frozenset('ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-._~')
+PATH_SAFE = "/%:@!$&'()*+,;=-._~"
+_ESCAPE = re.compile(r'%([0-9A-Fa-f]{2})')
+
+
+def is_tracking_param(name):
+    name = name.lower()
+    return name in TRACKING_PARAMS or name.startswith(TRACKING_PREFIXES)
+
+
+def _host(hostname):
+    host = (hostname or '').rstrip('.')
+    if ':' in host:
+        return f"[{host}]"
+    try:
+        return host.encode('idna').decode('ascii').lower()
+    except UnicodeError:
+        # not a valid IDN (empty or over-long label); keep it as typed
+        return host
+
+
+def _unescape_unreserved(match):
+    char = chr(int(match.group(1), 16))
+    return char if char in UNRESERVED else f"%{match.group(1).upper()}"
+
+
+def _path(path):
+    path = _ESCAPE.sub(_unescape_unreserved, quote(path, safe=PATH_SAFE))
+    segments = []
+    for segment in path.split('/')[1:]:
+        if segment == '..':
+            if segments:
+                segments.pop()
+        elif segment != '.':
+            segments.append(segment)
+    return ('/' + '/'.join(segments)).rstrip('/') or '/'
+
+
+def _query(query):
+    pairs = [(k, v) for k, v in parse_qsl(query, keep_blank_values=True) if not is_tracking_param(k)]
+    return urlencode(sorted(pairs), quote_via=quote)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def canonicalize_url(url):
+    """Canonical form of `url`; a URL without a scheme is taken as https. Raises ValueError on a bad port."""
+    url = str(url).strip()
+    if '://' not in url:
+        url = f"https://{url}"
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    netloc = _host(parts.hostname)
+    port = parts.port
+    if port is not None and port != DEFAULT_PORTS.get(scheme):
+        netloc = f"{netloc}:{port}"
+    if '@' in parts.netloc:
+        netloc = f"{parts.netloc.rpartition('@')[0]}@{netloc}"
+    return urlunsplit((scheme, netloc, _path(parts.path), _query(parts.query), ''))
+
+
+def site_key(url):
+    """Scheme-less canonical URL without a leading www., for per-site history."""
+    canonical = canonicalize_url(url).split('://', 1)[1]
+    if canonical.startswith('www.'):
+        canonical = canonical[4:]
+    host_and_path, sep, query = canonical.partition('?')
+    return host_and_path.rstrip('/') + sep + query
@@ -0,0 +1,110 @@
+"""Scan workers for the job queue.
+
+Run as many of these as the machine has browser capacity for; they only share the
+SQLite queue file, so API and worker processes scale independently:
+
+    python worker.py --processes 4
+"""
+import argparse
+import multiprocessing
+import signal
+import threading
+import eventlog
+from config import DEFAULT_FRAMEWORKS, JOBS_POLL_INTERVAL
+from eventlog import get_logger, scan_context
+from jobs import JobQueue, default_owner
+
+log = get_logger('worker')
+
+
+class Worker:
+    def __init__(self, queue, handlers, owner=None, poll_interval=JOBS_POLL_INTERVAL):
+        """`handlers` maps a job kind to a function of the payload returning a JSON-able result."""
+        self.queue = queue
+        self.handlers = handlers
+        self.owner = owner or default_owner()
+        self.poll_interval = poll_interval
+        self.stopping = threading.Event()
+
+    def stop(self, *_):
+        self.stopping.set()
+
+    def run(self):
+        while not self.stopping.is_set():
+            if not self.run_once():
+                self.stopping.wait(self.poll_interval)
+
+    def run_once(self):
+        job = self.queue.lease(list(self.handlers), self.owner)
+        if job is None:
+            return False
+
+        # keep the lease alive while the scan runs; a dead worker stops renewing it
+        done = threading.Event()
+        interval = self.queue.visibility_timeout / 3
+
+        def renew():
+            while not done.wait(interval):
+                if not self.queue.heartbeat(job['id'], self.owner):
+                    return
+
+        threading.Thread(target=renew, daemon=True).start()
+        try:
+            # the job ID doubles as the scan ID in logs
+            with scan_context(str(job['id'])):
+                result = self.handlers[job['kind']](job['payload'])
+        except Exception as e:
+            log.exception('job.failed', job_id=job['id'], kind=job['kind'])
+            self.queue.fail(job['id'], self.owner, f"{type(e).__name__}: {e}")
+        else:
+            self.queue.complete(job['id'], self.owner, result)
+        finally:
+            done.set()
+        return True
+
+
+def scan_job(payload):
+    from scanner import scan_website
+    return scan_website(payload['url'])
+
+
+def compliance_job(payload):
+    from workflow import run_compliance_scan
+    return run_compliance_scan(payload['url'], payload.get('frameworks') or DEFAULT_FRAMEWORKS)
+
+
+HANDLERS = {'scan': scan_job, 'compliance': compliance_job}
+
+
+def run_worker(handlers=HANDLERS):
+    eventlog.configure()
+    worker = Worker(JobQueue(), handlers)
+    signal.signal(signal.SIGTERM, worker.stop)
+    signal.signal(signal.SIGINT, worker.stop)
+    log.info('worker.started', owner=worker.owner, kinds=list(handlers))
+    worker.run()
+
+
+def main(handlers=HANDLERS):
+    parser = argparse.ArgumentParser(description="Run scan workers against the job queue")
+    parser.add_argument('--processes', type=int, default=1)
+    args = parser.parse_args()
+
+    if args.processes == 1:
+        run_worker(handlers)
+        return
+    processes = [multiprocessing.Process(target=run_worker, args=(handlers,)) for _ in range(args.processes)]
+    for process in processes:
+        process.start()
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,14 @@
 from typing import TypedDict
+from urllib.parse import urlparse
 from langgraph.graph import StateGraph, END
-from scanner import scan_website
+from scanner import collect_scan, analyze_with_ai
 from compliance import check_compliance, analyze_third_parties
+from features import extract_features
+from history import HISTORY, changed_features, diff_scans, reusable_outcomes
+from rules import get_engine
+from tracing import span, traced
+from metrics import track_scan
+from eventlog import scan_context
 
 
 class ScanState(TypedDict):
@@ -10,25 +17,60 @@ class ScanState(TypedDict):
     scan_results: dict
     compliance_results: dict
     third_party_risks: list
+    previous: dict
+    changes: dict
+    features: dict
+    outcomes: dict
+    ai_source: str
     error: str
 
 
 def scan_site(state: ScanState) -> ScanState:
     try:
-        scan_data = scan_website(state['url'])
+        # counted here rather than in scanner.scan_website, which the workflow doesn't go through
+        with track_scan():
+            scan_data = collect_scan(state['url'])
         state['scan_results'] = scan_data
     except Exception as e:
         state['error'] = str(e)
     return state
 
 
+def diff_previous(state: ScanState) -> ScanState:
+    if state.get('error'):
+        return state
+    
+    previous = HISTORY.get(state['url'])
+    state['previous'] = previous
+    if previous:
+        state['changes'] = diff_scans(previous['scan_results'], state['scan_results'])
+    else:
+        state['changes'] = {'previous_scan_at': None, 'material': True}
+    return state
+
+
 def check_compliance_node(state: ScanState) -> ScanState:
     if state.get('error'):
         return state
     
     try:
-        results = check_compliance(state['scan_results'], state.get('frameworks'))
+        features = extract_features(state['scan_results'])
+        engine = get_engine()
+        previous = state.get('previous')
+        outcomes = {}
+        if previous and previous.get('rules_version') == engine.version:
+            # only rules reading a feature that changed since the last scan are re-evaluated
+            outcomes = reusable_outcomes(previous['outcomes'], changed_features(previous['features'], features), engine)
+        reused = set(outcomes)
+        
+        results = check_compliance(state['scan_results'], state.get('frameworks'), features, outcomes)
         state['compliance_results'] = results
+        state['features'] = features
+        state['outcomes'] = outcomes
+        state['changes']['rules'] = {
+            'reused': len(reused),
+            'reevaluated': sorted(set(outcomes) - reused)
+        }
     except Exception as e:
         state['error'] = str(e)
     return state
@@ -46,17 +88,58 @@ def analyze_risks(state: ScanState) -> ScanState:
     return state
 
 
+def analyze_ai(state: ScanState) -> ScanState:
+    if state.get('error'):
+        return state
+    
+    previous = state.get('previous')
+    # a local-summary fallback is not worth keeping: the next scan should try the model again
+    if previous and previous.get('ai_source') == 'model' and not state['changes']['material']:
+        state['scan_results']['aiAnalysis'] = previous['ai_analysis']
+        state['ai_source'] = 'model'
+        state['changes']['ai_reused'] = True
+    else:
+        state['scan_results']['aiAnalysis'], state['ai_source'] = analyze_with_ai(
+            state['scan_results'], compliance_results=state['compliance_results'],
+            third_party_risks=state['third_party_risks'])
+        state['changes']['ai_reused'] = False
+    state['changes']['ai_source'] = state['ai_source']
+    return state
+
+
+def record_history(state: ScanState) -> ScanState:
+    if state.get('error'):
+        return state
+    
+    scan_results = {k: v for k, v in state['scan_results'].items() if k != 'aiAnalysis'}
+    HISTORY.put(state['url'], {
+        'scan_results': scan_results,
+        'features': state['features'],
+        'outcomes': state['outcomes'],
+        'rules_version': get_engine().version,
+        'ai_analysis': state['scan_results'].get('aiAnalysis'),
+        'ai_source': state.get('ai_source')
+    })
+    return state
+
+
 def build_workflow():
     workflow = StateGraph(ScanState)
     
-    workflow.add_node("scan", scan_site)
-    workflow.add_node("compliance", check_compliance_node)
-    workflow.add_node("risks", analyze_risks)
+    workflow.add_node("scan", traced("workflow.scan", scan_site))
+    workflow.add_node("diff", traced("workflow.diff", diff_previous))
+    workflow.add_node("compliance", traced("workflow.compliance", check_compliance_node))
+    workflow.add_node("risks", traced("workflow.risks", analyze_risks))
+    workflow.add_node("ai", traced("workflow.ai", analyze_ai))
+    workflow.add_node("record", traced("workflow.record", record_history))
     
     workflow.set_entry_point("scan")
-    workflow.add_edge("scan", "compliance")
+    workflow.add_edge("scan", "diff")
+    workflow.add_edge("diff", "compliance")
     workflow.add_edge("compliance", "risks")
-    workflow.add_edge("risks", END)
+    workflow.add_edge("risks", "ai")
+    workflow.add_edge("ai", "record")
+    workflow.add_edge("record", END)
     
     return workflow.compile()
 
@@ -70,10 +153,17 @@ def run_compliance_scan(url: str, frameworks: list = None):
         "scan_results": {},
         "compliance_results": {},
         "third_party_risks": [],
+        "previous": None,
+        "changes": {},
+        "features": {},
+        "outcomes": {},
+        "ai_source": None,
         "error": None
     }
     
-    result = app.invoke(initial_state)
+    attributes = {'url.host': urlparse(url).hostname or '', 'workflow.frameworks': ','.join(initial_state['frameworks'])}
+    with scan_context(), span('workflow', attributes):
+        result = app.invoke(initial_state)
     
     if result.get('error'):
         raise Exception(result['error'])
@@ -81,6 +171,7 @@ def run_compliance_scan(url: str, frameworks: list = None):
     return {
         'scan_results': result['scan_results'],
         'compliance_analysis': result['compliance_results'],
-        'third_party_risks': result['third_party_risks']
+        'third_party_risks': result['third_party_risks'],
+        'changes': result['changes']
     }
 
@@ -1,19 +1,112 @@
-from fastapi import FastAPI, HTTPException
+import shared_backend  # noqa: F401  (puts backend/ on sys.path before any import from it)
+from fastapi import Depends, FastAPI, Header, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.background import BackgroundTask
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel, HttpUrl
-from typing import Optional, List
+from typing import Any, Dict, Optional, List, Tuple
 from lambda_function import scan_website
 from vanta_client import VantaClient
 from compliance_analyzer import ComplianceAnalyzer
-import traceback
-from datetime import datetime
+from config import JOBS_ASYNC_DEFAULT
+from jobs import JobQueue, job_accepted, wants_async
+from singleflight import SingleFlight, flight_key
+import admission
+from admission import EVALUATIONS, SCANS, Overloaded, overloaded_response
+from metrics import CONTENT_TYPE, REGISTRY
+from tracing import TracingMiddleware
+import eventlog
+from eventlog import get_logger, scan_context
+from compression import CompressionMiddleware
+from fastjson import FastJSONResponse
+from projection import parse_view, project, project_entry
+from resultcache import CacheEntry, ResultCache, cache_headers, freshness, not_modified
+import asyncio
+import json
+import os
 
 app = FastAPI(title="CookieLens API", version="1.0.0")
 
+# Shared deadline (seconds) for fetching every framework's controls
+COMPLIANCE_TIMEOUT = float(os.getenv('COMPLIANCE_TIMEOUT', '10'))
+
+# /compliance/evaluate writes results once this many documents are evaluated, or once the
+# oldest unsent one has waited this long for more input
+EVALUATE_BATCH_SIZE = 256
+EVALUATE_FLUSH_INTERVAL = float(os.getenv('EVALUATE_FLUSH_INTERVAL', '0.05'))
+
 # Initialize Vanta client
 vanta_client = VantaClient()
 compliance_analyzer = ComplianceAnalyzer(vanta_client)
 
+# Durable queue shared with scan_worker.py processes (Prefer: respond-async)
+jobs = JobQueue()
+
+# Concurrent scans of the same URL share one browser run, also across uvicorn workers
+inflight = SingleFlight()
+
+# Recent scan results, shared with the other workers through SQLite (RESULT_CACHE_PATH)
+result_cache = ResultCache()
+
+def cached_scan(url: str, max_stale: Optional[float] = None, force_refresh: bool = False,
+                cache_control: Optional[str] = None) -> Tuple[CacheEntry, str]:
+    """
+    Scan result for a URL from the cache, or from scan_website (joining an identical scan already in flight)
+    
+    Args:
+        url: Website to scan
+        max_stale: Seconds past max-age the caller still accepts
+        force_refresh: Skip the cache and rescan
+        cache_control: The request's Cache-Control header
+        
+    Returns:
+        The cache entry and its status: hit, stale, miss or refresh
+    """
+    # flight_key canonicalises the URL; the browser still loads it as sent
+    key = flight_key("ext-scan", url)
+    policy = freshness(cache_control, max_stale, force_refresh)
+    # only the request that actually launches a browser takes a scan slot; a scan whose Bedrock analysis
+    # failed is served once but not cached, so the next request tries again
+    return result_cache.get_or_compute(key, lambda: inflight.do(key, SCANS.wrap(scan_website), url), **policy,
+                                       cacheable=lambda scan: not scan.get("analysisFailed"))
+
+def response_view(profile: str = "full", fields: Optional[str] = None,
+                  include: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    Query parameters slimming a scan response (see backend/projection.py)
+    
+    Args:
+        profile: full, compact (cookie and localStorage values hashed) or summary (aggregates only)
+        fields: Comma-separated dotted fields to return, e.g. "summary,humanReadableAnalysis"
+        include: Sections to keep as scanned under a slim profile: cookies, localStorage, thirdParties
+        
+    Returns:
+        The view for project(), or None for the full response
+    """
+    try:
+        return parse_view(profile, fields, include)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+def scan_response(request: Request, entry: CacheEntry, status: str,
+                  view: Optional[Dict[str, Any]] = None) -> Response:
+    entry = project_entry(entry, view)
+    headers = cache_headers(entry, status, result_cache.max_age)
+    if request.method == "GET" and not_modified(entry, request.headers.get("if-none-match"),
+                                                request.headers.get("if-modified-since")):
+        return Response(status_code=304, headers=headers)
+    return Response(entry.body, media_type="application/json", headers=headers)
+
+@app.on_event("startup")
+def start_vanta_session():
+    # One MCP server process for the app's lifetime; calls are multiplexed over its pipes
+    vanta_client.start_session()
+
+@app.on_event("shutdown")
+def stop_vanta_session():
+    vanta_client.close_session()
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -22,14 +115,29 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# gzip/brotli for complete responses above RESPONSE_COMPRESSION_MIN_SIZE bytes
+app.add_middleware(CompressionMiddleware)
+# Root span per request (TRACING_EXPORTER=console|otlp-file)
+app.add_middleware(TracingMiddleware)
+
+# JSON event logs written by a background thread (LOG_LEVEL, LOG_SAMPLE_RATE)
+eventlog.configure()
+log = get_logger("cookielens.api")
+
+@app.exception_handler(Overloaded)
+def overloaded_handler(request: Request, error: Overloaded) -> JSONResponse:
+    """429 with a Retry-After estimated from recent scan durations"""
+    body, headers = overloaded_response(error)
+    return JSONResponse(body, status_code=429, headers=headers)
 
 class ScanRequest(BaseModel):
     web_link: HttpUrl
 
-class ScanWithComplianceRequest(BaseModel):
-    web_link: HttpUrl
+class ScanWithComplianceRequest(ScanRequest):
     frameworks: Optional[List[str]] = None  # e.g., ["gdpr", "ccpa"]
 
+# Response models document the scan endpoints in OpenAPI only: they return trusted scan_website
+# output as cached JSON bytes or a FastJSONResponse, which FastAPI does not validate or re-encode
 class ScanResponse(BaseModel):
     url: str
     scannedAt: str
@@ -37,8 +145,15 @@ class ScanResponse(BaseModel):
     localStorage: dict
     thirdParties: list
     humanReadableAnalysis: str
+    analysisFailed: bool = False
     s3Path: str = None
 
+class ScanWithComplianceResponse(BaseModel):
+    scan_results: ScanResponse
+    compliance_analysis: dict
+    third_party_risks: list
+    overall_summary: dict
+
 @app.get("/")
 def root():
     """Health check endpoint"""
@@ -48,82 +163,310 @@ def root():
         "version": "1.0.0"
     }
 
+def enqueue_job(kind: str, payload: dict) -> JSONResponse:
+    job_id = jobs.enqueue(kind, payload)
+    return JSONResponse(job_accepted(job_id), status_code=202, headers={"Location": f"/jobs/{job_id}"})
+
+@app.get("/jobs/{job_id}")
+def job_status(job_id: str):
+    """
+    Status of a queued scan; `result` holds the scan response once `status` is `succeeded`
+    """
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return FastJSONResponse(job)
+
+@app.get("/stats/coalescing")
+def coalescing_stats():
+    """
+    Single-flight counters: requests, scans executed, requests that joined an in-flight scan and the hit rate
+    """
+    return inflight.stats()
+
+@app.get("/metrics")
+def metrics():
+    """
+    Prometheus metrics: per-stage latency histograms, scan/error/cache counters, in-flight scans and open browsers
+    """
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
+
+@app.get("/stats/admission")
+def admission_stats():
+    """
+    Concurrency limits, queue depth, wait times and rejections for browser scans and compliance evaluations
+    """
+    return admission.stats()
+
+@app.get("/stats/cache")
+def cache_stats():
+    """
+    Result cache counters: fresh and stale hits, misses, forced refreshes and the hit rate
+    """
+    return result_cache.stats()
+
+@app.get("/scan", response_model=ScanResponse)
+def scan_get_endpoint(http_request: Request, web_link: HttpUrl, max_stale: Optional[float] = None,
+                      force_refresh: bool = False, view: Optional[Dict[str, Any]] = Depends(response_view)):
+    """
+    Cacheable scan of a website; answers conditional requests (If-None-Match / If-Modified-Since) with 304
+    
+    - **web_link**: The URL of the website to scan
+    - **max_stale**: Seconds past max-age an older cached result is still acceptable
+    - **force_refresh**: Ignore the cache and rescan
+    - **profile** / **fields** / **include**: Slim the response, e.g. `profile=summary` for counts and the AI summary only
+    """
+    try:
+        entry, status = cached_scan(str(web_link), max_stale, force_refresh, http_request.headers.get("cache-control"))
+    except Overloaded:
+        raise
+    except Exception as e:
+        log.exception("scan.failed", error=str(e))
+        raise HTTPException(status_code=500, detail=f"Scan failed: {str(e)}")
+    return scan_response(http_request, entry, status, view)
+
 @app.post("/scan", response_model=ScanResponse)
-def scan_endpoint(request: ScanRequest):
+def scan_endpoint(request: ScanRequest, http_request: Request, prefer: Optional[str] = Header(None),
+                  max_stale: Optional[float] = None, force_refresh: bool = False,
+                  view: Optional[Dict[str, Any]] = Depends(response_view)):
     """
     Scan a website for cookies, localStorage, and third-party services
     
     - **web_link**: The URL of the website to scan
+    - **max_stale** / **force_refresh**: Accept an older cached result, or bypass the cache
+    - **profile** / **fields** / **include**: Slim the response (compact hashes cookie and storage values)
+    
+    Results are cached for `RESULT_CACHE_MAX_AGE` seconds; `X-Cache` and `Age` tell whether a response was rescanned.
+    With `Prefer: respond-async` the scan is queued and `202 Accepted` returns a job ID to poll at `/jobs/{job_id}`.
     """
+    if wants_async(prefer, JOBS_ASYNC_DEFAULT):
+        return enqueue_job("ext-scan", {"url": str(request.web_link)})
+    
     try:
         # Convert HttpUrl to string
         url = str(request.web_link)
         
         # Call the core scanning logic
-        result = scan_website(url)
+        entry, status = cached_scan(url, max_stale, force_refresh, http_request.headers.get("cache-control"))
         
-        return result
+        return scan_response(http_request, entry, status, view)
         
+    except Overloaded:
+        raise
     except Exception as e:
-        print(f"Scan error: {e}")
-        print(traceback.format_exc())
+        log.exception("scan.failed", error=str(e))
         raise HTTPException(
             status_code=500,
             detail=f"Scan failed: {str(e)}"
         )
 
-@app.post("/scan-with-compliance")
-def scan_with_compliance_endpoint(request: ScanWithComplianceRequest):
+@app.post("/scan-with-compliance", response_model=ScanWithComplianceResponse)
+async def scan_with_compliance_endpoint(request: ScanWithComplianceRequest, http_request: Request,
+                                        prefer: Optional[str] = Header(None), max_stale: Optional[float] = None,
+                                        force_refresh: bool = False,
+                                        view: Optional[Dict[str, Any]] = Depends(response_view)):
     """
     Scan a website and analyze compliance with privacy frameworks
     
     - **web_link**: The URL of the website to scan
     - **frameworks**: Optional list of frameworks to check (e.g., ["gdpr", "ccpa"]). Defaults to ["gdpr", "ccpa"]
+    - **max_stale** / **force_refresh**: Accept an older cached scan, or bypass the cache
+    - **profile** / **fields** / **include**: Slim the response; the profile applies to `scan_results`
     
     Returns scan results + compliance analysis including:
     - Compliance score per framework
     - Passed/failed controls
     - Recommendations for improvement
     - Third-party risk assessment
+    
+    With `Prefer: respond-async` the scan is queued and `202 Accepted` returns a job ID to poll at `/jobs/{job_id}`.
     """
-    try:
-        # Convert HttpUrl to string
-        url = str(request.web_link)
+    if wants_async(prefer, JOBS_ASYNC_DEFAULT):
+        return enqueue_job("ext-scan-with-compliance", {
+            "url": str(request.web_link),
+            "frameworks": request.frameworks or ['gdpr', 'ccpa']
+        })
+    
+    with scan_context():
+        try:
+            # Convert HttpUrl to string
+            url = str(request.web_link)
         
-        print("="*60)
-        print(f"🔍 Starting compliance analysis for: {url}")
-        print("="*60)
+            frameworks = request.frameworks or ['gdpr', 'ccpa']
+            log.info("compliance_scan.started", url=url, frameworks=frameworks)
         
-        # Step 1: Scan the website
-        print(f"📡 Step 1: Scanning website {url}...")
-        print(f"⏰ Started at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-        scan_results = scan_website(url)
-        print(f"✅ Website scan completed!")
-        print(f"🍪 Found {len(scan_results.get('cookies', []))} cookies")
-        print(f"🔗 Detected {len(scan_results.get('thirdParties', []))} third-party services")
+            # Step 1: Scan the website
+            entry, cache_status = await run_in_threadpool(
+                cached_scan, url, max_stale, force_refresh, http_request.headers.get("cache-control")
+            )
+            scan_results = entry.result
+            log.debug("compliance_scan.scanned", cache=cache_status, age=int(entry.age()),
+                      cookie_count=len(scan_results.get('cookies', [])),
+                      third_party_count=len(scan_results.get('thirdParties', [])))
         
-        # Step 2: Analyze compliance
-        frameworks = request.frameworks or ['gdpr', 'ccpa']
-        print(f"⚖️ Step 2: Analyzing compliance for frameworks: {frameworks}")
-        compliance_results = compliance_analyzer.analyze_compliance(
-            scan_results,
-            frameworks=frameworks
-        )
+            # Step 2: Analyze compliance
+            compliance_results = await compliance_analyzer.analyze_compliance_async(
+                scan_results,
+                frameworks=frameworks,
+                timeout=COMPLIANCE_TIMEOUT
+            )
         
-        print(f"✅ Compliance analysis completed!")
-        print(f"📊 Overall score: {compliance_results.get('overall_summary', {}).get('overall_score', 0)}%")
-        print(f"⏰ Completed at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-        print("="*60)
+            summary = compliance_results.get('overall_summary', {})
+            log.info("compliance_scan.completed", url=url, cache=cache_status,
+                     overall_score=summary.get('overall_score', 0), partial=summary.get('partial', False))
         
-        return compliance_results
+            return FastJSONResponse(project(compliance_results, **view) if view else compliance_results)
         
+        except Overloaded:
+            raise
+        except Exception as e:
+            log.exception("compliance_scan.failed", error=str(e))
+            raise HTTPException(
+                status_code=500,
+                detail=f"Compliance scan failed: {str(e)}"
+            )
+
+async def iter_ndjson(chunks):
+    """Yield one parsed document (or the ValueError) per line of an NDJSON byte stream"""
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield _parse_document(line)
+    if buffer.strip():
+        yield _parse_document(buffer)
+
+def _parse_document(line):
+    try:
+        return json.loads(line)
+    except ValueError as e:
+        return e
+
+async def iter_documents(documents):
+    for document in documents:
+        yield document
+
+async def iter_batches(documents, size: int, interval: float):
+    """
+    Group an async iterator into lists of up to `size` items
+
+    A partial batch is yielded as soon as its first item has waited `interval` seconds,
+    so a slow producer's items are not held back until `size` of them arrive.
+    """
+    loop = asyncio.get_running_loop()
+    iterator = documents.__aiter__()
+    batch: List[Any] = []
+    deadline = 0.0
+    pending = None
+    try:
+        while True:
+            if pending is None:
+                pending = asyncio.ensure_future(iterator.__anext__())
+            timeout = max(0.0, deadline - loop.time()) if batch else None
+            done, _ = await asyncio.wait({pending}, timeout=timeout)
+            if not done:
+                # the next item is slow to arrive: send what there is
+                yield batch
+                batch = []
+                continue
+            try:
+                item = pending.result()
+            except StopAsyncIteration:
+                break
+            finally:
+                pending = None
+            if not batch:
+                deadline = loop.time() + interval
+            batch.append(item)
+            if len(batch) >= size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+    finally:
+        if pending is not None:
+            pending.cancel()
+
+class DuplexStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse whose body generator may still be reading the request
+
+    The stock response listens for client disconnects on receive() while streaming,
+    which would swallow request body chunks the generator hasn't read yet.
+    """
+    async def __call__(self, scope, receive, send):
+        try:
+            await self.stream_response(send)
+        finally:
+            # runs even if the client went away mid-stream (e.g. to release an admission slot)
+            if self.background is not None:
+                await self.background()
+
+@app.post("/compliance/evaluate")
+async def compliance_evaluate_endpoint(request: Request, frameworks: Optional[str] = None):
+    """
+    Evaluate pre-collected scans for compliance without running a browser
+    
+    - **body**: one scan document, a JSON list of them, or NDJSON (`Content-Type: application/x-ndjson`).
+      A document is a scan result (`url`, `cookies`, `thirdParties`) or a saved
+      `/scan-with-compliance` response holding one under `scan_results`
+    - **frameworks**: comma-separated framework IDs (defaults to `gdpr,ccpa`)
+    
+    Streams back one NDJSON line per document, in input order, with its `index`, `url`,
+    `compliance_analysis`, `third_party_risks` and `overall_summary` (or an `error`).
+    """
+    framework_ids = [f.strip() for f in frameworks.split(',') if f.strip()] if frameworks else ['gdpr', 'ccpa']
+    if not framework_ids:
+        raise HTTPException(status_code=422, detail="frameworks must name at least one framework")
+    
+    # Separate, larger limit than browser scans; held until the response finishes streaming
+    token = await run_in_threadpool(EVALUATIONS.enter)
+    release = BackgroundTask(EVALUATIONS.leave, token)
+    try:
+        # Controls are fetched once per request and shared by every document
+        controls_by_framework = await vanta_client.get_privacy_controls_async(framework_ids, timeout=COMPLIANCE_TIMEOUT)
+        
+        content_type = request.headers.get('content-type', '')
+        if 'ndjson' in content_type or 'jsonlines' in content_type:
+            # Evaluate lines as they arrive; results stream back while the upload continues
+            documents = iter_ndjson(request.stream())
+        else:
+            body = _parse_document(await request.body())
+            documents = iter_documents(body if isinstance(body, list) else [body])
+    except BaseException:
+        await release()
+        raise
+    
+    async def results():
+        index = 0
+        # one write per batch keeps per-document framing overhead low; evaluation is CPU-bound,
+        # so it runs in the threadpool instead of blocking the event loop
+        async for batch in iter_batches(documents, EVALUATE_BATCH_SIZE, EVALUATE_FLUSH_INTERVAL):
+            yield await run_in_threadpool(_evaluate_batch, index, batch, controls_by_framework)
+            index += len(batch)
+    
+    return DuplexStreamingResponse(results(), media_type="application/x-ndjson", background=release)
+
+def _evaluate_batch(start, documents, controls_by_framework):
+    """NDJSON lines for documents numbered from `start`"""
+    return "".join(json.dumps(_evaluate_document(start + i, document, controls_by_framework)) + "\n"
+                   for i, document in enumerate(documents))
+
+def _evaluate_document(index, document, controls_by_framework):
+    if isinstance(document, Exception):
+        return {"index": index, "error": f"Invalid JSON: {document}"}
+    if not isinstance(document, dict):
+        return {"index": index, "error": "Scan document must be a JSON object"}
+    scan_results = document.get("scan_results", document)
+    if not isinstance(scan_results, dict):
+        return {"index": index, "error": "scan_results must be a JSON object"}
+    try:
+        result = compliance_analyzer.evaluate(scan_results, controls_by_framework)
     except Exception as e:
-        print(f"❌ Compliance scan error: {e}")
-        print(traceback.format_exc())
-        raise HTTPException(
-            status_code=500,
-            detail=f"Compliance scan failed: {str(e)}"
-        )
+        return {"index": index, "url": scan_results.get("url"), "error": f"Evaluation failed: {e}"}
+    return {"index": index, "url": scan_results.get("url"), **result}
 
 if __name__ == "__main__":
     import uvicorn
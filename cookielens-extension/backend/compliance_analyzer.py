@@ -2,8 +2,14 @@
 Compliance Analyzer
 Maps website scan results to compliance framework requirements
 """
+import asyncio
 from typing import Dict, List, Any, Optional
+import shared_backend  # noqa: F401  (before any backend/ import)
 from vanta_client import VantaClient
+from features import extract_features
+from rules import get_engine
+from trackers import classify_domain
+from metrics import stage
 
 
 class ComplianceAnalyzer:
@@ -39,30 +45,133 @@ class ComplianceAnalyzer:
         # Get controls for each framework
         controls_by_framework = self.vanta_client.get_privacy_controls(frameworks)
         
-        # Analyze compliance for each framework
+        return {
+            "scan_results": scan_results,
+            **self.evaluate(scan_results, controls_by_framework)
+        }
+    
+    def evaluate(
+        self,
+        scan_results: Dict[str, Any],
+        controls_by_framework: Dict[str, List[Dict[str, Any]]]
+    ) -> Dict[str, Any]:
+        """
+        Evaluate a scan against controls that were already fetched
+        
+        Runs only the compliance and third-party risk engines, so callers evaluating
+        many scans can fetch controls once and reuse them.
+        
+        Args:
+            scan_results: Results from website scan
+            controls_by_framework: Framework ID to controls (see VantaClient.get_privacy_controls)
+            
+        Returns:
+            compliance_analysis, third_party_risks and overall_summary
+        """
+        # Walk the cookies once; every framework reads the same feature table
+        features = extract_features(scan_results)
+        
+        # Analyze compliance for each framework, sharing rule outcomes across frameworks
+        outcomes = {}
         compliance_results = {}
         for framework_id, controls in controls_by_framework.items():
-            compliance_results[framework_id] = self._analyze_framework(
-                scan_results, 
-                framework_id, 
-                controls
-            )
+            with stage("compliance_evaluation"):
+                compliance_results[framework_id] = self._analyze_framework(
+                    scan_results, 
+                    framework_id, 
+                    controls,
+                    features,
+                    outcomes
+                )
+        
+        return {
+            "compliance_analysis": compliance_results,
+            "third_party_risks": self._analyze_third_party_risks(scan_results),
+            "overall_summary": self._generate_summary(compliance_results)
+        }
+    
+    async def analyze_compliance_async(
+        self,
+        scan_results: Dict[str, Any],
+        frameworks: List[str] = None,
+        timeout: Optional[float] = 10.0
+    ) -> Dict[str, Any]:
+        """
+        Analyze scan results for compliance, fetching framework controls concurrently
+        
+        Each framework is evaluated as soon as its controls arrive. Frameworks whose
+        controls aren't available before the shared deadline are reported in
+        overall_summary instead of failing the whole analysis.
+        
+        Args:
+            scan_results: Results from website scan
+            frameworks: List of frameworks to check (defaults to ['gdpr', 'ccpa'])
+            timeout: Shared deadline in seconds for all control fetches (None waits indefinitely)
+            
+        Returns:
+            Compliance analysis results
+        """
+        if frameworks is None:
+            frameworks = ['gdpr', 'ccpa']
         
-        # Analyze third-party risks
+        tasks = {
+            asyncio.ensure_future(self.vanta_client.get_framework_privacy_controls_async(framework_id)): framework_id
+            for framework_id in frameworks
+        }
+        
+        features = extract_features(scan_results)
         third_party_risks = self._analyze_third_party_risks(scan_results)
         
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        outcomes = {}
+        compliance_results = {}
+        failed = {}
+        pending = set(tasks)
+        while pending:
+            remaining = None if deadline is None else deadline - loop.time()
+            if remaining is not None and remaining <= 0:
+                break
+            done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                framework_id = tasks[task]
+                if task.exception() is not None:
+                    failed[framework_id] = str(task.exception())
+                    continue
+                with stage("compliance_evaluation"):
+                    compliance_results[framework_id] = self._analyze_framework(
+                        scan_results,
+                        framework_id,
+                        task.result(),
+                        features,
+                        outcomes
+                    )
+        
+        for task in pending:
+            task.cancel()
+        
+        summary = self._generate_summary(compliance_results)
+        summary["frameworks_timed_out"] = [tasks[task] for task in tasks if task in pending]
+        summary["frameworks_failed"] = failed
+        summary["partial"] = bool(pending or failed)
+        
         return {
             "scan_results": scan_results,
-            "compliance_analysis": compliance_results,
+            "compliance_analysis": {
+                framework_id: compliance_results[framework_id]
+                for framework_id in frameworks if framework_id in compliance_results
+            },
             "third_party_risks": third_party_risks,
-            "overall_summary": self._generate_summary(compliance_results)
+            "overall_summary": summary
         }
     
     def _analyze_framework(
         self, 
         scan_results: Dict[str, Any], 
         framework_id: str,
-        controls: List[Dict[str, Any]]
+        controls: List[Dict[str, Any]],
+        features: Optional[Dict[str, Any]] = None,
+        outcomes: Optional[Dict[str, Any]] = None
     ) -> Dict[str, Any]:
         """
         Analyze compliance for a specific framework
@@ -71,71 +180,18 @@ class ComplianceAnalyzer:
             scan_results: Scan results
             framework_id: Framework identifier
             controls: List of controls for the framework
+            features: Precomputed cookie feature table (see features.extract_features)
+            outcomes: Rule outcomes already computed for this scan by other frameworks
             
         Returns:
             Framework compliance analysis
         """
-        passed_controls = []
-        failed_controls = []
-        warnings = []
-        recommendations = []
-        
-        cookies = scan_results.get('cookies', [])
-        local_storage = scan_results.get('localStorage', {})
-        third_parties = scan_results.get('thirdParties', [])
+        if features is None:
+            features = extract_features(scan_results)
         
-        # Check cookie security attributes
-        for control in controls:
-            control_id = control.get('id', '')
-            
-            if 'consent' in control_id.lower():
-                # Check for consent mechanism
-                result = self._check_consent_mechanism(scan_results)
-                if result['passed']:
-                    passed_controls.append(result['message'])
-                else:
-                    failed_controls.append(result['message'])
-                    recommendations.append(result['recommendation'])
-            
-            elif 'secure' in control_id.lower():
-                # Check Secure flag on cookies
-                result = self._check_secure_flag(cookies)
-                if result['passed']:
-                    passed_controls.append(result['message'])
-                else:
-                    failed_controls.append(result['message'])
-                    recommendations.append(result['recommendation'])
-            
-            elif 'httponly' in control_id.lower():
-                # Check httpOnly flag on cookies
-                result = self._check_httponly_flag(cookies)
-                if result['passed']:
-                    passed_controls.append(result['message'])
-                else:
-                    failed_controls.append(result['message'])
-                    recommendations.append(result['recommendation'])
-            
-            elif 'samesite' in control_id.lower():
-                # Check sameSite attribute
-                result = self._check_samesite_attribute(cookies)
-                if result['passed']:
-                    passed_controls.append(result['message'])
-                else:
-                    warnings.append(result['message'])
-                    recommendations.append(result['recommendation'])
-            
-            elif 'third-party' in control_id.lower():
-                # Check third-party documentation
-                result = self._check_third_party_disclosure(third_parties)
-                if result['passed']:
-                    passed_controls.append(result['message'])
-                else:
-                    warnings.append(result['message'])
-                    recommendations.append(result['recommendation'])
-        
-        # Calculate compliance score
-        total_checks = len(passed_controls) + len(failed_controls)
-        score = (len(passed_controls) / total_checks * 100) if total_checks > 0 else 0
+        # Controls are bound to rules from rules.json by the shared engine
+        result = get_engine().evaluate(controls, features, outcomes)
+        score = result['score']
         
         # Determine status
         if score >= 80:
@@ -147,137 +203,28 @@ class ComplianceAnalyzer:
         
         return {
             "framework": framework_id.upper(),
-            "score": round(score, 1),
+            "score": score,
             "status": status,
-            "passed_controls": passed_controls,
-            "failed_controls": failed_controls,
-            "warnings": warnings,
-            "recommendations": recommendations
+            "passed_controls": result['passed'],
+            "failed_controls": result['failed'],
+            "warnings": result['warnings'],
+            "recommendations": result['recommendations']
         }
     
-    def _check_consent_mechanism(self, scan_results: Dict[str, Any]) -> Dict[str, Any]:
-        """Check if consent mechanism is present"""
-        # This is a simplified check - in reality, you'd need more sophisticated detection
-        # For now, we'll assume presence of cookies indicates some mechanism exists
-        cookies = scan_results.get('cookies', [])
-        
-        if len(cookies) > 0:
-            return {
-                "passed": True,
-                "message": "Cookie consent mechanism detected",
-                "recommendation": ""
-            }
-        else:
-            return {
-                "passed": False,
-                "message": "No clear consent mechanism detected",
-                "recommendation": "Implement a cookie consent banner to obtain user permission before setting cookies"
-            }
-    
-    def _check_secure_flag(self, cookies: List[Dict[str, Any]]) -> Dict[str, Any]:
-        """Check if cookies have Secure flag"""
-        insecure_cookies = [c for c in cookies if not c.get('secure', False)]
-        
-        if not cookies:
-            return {"passed": True, "message": "No cookies found", "recommendation": ""}
-        
-        if not insecure_cookies:
-            return {
-                "passed": True,
-                "message": "All cookies have 'Secure' flag set",
-                "recommendation": ""
-            }
-        else:
-            return {
-                "passed": False,
-                "message": f"{len(insecure_cookies)} cookie(s) missing 'Secure' flag: {', '.join([c.get('name', 'unknown') for c in insecure_cookies[:3]])}",
-                "recommendation": "Set 'Secure' flag on all cookies to ensure they're only transmitted over HTTPS"
-            }
-    
-    def _check_httponly_flag(self, cookies: List[Dict[str, Any]]) -> Dict[str, Any]:
-        """Check if session cookies have httpOnly flag"""
-        # Identify likely session cookies
-        session_cookies = [c for c in cookies if 'session' in c.get('name', '').lower() or 'auth' in c.get('name', '').lower()]
-        non_httponly_session = [c for c in session_cookies if not c.get('httpOnly', False)]
-        
-        if not session_cookies:
-            return {"passed": True, "message": "No session cookies detected", "recommendation": ""}
-        
-        if not non_httponly_session:
-            return {
-                "passed": True,
-                "message": "Session cookies have 'httpOnly' flag set",
-                "recommendation": ""
-            }
-        else:
-            return {
-                "passed": False,
-                "message": f"{len(non_httponly_session)} session cookie(s) missing 'httpOnly' flag",
-                "recommendation": "Set 'httpOnly' flag on session cookies to prevent XSS attacks"
-            }
-    
-    def _check_samesite_attribute(self, cookies: List[Dict[str, Any]]) -> Dict[str, Any]:
-        """Check if cookies have sameSite attribute"""
-        no_samesite = [c for c in cookies if not c.get('sameSite')]
-        
-        if not cookies:
-            return {"passed": True, "message": "No cookies found", "recommendation": ""}
-        
-        if not no_samesite:
-            return {
-                "passed": True,
-                "message": "All cookies have 'sameSite' attribute set",
-                "recommendation": ""
-            }
-        else:
-            return {
-                "passed": False,
-                "message": f"{len(no_samesite)} cookie(s) missing 'sameSite' attribute",
-                "recommendation": "Set 'sameSite' attribute (Lax or Strict) on cookies to prevent CSRF attacks"
-            }
-    
-    def _check_third_party_disclosure(self, third_parties: List[str]) -> Dict[str, Any]:
-        """Check third-party services"""
-        if not third_parties:
-            return {
-                "passed": True,
-                "message": "No third-party services detected",
-                "recommendation": ""
-            }
-        else:
-            return {
-                "passed": False,
-                "message": f"Detected {len(third_parties)} third-party service(s)",
-                "recommendation": f"Document these third-party services in your privacy policy: {', '.join(third_parties[:5])}"
-            }
-    
     def _analyze_third_party_risks(self, scan_results: Dict[str, Any]) -> List[Dict[str, Any]]:
         """Analyze risks from third-party services"""
         third_parties = scan_results.get('thirdParties', [])
         
         risks = []
         for domain in third_parties:
-            # Categorize common third-party services
-            risk_level = "unknown"
-            category = "Unknown"
-            
-            if 'google-analytics' in domain or 'googletagmanager' in domain:
-                risk_level = "low"
-                category = "Analytics"
-            elif 'facebook' in domain or 'doubleclick' in domain:
-                risk_level = "medium"
-                category = "Advertising"
-            elif 'cloudflare' in domain or 'cloudfront' in domain:
-                risk_level = "low"
-                category = "CDN"
-            else:
-                risk_level = "medium"
-                category = "Unknown"
+            # Categorize via the shared tracker database (suffix trie + substring rules)
+            tracker = classify_domain(domain)
             
             risks.append({
                 "domain": domain,
-                "category": category,
-                "risk_level": risk_level,
+                "category": tracker['category'],
+                "owner": tracker['owner'],
+                "risk_level": tracker['risk_level'],
                 "recommendation": f"Review data processing agreement with {domain}"
             })
         
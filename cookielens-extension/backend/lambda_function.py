@@ -1,18 +1,67 @@
 import json
 import boto3
+import logging
 import os
 import requests
+from contextlib import nullcontext
 from playwright.sync_api import sync_playwright
 from urllib.parse import urlparse
 from datetime import datetime
 
+# Stage metrics, trace spans and JSON event logs come from the shared backend/ modules when they
+# are available (FastAPI server); the standalone Lambda package runs without them
+try:
+    import shared_backend  # noqa: F401
+    from metrics import browser_open, stage, track_scan
+    from tracing import set_attributes
+    from eventlog import configure as configure_logging, flush as flush_logs, get_logger, scan_context
+except ImportError:
+    def stage(name):
+        return nullcontext()
+
+    def track_scan():
+        return nullcontext()
+
+    def browser_open():
+        return nullcontext()
+
+    def set_attributes(attributes):
+        pass
+
+    class _EventLogger(logging.LoggerAdapter):
+        def process(self, msg, kwargs):
+            fields = {k: kwargs.pop(k) for k in list(kwargs) if k not in ("exc_info", "stack_info", "extra")}
+            return f"{msg} {json.dumps(fields, default=str)}", kwargs
+
+    def get_logger(name):
+        return _EventLogger(logging.getLogger(name), {})
+
+    def scan_context(scan_id=None):
+        return nullcontext(scan_id)
+
+    def configure_logging():
+        logging.getLogger().setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+
+    def flush_logs():
+        pass
+
+log = get_logger("cookielens.scan")
+
+class AnalysisError(Exception):
+    """Raised when Bedrock could not produce an analysis; the message is shown in its place"""
+
 def analyze_with_claude(scan_data):
-    """Use AWS Bedrock Claude model to analyze scan results and generate a human-readable privacy report"""
+    """
+    Use AWS Bedrock Claude model to analyze scan results and generate a human-readable privacy report
+
+    Raises:
+        AnalysisError: No API key, or the Bedrock call failed
+    """
     try:
         # Authenticate using Bedrock API Key
         api_key = os.getenv('BEDROCK_API_KEY','ABSKTGktYXQtNDQwNzQ0MjUwNzIwOlRxQkJLWEFIRWFKaGZaU0lsZjF5SlRza1NEK1FIMk9aS1hqUGVyOEhWcVpzTHlzL0t1YnBLKzI4VnZVPQ==')
         if not api_key:
-            return "Error: BEDROCK_API_KEY environment variable not set. Please run: export BEDROCK_API_KEY='your_api_key'"
+            raise AnalysisError("Error: BEDROCK_API_KEY environment variable not set. Please run: export BEDROCK_API_KEY='your_api_key'")
         
         region = os.getenv('AWS_REGION', 'us-east-1')
         
@@ -63,94 +112,113 @@ Keep it SHORT and actionable. Focus on the most critical issues only."""
         
         return analysis
         
+    except AnalysisError:
+        raise
     except requests.exceptions.RequestException as e:
-        print(f"Bedrock API request failed: {e}")
-        return f"API call failed: {str(e)}"
+        log.warning("bedrock.request_failed", error=str(e))
+        raise AnalysisError(f"API call failed: {str(e)}")
     except Exception as e:
-        print(f"Bedrock analysis failed: {e}")
-        return f"Analysis failed: {str(e)}"
+        log.warning("bedrock.analysis_failed", error=str(e))
+        raise AnalysisError(f"Analysis failed: {str(e)}")
 
 def scan_website(url):
     """Core website scanning logic that can be reused by both Lambda and FastAPI"""
-    print(f"🌐 Starting website scan for: {url}")
-    print(f"⏰ Scan started at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    with scan_context(), track_scan():
+        return _scan_website(url)
+
+def _scan_website(url):
+    log.info("scan.started", url=url)
     
     with sync_playwright() as p:
-        print("🚀 Launching browser...")
-        browser = p.chromium.launch(headless=True, args=["--no-sandbox"])
-        context = browser.new_context()
-        page = context.new_page()
-
-        third_parties = set()
-        print("📡 Setting up request monitoring...")
-
-        def on_request(request):
-            try:
-                host = urlparse(request.url).hostname or ""
-                base_host = urlparse(url).hostname or ""
-                if not host.endswith(base_host):
-                    third_parties.add(host)
-            except:
-                pass
-
-        page.on("request", on_request)
-        print(f"🔗 Navigating to: {url}")
-        page.goto(url, wait_until="load", timeout=60000)
-        print("✅ Page loaded successfully!")
-
-        print("🍪 Extracting cookies...")
-        cookies = context.cookies()
-        print(f"📊 Found {len(cookies)} cookies")
-        
-        print("💾 Extracting localStorage...")
-        local_storage = page.evaluate("""
-            () => {
-                const data = {};
-                for (let i = 0; i < localStorage.length; i++) {
-                    const key = localStorage.key(i);
-                    data[key] = localStorage.getItem(key);
-                }
-                return data;
+        log.debug("scan.browser_launch")
+        with stage("browser_launch"):
+            browser = p.chromium.launch(headless=True, args=["--no-sandbox"])
+        with browser_open():
+            context = browser.new_context()
+            page = context.new_page()
+
+            third_parties = set()
+
+            def on_request(request):
+                try:
+                    host = urlparse(request.url).hostname or ""
+                    base_host = urlparse(url).hostname or ""
+                    if not host.endswith(base_host):
+                        third_parties.add(host)
+                except:
+                    pass
+
+            page.on("request", on_request)
+            log.debug("scan.navigation", url=url)
+            with stage("navigation"):
+                page.goto(url, wait_until="load", timeout=60000)
+            log.debug("scan.page_loaded")
+
+            with stage("cookie_extraction"):
+                cookies = context.cookies()
+            log.debug("scan.cookies_extracted", cookie_count=len(cookies))
+            
+            with stage("storage_extraction"):
+                local_storage = page.evaluate("""
+                    () => {
+                        const data = {};
+                        for (let i = 0; i < localStorage.length; i++) {
+                            const key = localStorage.key(i);
+                            data[key] = localStorage.getItem(key);
+                        }
+                        return data;
+                    }
+                """)
+            log.debug("scan.storage_extracted", local_storage_count=len(local_storage))
+
+            scan = {
+                "url": url,
+                "scannedAt": datetime.utcnow().isoformat(),
+                "cookies": cookies,
+                "localStorage": local_storage,
+                "thirdParties": list(third_parties)
             }
-        """)
-        print(f"📊 Found {len(local_storage)} localStorage items")
-
-        scan = {
-            "url": url,
-            "scannedAt": datetime.utcnow().isoformat(),
-            "cookies": cookies,
-            "localStorage": local_storage,
-            "thirdParties": list(third_parties)
-        }
 
-        print(f"🔗 Detected {len(third_parties)} third-party services")
-        browser.close()
-        print("🔒 Browser closed")
+            set_attributes({
+                "url.host": urlparse(url).hostname or "",
+                "scan.cookie_count": len(cookies),
+                "scan.third_party_count": len(third_parties)
+            })
+            browser.close()
+            log.debug("scan.browser_closed")
 
     # Analyze scan results with Claude
-    print("🤖 Starting AI analysis with Claude...")
-    scan["humanReadableAnalysis"] = analyze_with_claude(scan)
-    print("✅ AI analysis completed!")
+    # a failed analysis still returns the scan, flagged so it is not cached as the site's result
+    with stage("bedrock_call"):
+        try:
+            scan["humanReadableAnalysis"] = analyze_with_claude(scan)
+            scan["analysisFailed"] = False
+        except AnalysisError as e:
+            scan["humanReadableAnalysis"] = str(e)
+            scan["analysisFailed"] = True
+    log.debug("scan.analysis_completed", failed=scan["analysisFailed"])
 
     # Upload to S3 (optional)
     if os.getenv("S3_BUCKET"):
-        print("☁️ Uploading results to S3...")
-        s3 = boto3.client("s3")
-        key = f"scans/{datetime.utcnow().isoformat()}_scan.json"
-        s3.put_object(
-            Bucket=os.getenv("S3_BUCKET"),
-            Key=key,
-            Body=json.dumps(scan, indent=2),
-            ContentType="application/json"
-        )
+        with stage("s3_upload"):
+            s3 = boto3.client("s3")
+            key = f"scans/{datetime.utcnow().isoformat()}_scan.json"
+            s3.put_object(
+                Bucket=os.getenv("S3_BUCKET"),
+                Key=key,
+                Body=json.dumps(scan, indent=2),
+                ContentType="application/json"
+            )
         scan["s3Path"] = f"s3://{os.getenv('S3_BUCKET')}/{key}"
-        print(f"✅ Results uploaded to: {scan['s3Path']}")
+        log.debug("scan.uploaded", s3_path=scan["s3Path"])
 
-    print(f"⏰ Scan completed at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    log.info("scan.completed", url=url, cookie_count=len(scan["cookies"]),
+             local_storage_count=len(scan["localStorage"]), third_party_count=len(scan["thirdParties"]))
     return scan
 
 def lambda_handler(event, context):
     """AWS Lambda handler function"""
+    configure_logging()
     try:
         # Get body from API Gateway event
         body = json.loads(event.get("body", "{}"))
@@ -166,11 +234,14 @@ def lambda_handler(event, context):
         }
 
     except Exception as e:
-        print("Error:", e)
+        log.exception("scan.failed", error=str(e))
         return {
             "statusCode": 500,
             "body": json.dumps({"error": str(e)})
         }
+    finally:
+        # the runtime may freeze the process as soon as the handler returns
+        flush_logs()
 
 # For local debugging
 if __name__ == "__main__":
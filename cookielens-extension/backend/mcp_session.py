@@ -0,0 +1,290 @@
+"""
+Persistent MCP stdio session
+Keeps one MCP server subprocess alive and multiplexes JSON-RPC calls over its pipes
+"""
+import asyncio
+import itertools
+import json
+import subprocess
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from typing import Any, Dict, List, Optional
+import shared_backend  # noqa: F401  (before any backend/ import)
+from eventlog import get_logger
+
+PROTOCOL_VERSION = "2024-11-05"
+
+log = get_logger("cookielens.mcp")
+
+
+class MCPError(Exception):
+    """Raised when an MCP call fails or the server process is unavailable"""
+
+
+class MCPSession:
+    """
+    Long-lived MCP client over a subprocess's stdin/stdout
+
+    Requests carry JSON-RPC ids and are written to the single pipe as newline-delimited
+    JSON; a reader thread resolves the matching future when each response arrives, so
+    any number of callers (threads or asyncio tasks) can have calls in flight at once.
+    If the server exits, pending calls fail and the process is restarted.
+    """
+
+    def __init__(
+        self,
+        command: List[str],
+        env: Optional[Dict[str, str]] = None,
+        timeout: float = 30,
+        restart_delay: float = 1.0,
+        max_restart_delay: float = 30.0
+    ):
+        """
+        Initialize MCP session (call start() to launch the server)
+
+        Args:
+            command: Server command line, e.g. ['npx', '-y', '@vantasdk/vanta-mcp-server']
+            env: Environment for the server process
+            timeout: Default seconds to wait for a response
+            restart_delay: Initial delay before restarting a crashed server
+            max_restart_delay: Upper bound for the restart backoff
+        """
+        self.command = command
+        self.env = env
+        self.timeout = timeout
+        self.restart_delay = restart_delay
+        self.max_restart_delay = max_restart_delay
+        self.stats = {"calls": 0, "errors": 0, "restarts": 0}
+        self.server_info: Dict[str, Any] = {}
+        self._ids = itertools.count(1)
+        self._pending: Dict[int, Future] = {}
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._process: Optional[subprocess.Popen] = None
+        self._ready = threading.Event()
+        self._closed = False
+        self._failures = 0
+
+    def _count(self, name: str):
+        # updated from caller threads, the event loop and the reader thread
+        with self._lock:
+            self.stats[name] += 1
+
+    @property
+    def running(self) -> bool:
+        return self._ready.is_set() and self._process is not None and self._process.poll() is None
+
+    def start(self) -> "MCPSession":
+        """
+        Launch the server and perform the MCP initialize handshake
+
+        Returns:
+            The session itself
+        """
+        self._closed = False
+        self._spawn()
+        return self
+
+    def close(self):
+        """Stop the server and fail any calls still waiting"""
+        self._closed = True
+        self._ready.clear()
+        process, self._process = self._process, None
+        if process is not None:
+            try:
+                process.stdin.close()
+            except OSError:
+                pass
+            process.terminate()
+            try:
+                process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        self._fail_pending(MCPError("MCP session closed"))
+
+    def _spawn(self):
+        process = subprocess.Popen(
+            self.command,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            env=self.env,
+            text=True,
+            bufsize=1
+        )
+        self._process = process
+        threading.Thread(target=self._read_loop, args=(process,), name="mcp-reader", daemon=True).start()
+
+        try:
+            result = self._request("initialize", {
+                "protocolVersion": PROTOCOL_VERSION,
+                "capabilities": {},
+                "clientInfo": {"name": "cookielens", "version": "1.0.0"}
+            }, self.timeout, wait_ready=False)
+            self._send({"jsonrpc": "2.0", "method": "notifications/initialized"})
+        except MCPError:
+            # detach first so the reader thread doesn't treat this as a crash to recover from
+            self._process = None
+            process.kill()
+            raise
+        self.server_info = result.get("serverInfo", {})
+        self._failures = 0
+        self._ready.set()
+
+    def _read_loop(self, process: subprocess.Popen):
+        for line in process.stdout:
+            try:
+                message = json.loads(line)
+            except ValueError:
+                continue  # servers may log non-JSON lines to stdout
+            future = None
+            if "id" in message:
+                with self._lock:
+                    future = self._pending.pop(message["id"], None)
+            if future is None or not future.set_running_or_notify_cancel():
+                continue  # notification, or a caller that gave up waiting
+            if "error" in message:
+                future.set_exception(MCPError(message["error"].get("message", "MCP error")))
+            else:
+                future.set_result(message.get("result", {}))
+
+        # stdout closed: the server exited
+        if process is not self._process:
+            return
+        self._ready.clear()
+        self._fail_pending(MCPError(f"MCP server exited with code {process.wait()}"))
+        if not self._closed:
+            self._restart()
+
+    def _restart(self):
+        while not self._closed:
+            delay = min(self.restart_delay * (2 ** self._failures), self.max_restart_delay)
+            self._failures += 1
+            time.sleep(delay)
+            if self._closed:
+                return
+            try:
+                self._spawn()
+                self._count("restarts")
+                return
+            except (OSError, MCPError) as e:
+                log.warning("mcp.restart_failed", command=self.command[0], error=str(e))
+
+    def _fail_pending(self, error: Exception):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(error)
+
+    def _send(self, message: Dict[str, Any]):
+        process = self._process
+        if process is None or process.poll() is not None:
+            raise MCPError("MCP server is not running")
+        data = json.dumps(message) + "\n"
+        try:
+            with self._write_lock:
+                process.stdin.write(data)
+                process.stdin.flush()
+        except (OSError, ValueError) as e:
+            raise MCPError(f"MCP server pipe closed: {e}")
+
+    def _submit(self, method: str, params: Dict[str, Any], wait_ready: bool = True, timeout: Optional[float] = None) -> Future:
+        process = self._process
+        if wait_ready and process is not None and process.poll() is not None and self._process is process:
+            # exited, but the reader thread has not noticed yet: wait for the restart
+            self._ready.clear()
+        if wait_ready and not self._ready.wait(self.timeout if timeout is None else timeout):
+            raise MCPError("MCP server is not running")
+        request_id = next(self._ids)
+        future: Future = Future()
+        with self._lock:
+            self._pending[request_id] = future
+        try:
+            self._send({"jsonrpc": "2.0", "id": request_id, "method": method, "params": params})
+        except MCPError:
+            with self._lock:
+                self._pending.pop(request_id, None)
+            raise
+        future.request_id = request_id
+        return future
+
+    def _request(self, method: str, params: Dict[str, Any], timeout: float, wait_ready: bool = True) -> Dict[str, Any]:
+        future = self._submit(method, params, wait_ready, timeout)
+        try:
+            return future.result(timeout)
+        except FutureTimeout:
+            with self._lock:
+                self._pending.pop(future.request_id, None)
+            raise MCPError(f"MCP {method} timed out after {timeout}s")
+
+    def call_tool(self, name: str, arguments: Dict[str, Any], timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Call an MCP tool and wait for its result
+
+        Args:
+            name: Tool name
+            arguments: Tool arguments
+            timeout: Seconds to wait (defaults to the session timeout)
+
+        Returns:
+            Tool payload decoded from the JSON text content
+        """
+        self._count("calls")
+        try:
+            result = self._request("tools/call", {"name": name, "arguments": arguments},
+                                   self.timeout if timeout is None else timeout)
+        except MCPError:
+            self._count("errors")
+            raise
+        return decode_tool_result(result)
+
+    async def call_tool_async(self, name: str, arguments: Dict[str, Any], timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Async variant of call_tool; many calls can be awaited concurrently over the same pipe
+
+        Args:
+            name: Tool name
+            arguments: Tool arguments
+            timeout: Seconds to wait (defaults to the session timeout)
+
+        Returns:
+            Tool payload decoded from the JSON text content
+        """
+        timeout = self.timeout if timeout is None else timeout
+        self._count("calls")
+        try:
+            # waiting out a restart and the pipe write both block, so neither runs on the event loop
+            future = await asyncio.get_running_loop().run_in_executor(
+                None, self._submit, "tools/call", {"name": name, "arguments": arguments}, True, timeout)
+            try:
+                result = await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+            except asyncio.TimeoutError:
+                raise MCPError(f"MCP tools/call {name} timed out after {timeout}s")
+            finally:
+                with self._lock:
+                    self._pending.pop(future.request_id, None)
+        except MCPError:
+            self._count("errors")
+            raise
+        return decode_tool_result(result)
+
+
+def decode_tool_result(result: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Turn an MCP tools/call result into the tool's JSON payload
+
+    Args:
+        result: JSON-RPC result with 'content' blocks
+
+    Returns:
+        Parsed payload (or {'text': ...} if the content is not JSON)
+    """
+    text = "".join(block.get("text", "") for block in result.get("content", []) if block.get("type") == "text")
+    if result.get("isError"):
+        raise MCPError(text or "MCP tool returned an error")
+    try:
+        return json.loads(text)
+    except ValueError:
+        return {"text": text}
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Stand-in Vanta MCP server for local development and tests
+Speaks MCP over stdio and answers tool calls with VantaClient's mock payloads
+
+Usage:
+    VANTA_MCP_COMMAND="python mock_mcp_server.py" python app.py
+"""
+import json
+import sys
+import threading
+import time
+
+from vanta_client import VantaClient
+
+TOOLS = ['frameworks', 'list_framework_controls']
+
+_write_lock = threading.Lock()
+
+
+def send(message):
+    with _write_lock:
+        sys.stdout.write(json.dumps(message) + "\n")
+        sys.stdout.flush()
+
+
+def call_tool(request_id, params):
+    arguments = params.get('arguments', {})
+    # lets tests hold a response back so later requests overtake it
+    time.sleep(arguments.pop('_delay', 0))
+    payload = VantaClient._get_mock_data(params.get('name'), arguments)
+    send({
+        "jsonrpc": "2.0",
+        "id": request_id,
+        "result": {
+            "content": [{"type": "text", "text": json.dumps(payload)}],
+            "isError": 'error' in payload
+        }
+    })
+
+
+def main():
+    for line in sys.stdin:
+        message = json.loads(line)
+        method, request_id = message.get('method'), message.get('id')
+        if request_id is None:
+            continue
+        if method == 'initialize':
+            send({"jsonrpc": "2.0", "id": request_id, "result": {
+                "protocolVersion": message['params'].get('protocolVersion'),
+                "capabilities": {"tools": {}},
+                "serverInfo": {"name": "cookielens-mock-vanta", "version": "1.0.0"}
+            }})
+        elif method == 'tools/list':
+            send({"jsonrpc": "2.0", "id": request_id, "result": {
+                "tools": [{"name": name, "inputSchema": {"type": "object"}} for name in TOOLS]
+            }})
+        elif method == 'tools/call':
+            threading.Thread(target=call_tool, args=(request_id, message.get('params', {})), daemon=True).start()
+        else:
+            send({"jsonrpc": "2.0", "id": request_id, "error": {"code": -32601, "message": f"Unknown method {method}"}})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Worker for scans queued by app.py with `Prefer: respond-async`
+Leases jobs from the shared SQLite queue (see backend/jobs.py and backend/worker.py)
+
+Usage:
+    python scan_worker.py --processes 2
+"""
+from typing import Any, Dict
+
+import shared_backend  # noqa: F401  (before any backend/ import)
+from lambda_function import scan_website
+from vanta_client import VantaClient
+from compliance_analyzer import ComplianceAnalyzer
+from worker import main
+
+vanta_client = VantaClient()
+compliance_analyzer = ComplianceAnalyzer(vanta_client)
+session_attempted = False
+
+
+def scan_job(payload: Dict[str, Any]) -> Dict[str, Any]:
+    return scan_website(payload['url'])
+
+
+def scan_with_compliance_job(payload: Dict[str, Any]) -> Dict[str, Any]:
+    # started once per worker process, after any fork; falls back to mock data if it can't start
+    global session_attempted
+    if not session_attempted:
+        session_attempted = True
+        vanta_client.start_session()
+    scan_results = scan_website(payload['url'])
+    return compliance_analyzer.analyze_compliance(scan_results, frameworks=payload.get('frameworks'))
+
+
+HANDLERS = {
+    'ext-scan': scan_job,
+    'ext-scan-with-compliance': scan_with_compliance_job,
+}
+
+
+if __name__ == "__main__":
+    main(HANDLERS)
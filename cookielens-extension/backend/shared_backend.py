@@ -0,0 +1,17 @@
+"""
+Puts the shared scan engines (the top-level backend/ directory: config, rules, features,
+trackers, metrics, jobs, ...) on sys.path
+
+Import this before anything from backend/. The directory goes in front of site-packages so an
+installed package named `rules`, `config` or `metrics` cannot shadow a backend module; none of
+its module names collide with this directory's. Set COOKIELENS_BACKEND_DIR when the two are not
+checked out side by side. Does nothing when the directory does not exist (standalone Lambda).
+"""
+import os
+import sys
+
+BACKEND_DIR = os.path.abspath(os.getenv('COOKIELENS_BACKEND_DIR') or
+                              os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'backend'))
+
+if os.path.isdir(BACKEND_DIR) and BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
@@ -0,0 +1,45 @@
+"""Concurrent framework evaluation: timeouts, failures and partial results"""
+import asyncio
+
+from compliance_analyzer import ComplianceAnalyzer
+from vanta_client import ControlCache, VantaClient
+
+SCAN = {
+    "url": "https://example.com/",
+    "cookies": [{"name": "sid", "value": "1", "domain": "example.com", "secure": True, "httpOnly": True,
+                 "sameSite": "Lax", "expires": -1}],
+    "thirdParties": [],
+}
+
+
+class SlowVanta:
+    """gdpr answers at once, ccpa too late, soc2 fails"""
+
+    async def get_framework_privacy_controls_async(self, framework_id):
+        if framework_id == "ccpa":
+            await asyncio.sleep(5)
+        if framework_id == "soc2":
+            raise RuntimeError("upstream 503")
+        return VantaClient._get_mock_data("list_framework_controls", {"frameworkId": framework_id})["controls"]
+
+
+def test_timed_out_and_failed_frameworks_are_reported():
+    analyzer = ComplianceAnalyzer(SlowVanta())
+    result = asyncio.run(analyzer.analyze_compliance_async(SCAN, ["gdpr", "ccpa", "soc2"], timeout=0.2))
+    summary = result["overall_summary"]
+    assert list(result["compliance_analysis"]) == ["gdpr"]
+    assert summary["frameworks_timed_out"] == ["ccpa"]
+    assert summary["frameworks_failed"] == {"soc2": "upstream 503"}
+    assert summary["partial"] is True and summary["frameworks_analyzed"] == 1
+
+
+def test_complete_analysis_is_not_partial():
+    analyzer = ComplianceAnalyzer(SlowVanta())
+    result = asyncio.run(analyzer.analyze_compliance_async(SCAN, ["gdpr"], timeout=1))
+    assert result["overall_summary"]["partial"] is False
+    assert result["overall_summary"]["frameworks_timed_out"] == []
+
+
+def test_no_frameworks_fetches_nothing():
+    client = VantaClient(control_cache=ControlCache())
+    assert asyncio.run(client.get_privacy_controls_async([], timeout=1)) == {}
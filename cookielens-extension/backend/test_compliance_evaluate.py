@@ -0,0 +1,95 @@
+"""POST /compliance/evaluate: single documents, JSON lists, NDJSON and bad input"""
+import asyncio
+import json
+import os
+import tempfile
+
+# keep the shared caches and the job queue out of the checkout while testing
+os.environ.setdefault('RESULT_CACHE_PATH', '')
+os.environ.setdefault('SINGLEFLIGHT_DIR', '')
+os.environ.setdefault('JOBS_DB_PATH', os.path.join(tempfile.mkdtemp(), 'jobs.db'))
+
+from fastapi.testclient import TestClient
+import app
+
+SCAN = {
+    "url": "https://example.com/",
+    "cookies": [{"name": "sid", "value": "1", "domain": "example.com", "secure": True, "httpOnly": True,
+                 "sameSite": "Lax", "expires": -1}],
+    "localStorage": {},
+    "thirdParties": ["google-analytics.com"],
+}
+
+client = TestClient(app.app)
+
+
+def evaluate(body, content_type="application/json", frameworks="gdpr,ccpa"):
+    response = client.post(f"/compliance/evaluate?frameworks={frameworks}", content=body,
+                           headers={"Content-Type": content_type})
+    assert response.status_code == 200
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def test_single_document():
+    [line] = evaluate(json.dumps(SCAN))
+    assert line["index"] == 0 and line["url"] == "https://example.com/"
+    assert set(line["compliance_analysis"]) == {"gdpr", "ccpa"}
+    assert line["third_party_risks"][0]["domain"] == "google-analytics.com"
+
+
+def test_json_list_accepts_saved_responses():
+    lines = evaluate(json.dumps([SCAN, {"scan_results": {**SCAN, "url": "https://b.example/"}}]))
+    assert [(line["index"], line["url"]) for line in lines] == [(0, "https://example.com/"), (1, "https://b.example/")]
+
+
+def test_ndjson_bad_lines_do_not_end_the_stream():
+    body = "\n".join([json.dumps(SCAN), "{not json", json.dumps({"scan_results": 5}), "[1, 2]",
+                      json.dumps({**SCAN, "url": "https://c.example/"})])
+    lines = evaluate(body, "application/x-ndjson")
+    assert [line["index"] for line in lines] == [0, 1, 2, 3, 4]
+    assert "compliance_analysis" in lines[0] and lines[4]["url"] == "https://c.example/"
+    assert lines[1]["error"].startswith("Invalid JSON")
+    assert lines[2]["error"] == "scan_results must be a JSON object"
+    assert lines[3]["error"] == "Scan document must be a JSON object"
+
+
+def test_evaluation_slot_is_released():
+    evaluate(json.dumps(SCAN))
+    assert app.EVALUATIONS.stats()["active"] == 0
+
+
+def test_empty_framework_list_is_rejected():
+    response = client.post("/compliance/evaluate?frameworks=,", content=json.dumps(SCAN),
+                           headers={"Content-Type": "application/json"})
+    assert response.status_code == 422
+    assert app.EVALUATIONS.stats()["active"] == 0
+
+
+def test_ndjson_results_stream_before_the_upload_ends():
+    async def run():
+        uploads, messages = asyncio.Queue(), asyncio.Queue()
+        scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST",
+                 "scheme": "http", "path": "/compliance/evaluate", "raw_path": b"/compliance/evaluate",
+                 "root_path": "", "query_string": b"frameworks=gdpr", "server": ("test", 80),
+                 "client": ("test", 1234), "headers": [(b"content-type", b"application/x-ndjson")]}
+
+        async def body():
+            while True:
+                message = await asyncio.wait_for(messages.get(), 5)
+                if message["type"] == "http.response.body":
+                    return message
+
+        request = asyncio.ensure_future(app.app(scope, uploads.get, messages.put))
+        await uploads.put({"type": "http.request", "body": json.dumps(SCAN).encode() + b"\n", "more_body": True})
+        first = await body()
+        await uploads.put({"type": "http.request", "more_body": False,
+                           "body": json.dumps({**SCAN, "url": "https://b.example/"}).encode()})
+        rest = [await body()]
+        while rest[-1].get("more_body"):
+            rest.append(await body())
+        await request
+        return first["body"], b"".join(message.get("body", b"") for message in rest)
+
+    first, rest = asyncio.run(run())
+    assert json.loads(first)["index"] == 0
+    assert [json.loads(line)["url"] for line in rest.splitlines()] == ["https://b.example/"]
@@ -0,0 +1,115 @@
+import threading
+import time
+
+import pytest
+
+from vanta_client import ControlCache
+
+GDPR = [{'id': 'gdpr-consent'}]
+GDPR_V2 = [{'id': 'gdpr-consent'}, {'id': 'gdpr-retention'}]
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, 'time', lambda: now[0])
+    return now
+
+
+class Loader:
+    def __init__(self, *results):
+        self.results = list(results)
+        self.calls = 0
+        self.done = threading.Event()
+
+    def __call__(self, framework_id):
+        self.calls += 1
+        try:
+            result = self.results.pop(0)
+            if isinstance(result, Exception):
+                raise result
+            return result
+        finally:
+            self.done.set()
+
+
+def test_entries_expire_after_their_ttl(clock):
+    cache = ControlCache(default_ttl=100, ttls={'ccpa': 10}, refresh_ahead=1.0)
+    loader = Loader(GDPR, GDPR_V2)
+    assert cache.get('gdpr', loader) == GDPR
+    clock[0] += 99
+    assert cache.get('gdpr', loader) == GDPR
+    assert loader.calls == 1
+    clock[0] += 1
+    assert cache.get('gdpr', loader) == GDPR_V2
+    assert loader.calls == 2
+    assert cache.stats['hits'] == 1 and cache.stats['misses'] == 2
+    assert cache.ttl('ccpa') == 10
+
+
+def test_refresh_ahead_serves_cached_copy_and_refreshes_in_background(clock):
+    cache = ControlCache(default_ttl=100, refresh_ahead=0.8)
+    assert cache.get('gdpr', Loader(GDPR)) == GDPR
+    clock[0] += 79
+    loader = Loader(GDPR_V2)
+    assert cache.get('gdpr', loader) == GDPR
+    assert loader.calls == 0
+
+    clock[0] += 1
+    assert cache.get('gdpr', loader) == GDPR
+    assert loader.done.wait(5)
+    for _ in range(100):
+        if cache.stats['background_refreshes']:
+            break
+        time.sleep(0.01)
+    assert cache.stats['background_refreshes'] == 1
+    assert cache.get('gdpr', loader) == GDPR_V2
+    assert loader.calls == 1
+
+
+def test_stale_copy_is_served_when_refresh_fails(clock):
+    cache = ControlCache(default_ttl=100)
+    loader = Loader(GDPR, ConnectionError('vanta down'))
+    cache.get('gdpr', loader)
+    clock[0] += 500
+    assert cache.get('gdpr', loader) == GDPR
+    assert cache.stats['stale_served'] == 1 and cache.stats['errors'] == 1
+    assert cache.get('ccpa', Loader(ConnectionError('vanta down'))) == []
+
+
+def test_snapshot_restores_entries_in_a_new_cache(tmp_path, clock):
+    path = str(tmp_path / 'controls.json')
+    ControlCache(default_ttl=100, snapshot_path=path).get('gdpr', Loader(GDPR))
+
+    loader = Loader(GDPR_V2)
+    assert ControlCache(default_ttl=100, snapshot_path=path).get('gdpr', loader) == GDPR
+    assert loader.calls == 0
+
+    clock[0] += 100
+    assert ControlCache(default_ttl=100, snapshot_path=path).get('gdpr', loader) == GDPR_V2
+
+
+def test_unreadable_snapshot_starts_empty(tmp_path):
+    path = tmp_path / 'controls.json'
+    path.write_text('{not json')
+    cache = ControlCache(snapshot_path=str(path))
+    assert cache.get('gdpr', Loader(GDPR)) == GDPR
+    assert ControlCache(snapshot_path=str(path)).get('gdpr', Loader()) == GDPR
+
+
+def test_stats_are_exact_under_concurrent_hits():
+    cache = ControlCache(default_ttl=3600)
+    cache.get('gdpr', Loader(GDPR))
+    barrier = threading.Barrier(8)
+
+    def hit():
+        barrier.wait()
+        for _ in range(2000):
+            cache.get('gdpr', Loader())
+
+    threads = [threading.Thread(target=hit) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert cache.stats['hits'] == 8 * 2000 and cache.stats['misses'] == 1
@@ -0,0 +1,79 @@
+import asyncio
+import os
+import sys
+import time
+
+from mcp_session import MCPSession
+from vanta_client import ControlCache, VantaClient
+
+SERVER = [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'mock_mcp_server.py')]
+
+
+def test_concurrent_calls_are_multiplexed_over_one_process():
+    session = MCPSession(SERVER, timeout=5).start()
+    try:
+        pid = session._process.pid
+
+        async def run():
+            slow = session.call_tool_async('list_framework_controls', {'frameworkId': 'gdpr', '_delay': 0.3})
+            fast = [session.call_tool_async('list_framework_controls', {'frameworkId': 'ccpa'}) for _ in range(20)]
+            return await asyncio.gather(slow, *fast)
+
+        started = time.perf_counter()
+        gdpr, *ccpa = asyncio.run(run())
+        assert time.perf_counter() - started < 1.5
+        assert gdpr == VantaClient._get_mock_data('list_framework_controls', {'frameworkId': 'gdpr'})
+        assert all(c == VantaClient._get_mock_data('list_framework_controls', {'frameworkId': 'ccpa'}) for c in ccpa)
+        assert session.call_tool('frameworks', {})['frameworks'][0]['id'] == 'gdpr'
+        assert session._process.pid == pid
+    finally:
+        session.close()
+
+
+def test_session_restarts_after_crash():
+    session = MCPSession(SERVER, timeout=5, restart_delay=0.05).start()
+    try:
+        first = session._process
+        first.kill()
+        first.wait()
+        assert session.call_tool('frameworks', {})['frameworks']
+        assert session._process.pid != first.pid
+        assert session.stats['restarts'] == 1
+    finally:
+        session.close()
+
+
+def test_async_call_waits_for_restart_after_crash():
+    session = MCPSession(SERVER, timeout=5, restart_delay=0.05).start()
+    try:
+        first = session._process
+        first.kill()
+        first.wait()
+        result = asyncio.run(session.call_tool_async('frameworks', {}))
+        assert result['frameworks'] and session._process.pid != first.pid
+    finally:
+        session.close()
+
+
+def test_vanta_client_serves_mock_data_without_mcp_command(tmp_path, monkeypatch):
+    monkeypatch.delenv('VANTA_MCP_COMMAND', raising=False)
+    creds = tmp_path / 'vanta.env'
+    creds.write_text('{}')
+    client = VantaClient(str(creds), control_cache=ControlCache())
+    assert client.start_session() is False and client.session is None
+    controls = client.get_privacy_controls(['ccpa'])
+    assert [c['id'] for c in controls['ccpa']] == ['ccpa-disclosure', 'ccpa-opt-out', 'ccpa-third-party']
+
+
+def test_vanta_client_uses_session(tmp_path):
+    creds = tmp_path / 'vanta.env'
+    creds.write_text('{}')
+    client = VantaClient(str(creds), control_cache=ControlCache())
+    client.mcp_command = SERVER
+    assert client.start_session()
+    try:
+        controls = client.get_privacy_controls(['gdpr', 'ccpa'])
+        assert [c['id'] for c in controls['ccpa']] == ['ccpa-disclosure', 'ccpa-opt-out', 'ccpa-third-party']
+        assert client.session.stats['calls'] == 2
+    finally:
+        client.close_session()
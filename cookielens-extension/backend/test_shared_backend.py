@@ -0,0 +1,22 @@
+"""backend/ goes on sys.path once, in front of site-packages, without shadowing this directory"""
+import os
+import sys
+
+import shared_backend
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def modules(directory):
+    return {name[:-3] if name.endswith('.py') else name for name in os.listdir(directory)
+            if name.endswith('.py') or os.path.isfile(os.path.join(directory, name, '__init__.py'))}
+
+
+def test_backend_is_ahead_of_site_packages():
+    site_packages = [i for i, entry in enumerate(sys.path) if entry.endswith('site-packages')]
+    assert sys.path.count(shared_backend.BACKEND_DIR) == 1
+    assert sys.path.index(shared_backend.BACKEND_DIR) < min(site_packages)
+
+
+def test_no_module_names_collide():
+    assert modules(shared_backend.BACKEND_DIR) & modules(HERE) == set()
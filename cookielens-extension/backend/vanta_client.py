@@ -2,34 +2,267 @@
 Vanta API Client
 Interfaces with Vanta MCP Server to retrieve compliance frameworks and controls
 """
+import asyncio
 import os
 import json
-import subprocess
-from typing import Dict, List, Optional, Any
+import shlex
+import threading
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Any
+import shared_backend  # noqa: F401  (before any backend/ import)
+from eventlog import get_logger
+from mcp_session import MCPError, MCPSession
+
+PRIVACY_CATEGORIES = ['Privacy', 'Security']
+
+log = get_logger("cookielens.vanta")
+
+
+class ControlCache:
+    """
+    Per-framework TTL cache for Vanta controls
+    
+    Entries older than `refresh_ahead` x TTL are refreshed in the background while
+    the cached copy is served. If a refresh fails, the stale copy keeps being served.
+    Entries are written to a snapshot file so a cold process starts warm.
+    """
+    
+    def __init__(
+        self,
+        default_ttl: float = 3600,
+        ttls: Optional[Dict[str, float]] = None,
+        refresh_ahead: float = 0.8,
+        snapshot_path: Optional[str] = None
+    ):
+        """
+        Initialize control cache
+        
+        Args:
+            default_ttl: Seconds a framework's controls stay fresh
+            ttls: Per-framework TTL overrides
+            refresh_ahead: Fraction of the TTL after which a background refresh starts
+            snapshot_path: JSON file used to persist and restore the cache
+        """
+        self.default_ttl = default_ttl
+        self.ttls = ttls or {}
+        self.refresh_ahead = refresh_ahead
+        self.snapshot_path = snapshot_path
+        self.stats = {"hits": 0, "misses": 0, "stale_served": 0, "background_refreshes": 0, "errors": 0}
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        
+        if snapshot_path and os.path.exists(snapshot_path):
+            self._load_snapshot()
+    
+    def _count(self, name: str):
+        # updated from request threads, refresh threads and the event loop
+        with self._lock:
+            self.stats[name] += 1
+    
+    def ttl(self, framework_id: str) -> float:
+        return self.ttls.get(framework_id, self.default_ttl)
+    
+    def get(self, framework_id: str, loader: Callable[[str], List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """
+        Get controls for a framework, loading them on a miss
+        
+        Args:
+            framework_id: Framework identifier
+            loader: Fetches controls for a framework; raises on failure
+            
+        Returns:
+            List of controls (empty if never loaded and the loader fails)
+        """
+        entry, fresh = self._lookup(framework_id)
+        if fresh:
+            if self._refresh_due(framework_id, entry):
+                self._refresh_in_background(framework_id, loader)
+            return entry["controls"]
+        
+        try:
+            return self._refresh(framework_id, loader)
+        except Exception as e:
+            return self._fallback(framework_id, entry, e)
+    
+    async def get_async(self, framework_id: str, loader: Callable[[str], Awaitable[List[Dict[str, Any]]]]) -> List[Dict[str, Any]]:
+        """
+        Async variant of get() for coroutine loaders
+        
+        Args:
+            framework_id: Framework identifier
+            loader: Coroutine function fetching controls for a framework; raises on failure
+            
+        Returns:
+            List of controls (empty if never loaded and the loader fails)
+        """
+        entry, fresh = self._lookup(framework_id)
+        if fresh:
+            if self._refresh_due(framework_id, entry) and self._claim_refresh(framework_id):
+                asyncio.ensure_future(self._refresh_async_in_background(framework_id, loader))
+            return entry["controls"]
+        
+        try:
+            controls = await loader(framework_id)
+        except Exception as e:
+            return self._fallback(framework_id, entry, e)
+        self._store(framework_id, controls)
+        return controls
+    
+    def _lookup(self, framework_id: str):
+        entry = self._entries.get(framework_id)
+        fresh = entry is not None and time.time() - entry["fetched_at"] < self.ttl(framework_id)
+        self._count("hits" if fresh else "misses")
+        return entry, fresh
+    
+    def _refresh_due(self, framework_id: str, entry: Dict[str, Any]) -> bool:
+        return time.time() - entry["fetched_at"] >= self.ttl(framework_id) * self.refresh_ahead
+    
+    def _fallback(self, framework_id: str, entry: Optional[Dict[str, Any]], error: Exception) -> List[Dict[str, Any]]:
+        self._count("errors")
+        if entry is not None:
+            # stale-while-revalidate: keep answering from the last good copy
+            self._count("stale_served")
+            log.warning("vanta.controls_stale", framework=framework_id, error=str(error))
+            return entry["controls"]
+        log.warning("vanta.controls_unavailable", framework=framework_id, error=str(error))
+        return []
+    
+    def _store(self, framework_id: str, controls: List[Dict[str, Any]]):
+        with self._lock:
+            self._entries[framework_id] = {"controls": controls, "fetched_at": time.time()}
+        self._save_snapshot()
+    
+    def _refresh(self, framework_id: str, loader: Callable[[str], List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        controls = loader(framework_id)
+        self._store(framework_id, controls)
+        return controls
+    
+    def _claim_refresh(self, framework_id: str) -> bool:
+        with self._lock:
+            if framework_id in self._refreshing:
+                return False
+            self._refreshing.add(framework_id)
+            return True
+    
+    def _refresh_in_background(self, framework_id: str, loader: Callable[[str], List[Dict[str, Any]]]):
+        if not self._claim_refresh(framework_id):
+            return
+        
+        def run():
+            try:
+                self._refresh(framework_id, loader)
+                self._count("background_refreshes")
+            except Exception as e:
+                self._count("errors")
+                log.warning("vanta.background_refresh_failed", framework=framework_id, error=str(e))
+            finally:
+                with self._lock:
+                    self._refreshing.discard(framework_id)
+        
+        threading.Thread(target=run, name=f"vanta-refresh-{framework_id}", daemon=True).start()
+    
+    async def _refresh_async_in_background(self, framework_id: str, loader: Callable[[str], Awaitable[List[Dict[str, Any]]]]):
+        try:
+            self._store(framework_id, await loader(framework_id))
+            self._count("background_refreshes")
+        except Exception as e:
+            self._count("errors")
+            log.warning("vanta.background_refresh_failed", framework=framework_id, error=str(e))
+        finally:
+            with self._lock:
+                self._refreshing.discard(framework_id)
+    
+    def invalidate(self, framework_id: Optional[str] = None):
+        with self._lock:
+            if framework_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(framework_id, None)
+    
+    def _load_snapshot(self):
+        try:
+            with open(self.snapshot_path) as f:
+                self._entries = json.load(f)
+        except (OSError, ValueError) as e:
+            log.warning("vanta.snapshot_unreadable", path=self.snapshot_path, error=str(e))
+    
+    def _save_snapshot(self):
+        if not self.snapshot_path:
+            return
+        with self._lock:
+            data = json.dumps(self._entries)
+        tmp_path = f"{self.snapshot_path}.tmp"
+        try:
+            with open(tmp_path, 'w') as f:
+                f.write(data)
+            os.replace(tmp_path, self.snapshot_path)
+        except OSError as e:
+            log.warning("vanta.snapshot_write_failed", path=self.snapshot_path, error=str(e))
 
 
 class VantaClient:
     """Client for interacting with Vanta MCP Server"""
     
-    def __init__(self, env_file_path: Optional[str] = None):
+    def __init__(self, env_file_path: Optional[str] = None, control_cache: Optional[ControlCache] = None):
         """
         Initialize Vanta client
         
         Args:
             env_file_path: Path to vanta-credentials.env file
+            control_cache: Cache for framework controls (defaults to one configured from the environment)
         """
         self.env_file_path = env_file_path or os.getenv('VANTA_ENV_FILE')
         self.region = os.getenv('REGION', 'us')
+        self.control_cache = control_cache or ControlCache(
+            default_ttl=float(os.getenv('VANTA_CONTROLS_TTL', '3600')),
+            snapshot_path=os.getenv('VANTA_CONTROLS_SNAPSHOT')
+        )
+        # e.g. 'npx -y @vantasdk/vanta-mcp-server'; without one the mock data is served
+        self.mcp_command = shlex.split(os.getenv('VANTA_MCP_COMMAND', ''))
+        self.session: Optional[MCPSession] = None
         
         if not self.env_file_path:
-            print("Warning: VANTA_ENV_FILE not set. Vanta features will be disabled.")
+            log.warning("vanta.disabled", reason="VANTA_ENV_FILE not set")
             self.enabled = False
         else:
             self.enabled = True
     
+    def start_session(self) -> bool:
+        """
+        Start the long-lived MCP server process (called once at app startup)
+        
+        Returns:
+            True if the server is running; otherwise calls keep using mock data
+        """
+        if not self.enabled or self.session is not None:
+            return self.session is not None
+        if not self.mcp_command:
+            log.info("vanta.mock_data", reason="VANTA_MCP_COMMAND not set")
+            return False
+        
+        env = os.environ.copy()
+        env['VANTA_ENV_FILE'] = self.env_file_path
+        env['REGION'] = self.region
+        
+        try:
+            self.session = MCPSession(self.mcp_command, env=env).start()
+            log.info("vanta.mcp_started", server=self.session.server_info.get('name', self.mcp_command[0]))
+            return True
+        except (OSError, MCPError) as e:
+            log.warning("vanta.mcp_unavailable", fallback="mock data", error=str(e))
+            self.session = None
+            return False
+    
+    def close_session(self):
+        """Stop the MCP server process"""
+        if self.session is not None:
+            self.session.close()
+            self.session = None
+    
     def _call_mcp_server(self, tool: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
         """
-        Call Vanta MCP Server using npx
+        Call a Vanta MCP Server tool over the persistent session
         
         Args:
             tool: MCP tool name (e.g., 'frameworks', 'controls')
@@ -41,25 +274,38 @@ class VantaClient:
         if not self.enabled:
             return {"error": "Vanta client not configured"}
         
-        try:
-            # Prepare environment variables
-            env = os.environ.copy()
-            env['VANTA_ENV_FILE'] = self.env_file_path
-            env['REGION'] = self.region
-            
-            # Call MCP server via npx
-            # Note: This is a simplified approach. In production, you'd use the MCP SDK properly
-            cmd = ['npx', '-y', '@vantasdk/vanta-mcp-server']
-            
-            # For now, return mock data since direct MCP calls need proper SDK integration
-            # In production, you'd integrate with the MCP protocol properly
+        if self.session is None:
+            # No MCP server started (see start_session): serve development data
             return self._get_mock_data(tool, arguments)
+        
+        try:
+            return self.session.call_tool(tool, arguments)
+        except MCPError as e:
+            log.warning("vanta.mcp_call_failed", tool=tool, error=str(e))
+            return {"error": str(e)}
+    
+    async def _call_mcp_server_async(self, tool: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Async variant of _call_mcp_server; concurrent calls share the MCP session
+        
+        Args:
+            tool: MCP tool name
+            arguments: Tool arguments
             
-        except Exception as e:
-            print(f"Vanta MCP call failed: {e}")
+        Returns:
+            Tool response as dictionary
+        """
+        if not self.enabled or self.session is None:
+            return self._call_mcp_server(tool, arguments)
+        
+        try:
+            return await self.session.call_tool_async(tool, arguments)
+        except MCPError as e:
+            log.warning("vanta.mcp_call_failed", tool=tool, error=str(e))
             return {"error": str(e)}
     
-    def _get_mock_data(self, tool: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
+    @staticmethod
+    def _get_mock_data(tool: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
         """
         Return mock data for development/testing
         In production, replace with actual MCP server calls
@@ -184,7 +430,7 @@ class VantaClient:
     
     def get_framework_controls(self, framework_id: str) -> List[Dict[str, Any]]:
         """
-        Get controls for a specific framework
+        Get controls for a specific framework (served from the control cache)
         
         Args:
             framework_id: Framework identifier (e.g., 'gdpr', 'ccpa')
@@ -192,12 +438,59 @@ class VantaClient:
         Returns:
             List of controls
         """
+        if not self.enabled:
+            return []
+        
+        return self.control_cache.get(framework_id, self._fetch_framework_controls)
+    
+    def _fetch_framework_controls(self, framework_id: str) -> List[Dict[str, Any]]:
+        """Fetch controls from the MCP server, raising on error responses"""
         result = self._call_mcp_server('list_framework_controls', {
             'frameworkId': framework_id
         })
         
+        if 'error' in result:
+            raise RuntimeError(result['error'])
+        
         return result.get('controls', [])
     
+    async def _fetch_framework_controls_async(self, framework_id: str) -> List[Dict[str, Any]]:
+        result = await self._call_mcp_server_async('list_framework_controls', {
+            'frameworkId': framework_id
+        })
+        
+        if 'error' in result:
+            raise RuntimeError(result['error'])
+        
+        return result.get('controls', [])
+    
+    async def get_framework_controls_async(self, framework_id: str) -> List[Dict[str, Any]]:
+        """
+        Async variant of get_framework_controls
+        
+        Args:
+            framework_id: Framework identifier (e.g., 'gdpr', 'ccpa')
+            
+        Returns:
+            List of controls
+        """
+        if not self.enabled:
+            return []
+        
+        return await self.control_cache.get_async(framework_id, self._fetch_framework_controls_async)
+    
+    async def get_framework_privacy_controls_async(self, framework_id: str) -> List[Dict[str, Any]]:
+        """
+        Get one framework's privacy/security controls asynchronously
+        
+        Args:
+            framework_id: Framework identifier
+            
+        Returns:
+            Privacy and security related controls
+        """
+        return filter_privacy_controls(await self.get_framework_controls_async(framework_id))
+    
     def get_privacy_controls(self, frameworks: List[str] = None) -> Dict[str, List[Dict[str, Any]]]:
         """
         Get privacy-related controls for specified frameworks
@@ -216,11 +509,42 @@ class VantaClient:
         for framework_id in frameworks:
             controls = self.get_framework_controls(framework_id)
             # Filter for privacy/security related controls
-            privacy_controls = [
-                c for c in controls 
-                if c.get('category') in ['Privacy', 'Security']
-            ]
-            controls_by_framework[framework_id] = privacy_controls
+            controls_by_framework[framework_id] = filter_privacy_controls(controls)
         
         return controls_by_framework
+    
+    async def get_privacy_controls_async(
+        self,
+        frameworks: List[str] = None,
+        timeout: Optional[float] = None
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Fetch privacy-related controls for all frameworks concurrently
+        
+        Args:
+            frameworks: List of framework IDs (defaults to ['gdpr', 'ccpa'])
+            timeout: Shared deadline in seconds; frameworks not fetched by then are left out
+            
+        Returns:
+            Dictionary mapping framework ID to list of controls
+        """
+        if frameworks is None:
+            frameworks = ['gdpr', 'ccpa']
+        if not frameworks:
+            return {}
+        
+        tasks = {
+            asyncio.ensure_future(self.get_framework_privacy_controls_async(framework_id)): framework_id
+            for framework_id in frameworks
+        }
+        done, pending = await asyncio.wait(tasks, timeout=timeout)
+        for task in pending:
+            task.cancel()
+        
+        fetched = {tasks[task]: task.result() for task in done if not task.exception()}
+        return {framework_id: fetched[framework_id] for framework_id in frameworks if framework_id in fetched}
+
 
+def filter_privacy_controls(controls: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Keep only privacy/security related controls"""
+    return [c for c in controls if c.get('category') in PRIVACY_CATEGORIES]
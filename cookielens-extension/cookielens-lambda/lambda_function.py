@@ -2,6 +2,7 @@ import json
 import os
 import boto3
 from urllib.parse import urlparse
+from urlcanon import canonicalize_url
 from datetime import datetime
 from playwright.sync_api import sync_playwright
 
@@ -60,16 +61,18 @@ def analyze_with_claude(scan_data: dict) -> str:
     return text_out
 
 def _parse_event(event):
-    if "body" in event:
-        body = event["body"]
-        if event.get("isBase64Encoded"):
+    # a copy: the caller's event is not ours to rewrite
+    data = dict(event or {})
+    if "body" in data:
+        body = data["body"]
+        if data.get("isBase64Encoded"):
             import base64
             body = base64.b64decode(body).decode("utf-8")
         try:
-            return json.loads(body or "{}")
+            data = json.loads(body or "{}")
         except:
-            return {}
-    return event or {}
+            data = {}
+    return data
 
 def lambda_handler(event, context):
     try:
@@ -130,6 +133,8 @@ def lambda_handler(event, context):
 
         analysis = analyze_with_claude(scan)
         scan["humanReadableAnalysis"] = analysis
+        # the page is scanned as sent; this is the spelling to group stored scans by (see urlcanon.py)
+        scan["canonicalUrl"] = canonicalize_url(url)
 
         # 可选：写 S3（需要给角色 s3:PutObject 权限）
         bucket = os.getenv("S3_BUCKET")
@@ -37,6 +37,9 @@ def create_simple_deployment_package():
             if os.path.exists('lambda_function_simple.py'):
                 zipf.write('lambda_function_simple.py', 'lambda_function.py')
                 print("  ✅ Added lambda_function_simple.py as lambda_function.py")
+            if os.path.exists('urlcanon.py'):
+                zipf.write('urlcanon.py')
+                print("  ✅ Added urlcanon.py")
             
             # Add all dependencies
             for root, dirs, files in os.walk(deps_dir):
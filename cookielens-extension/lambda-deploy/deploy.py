@@ -19,6 +19,7 @@ def create_zip_package():
     # Files to include in the package
     files_to_include = [
         'lambda_function.py',
+        'urlcanon.py',
         'requirements.txt'
     ]
     
@@ -3,6 +3,7 @@ import os
 import boto3
 import requests
 from urllib.parse import urlparse
+from urlcanon import canonicalize_url
 from datetime import datetime
 import re
 
@@ -63,16 +64,18 @@ def analyze_with_claude(scan_data: dict) -> str:
 
 def _parse_event(event):
     """Parse Lambda event to extract request data"""
-    if "body" in event:
-        body = event["body"]
-        if event.get("isBase64Encoded"):
+    # a copy: the caller's event is not ours to rewrite
+    data = dict(event or {})
+    if "body" in data:
+        body = data["body"]
+        if data.get("isBase64Encoded"):
             import base64
             body = base64.b64decode(body).decode("utf-8")
         try:
-            return json.loads(body or "{}")
+            data = json.loads(body or "{}")
         except:
-            return {}
-    return event or {}
+            data = {}
+    return data
 
 def extract_cookies_from_headers(headers):
     """Extract cookies from HTTP headers"""
@@ -226,6 +229,8 @@ def lambda_handler(event, context):
         print("Analyzing with Claude...")
         analysis = analyze_with_claude(scan)
         scan["humanReadableAnalysis"] = analysis
+        # the page is scanned as sent; this is the spelling to group stored scans by (see urlcanon.py)
+        scan["canonicalUrl"] = canonicalize_url(url)
 
         # Optional: Save to S3
         bucket = os.getenv("S3_BUCKET")